@@ -0,0 +1,308 @@
+"""
+MongoDB 인덱스 프로비저닝 / 상태 확인
+
+서버 기동 시에는 백그라운드 작업(run_startup_provisioning)으로 실행되고,
+배포 파이프라인 등에서는 별도 명령으로 실행할 수 있음:
+    python -m db.admin ensure-indexes
+    python -m db.admin status
+    python -m db.admin backfill-keywords
+    python -m db.admin backfill-dedup
+    python -m db.admin archive-postings
+    python -m db.admin rebuild-matches
+    python -m db.admin import-postings [폴더]
+"""
+import os
+import sys
+import json
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from db.mongo import get_collection, close_mongo
+from db.hybrid_search import create_keyword_index
+from db.matches import create_matches_index, match_updater
+from db.eval_cache import create_eval_cache_index
+from services.tokenizer import extract_keywords
+from db.dedup import DUPLICATE_KEY_ERROR, dedup_fields
+from db.vector_index import VECTOR_SEARCH_BACKEND, ATLAS_VECTOR_INDEX_NAME, search_index_differences
+from db.postings import (
+    POSTINGS_COLLECTION, POSTINGS_VECTOR_INDEX_FIELDS, create_vector_index_if_not_exists, postings_index, postings_search_collection,
+    create_posting_date_index, archive_expired_postings, opened_posting_ids, posting_chunks, postings_dedup
+)
+from db.posting_import import POSTING_IMPORT_DIR, import_postings
+from db.resumes import (
+    RESUMES_COLLECTION, RESUMES_VECTOR_INDEX_FIELDS, create_resume_vector_index_if_not_exists, resumes_index, resumes_search_collection,
+    resume_chunks, resumes_dedup
+)
+
+load_dotenv()
+
+MONGO_PROVISION_INDEXES_ON_STARTUP = os.getenv("MONGO_PROVISION_INDEXES_ON_STARTUP", "true").lower() == "true"
+PROVISIONING_MAX_ATTEMPTS = int(os.getenv("PROVISIONING_MAX_ATTEMPTS", "5"))
+# 만료 공고 보관 주기 (0이면 서버에서 주기 실행하지 않음 - 외부 스케줄러에서 archive-postings 사용)
+POSTING_ARCHIVE_INTERVAL_HOURS = float(os.getenv("POSTING_ARCHIVE_INTERVAL_HOURS", "24"))
+
+# 기동 후 프로비저닝 진행 상태 (헬스 체크에서 노출)
+provisioning_state: Dict[str, Any] = {
+    "status": "pending", "attempts": 0, "error": None, "finished_at": None,
+    "index_failures": {}, "vector_index_differences": {}
+}
+
+
+async def ensure_indexes() -> Dict[str, str]:
+    """
+    인덱스를 하나씩 따로 생성 (한 단계가 실패해도 나머지는 계속) → 실패한 단계: 오류 메시지
+    Atlas 벡터 인덱스는 VECTOR_SEARCH_BACKEND=atlas 일 때만 (일반 MongoDB에는 검색 인덱스 API가 없음)
+    """
+    steps: Dict[str, Callable[[], Awaitable[Any]]] = {
+        "postings_keywords": lambda: create_keyword_index(get_collection(POSTINGS_COLLECTION)),
+        "resumes_keywords": lambda: create_keyword_index(get_collection(RESUMES_COLLECTION)),
+        "postings_period": create_posting_date_index,
+        "matches": create_matches_index,
+        "eval_cache_ttl": create_eval_cache_index,
+        "posting_chunks_parent": posting_chunks.create_indexes,
+        "resume_chunks_parent": resume_chunks.create_indexes,
+        "postings_dedup": postings_dedup.create_indexes,
+        "resumes_dedup": resumes_dedup.create_indexes
+    }
+    if VECTOR_SEARCH_BACKEND == "atlas":
+        steps.update({
+            "postings_vector": create_vector_index_if_not_exists,
+            "resumes_vector": create_resume_vector_index_if_not_exists,
+            "posting_chunks_vector": posting_chunks.create_vector_index,
+            "resume_chunks_vector": resume_chunks.create_vector_index
+        })
+    failures = {}
+    for name, step in steps.items():
+        try:
+            await step()
+        except Exception as e:
+            failures[name] = str(e)
+            logging.error(f"[인덱스 생성 실패] {name}: {e}")
+    return failures
+
+
+async def warm_up_local_indexes():
+    # VECTOR_SEARCH_BACKEND=local 인 경우 첫 요청 전에 인덱스를 미리 구성
+    if postings_index is not None:
+        await postings_index.load(postings_search_collection())
+    if resumes_index is not None:
+        await resumes_index.load(resumes_search_collection())
+    await posting_chunks.warm_up()
+    await resume_chunks.warm_up()
+
+
+async def run_startup_provisioning():
+    """
+    기동을 막지 않는 백그라운드 프로비저닝 (Mongo가 잠시 내려가 있으면 재시도)
+    """
+    provisioning_state["status"] = "running"
+    for attempt in range(1, PROVISIONING_MAX_ATTEMPTS + 1):
+        provisioning_state["attempts"] = attempt
+        try:
+            failures = await ensure_indexes() if MONGO_PROVISION_INDEXES_ON_STARTUP else {}
+            provisioning_state["index_failures"] = failures
+            if VECTOR_SEARCH_BACKEND == "atlas":
+                # 갱신하지 못한 정의 차이가 남아 있으면 readiness에서 unavailable
+                differences = await vector_index_differences()
+                provisioning_state["vector_index_differences"] = differences
+                if differences:
+                    logging.error(f"[벡터 인덱스 정의 불일치] {differences}")
+            await warm_up_local_indexes()
+            if failures:
+                # 생성된 인덱스는 그대로 두고 실패한 단계만 다음 시도에서 다시 (create_index는 이미 있으면 건너뜀)
+                raise RuntimeError(f"인덱스 생성 실패: {', '.join(failures)}")
+            provisioning_state.update(status="ready", error=None, finished_at=datetime.utcnow().isoformat())
+            logging.info("[프로비저닝 완료]")
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            provisioning_state["error"] = str(e)
+            logging.error(f"[프로비저닝 실패] ({attempt}/{PROVISIONING_MAX_ATTEMPTS}): {e}")
+            await asyncio.sleep(min(5 * attempt, 30))
+    provisioning_state.update(status="failed", finished_at=datetime.utcnow().isoformat())
+
+
+async def rebuild_matches() -> Dict[str, int]:
+    """
+    전체 문서의 매칭 목록 재계산 (매칭 테이블 도입 전 문서 / 설정 변경 후)
+    """
+    report = {}
+    for kind, name in (("posting", POSTINGS_COLLECTION), ("resume", RESUMES_COLLECTION)):
+        ids = [doc["_id"] async for doc in get_collection(name).find({}, {"_id": 1})]
+        match_updater.submit(kind, ids)
+        report[name] = len(ids)
+    await match_updater.join()
+    logging.info(f"[매칭 테이블 재계산 완료] {report}")
+    return report
+
+
+async def run_archival_loop():
+    """
+    만료 공고 주기 보관 + 게시가 시작된 공고의 매칭 반영 (서버 기동 시 백그라운드 작업)
+    """
+    if POSTING_ARCHIVE_INTERVAL_HOURS <= 0:
+        return
+    last_day = date.today() - timedelta(days=1)
+    while True:
+        try:
+            await archive_expired_postings()
+            # 게시 전이라 이력서 쪽 매칭 목록에 넣지 않았던 공고를 시작일이 지나면 반영
+            today = date.today()
+            if today > last_day:
+                match_updater.submit("posting", await opened_posting_ids(last_day, today))
+                last_day = today
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"[만료 공고 보관 실패]: {e}")
+        await asyncio.sleep(POSTING_ARCHIVE_INTERVAL_HOURS * 3600)
+
+
+def _vector_index_definitions() -> Dict[str, list]:
+    # 컬렉션별로 있어야 하는 벡터 인덱스 정의
+    return {
+        POSTINGS_COLLECTION: POSTINGS_VECTOR_INDEX_FIELDS,
+        RESUMES_COLLECTION: RESUMES_VECTOR_INDEX_FIELDS,
+        posting_chunks.collection_name: posting_chunks.vector_index_fields(),
+        resume_chunks.collection_name: resume_chunks.vector_index_fields()
+    }
+
+
+async def vector_index_differences() -> Dict[str, list]:
+    """
+    벡터 인덱스 정의가 현재 설정(EMBEDDING_DIMENSIONS 등)과 다른 컬렉션 → 다른 점 목록
+    """
+    differences = {}
+    for name, fields in _vector_index_definitions().items():
+        search_indexes = await get_collection(name).list_search_indexes().to_list(length=None)
+        existing = next((idx for idx in search_indexes if idx["name"] == ATLAS_VECTOR_INDEX_NAME), None)
+        if found := search_index_differences(existing, fields):
+            differences[name] = found
+    return differences
+
+
+async def collection_status() -> Dict[str, Any]:
+    status = {}
+    definitions = _vector_index_definitions()
+    for name in (POSTINGS_COLLECTION, RESUMES_COLLECTION):
+        collection = get_collection(name)
+        status[name] = {
+            # 전체 스캔 없는 메타데이터 기반 개수
+            "estimated_count": await collection.estimated_document_count(),
+            "indexes": list((await collection.index_information()).keys())
+        }
+        if VECTOR_SEARCH_BACKEND != "atlas":
+            continue
+        search_indexes = await collection.list_search_indexes().to_list(length=None)
+        existing = next((idx for idx in search_indexes if idx["name"] == ATLAS_VECTOR_INDEX_NAME), None)
+        status[name].update({
+            "search_indexes": [
+                {"name": idx.get("name"), "status": idx.get("status"), "queryable": idx.get("queryable")}
+                for idx in search_indexes
+            ],
+            # 비어 있지 않으면 $vectorSearch가 실패할 수 있음 (ensure-indexes로 갱신)
+            "vector_index_differences": search_index_differences(existing, definitions[name])
+        })
+    return status
+
+
+async def _backfill(field: str, build: Callable[[Dict[str, Any]], Dict[str, Any]], batch_size: int) -> Dict[str, int]:
+    """
+    field가 없는 기존 문서에 build(doc) 결과를 $set
+    """
+    report = {}
+    for name in (POSTINGS_COLLECTION, RESUMES_COLLECTION):
+        collection = get_collection(name)
+        cursor = collection.find(
+            {field: {"$exists": False}}, {"original_text": 1, "structured.skills": 1}, batch_size=batch_size
+        )
+        operations, updated, rejected = [], 0, 0
+        async for doc in cursor:
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": build(doc)}))
+            if len(operations) >= batch_size:
+                modified, duplicates = await _bulk_update(collection, operations)
+                updated, rejected = updated + modified, rejected + duplicates
+                operations = []
+        if operations:
+            modified, duplicates = await _bulk_update(collection, operations)
+            updated, rejected = updated + modified, rejected + duplicates
+        report[name] = updated
+        if rejected:
+            # content_hash 고유 인덱스: 기존 문서끼리 정확히 같은 내용이면 먼저 처리된 문서만 필드를 가짐
+            report[f"{name}_duplicates"] = rejected
+            logging.warning(f"[{field} 백필] {name}: 기존 문서와 같은 내용 {rejected}건은 건너뜀")
+        logging.info(f"[{field} 백필 완료] {name}: {updated}건")
+    return report
+
+
+async def _bulk_update(collection, operations: list) -> Tuple[int, int]:
+    # → (수정된 문서 수, 고유 인덱스로 거부된 수), 그 외 쓰기 오류는 그대로 raise
+    try:
+        return (await collection.bulk_write(operations, ordered=False)).modified_count, 0
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != DUPLICATE_KEY_ERROR for err in errors):
+            raise
+        return e.details.get("nModified", 0), len(errors)
+
+
+async def backfill_keywords(batch_size: int = 500) -> Dict[str, int]:
+    """
+    keywords 필드가 없는 기존 문서에 하이브리드 검색용 키워드 추가
+    """
+    def build(doc: Dict[str, Any]) -> Dict[str, Any]:
+        skills = (doc.get("structured") or {}).get("skills") or []
+        return {"keywords": extract_keywords(doc.get("original_text", ""), skills)}
+    return await _backfill("keywords", build, batch_size)
+
+
+async def backfill_dedup(batch_size: int = 500) -> Dict[str, int]:
+    """
+    기존 문서에 중복 검사용 content_hash / simhash 추가
+    (기존 문서끼리 정확히 같은 내용이면 하나만 필드를 갖고 나머지는 정리하지 않음 - 보고의 "{컬렉션}_duplicates")
+    """
+    return await _backfill("content_hash", lambda doc: dedup_fields(doc.get("original_text", "")), batch_size)
+
+
+async def import_postings_from(directory: str) -> Dict[str, Any]:
+    # 서버 밖에서 실행하므로 루프가 끝나기 전에 매칭 테이블 갱신까지 마침
+    report = await import_postings(directory)
+    await match_updater.join()
+    return report
+
+
+async def _main(command: str, *args: str):
+    try:
+        if command == "ensure-indexes":
+            failures = await ensure_indexes()
+            if failures:
+                raise SystemExit(f"인덱스 생성 실패: {json.dumps(failures, ensure_ascii=False)}")
+        elif command == "status":
+            print(json.dumps(await collection_status(), ensure_ascii=False, indent=2, default=str))
+        elif command == "backfill-keywords":
+            print(json.dumps(await backfill_keywords(), ensure_ascii=False))
+        elif command == "backfill-dedup":
+            print(json.dumps(await backfill_dedup(), ensure_ascii=False))
+        elif command == "archive-postings":
+            print(json.dumps({"archived": await archive_expired_postings()}))
+        elif command == "rebuild-matches":
+            print(json.dumps(await rebuild_matches()))
+        elif command == "import-postings":
+            report = await import_postings_from(args[0] if args else POSTING_IMPORT_DIR)
+            print(json.dumps(report, ensure_ascii=False, default=str))
+        else:
+            raise SystemExit(
+                f"알 수 없는 명령: {command} (ensure-indexes | status | backfill-keywords | backfill-dedup"
+                f" | archive-postings | rebuild-matches | import-postings)"
+            )
+    finally:
+        close_mongo()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(*(sys.argv[1:] or ["status"])))
@@ -0,0 +1,151 @@
+"""
+긴 문서의 청크 벡터 저장 / 검색 (다중 벡터 문서)
+
+원본 문서의 embedding 필드에는 청크 평균 벡터를 두고(mean 집계, 기존 벡터 인덱스 그대로 사용),
+청크가 2개 이상인 문서만 청크별 벡터를 별도 컬렉션에 저장 (max 집계용)
+    {"parent_id": 원본 _id, "chunk_index": 0, "text": ..., "embedding": ..., [필터 필드]}
+"""
+import os
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+from services.embedding_service import EMBEDDING_DIMENSIONS
+from db.embedding_codec import encode_embedding
+from db.vector_index import create_local_index, local_vector_search, vector_index_fields, ensure_vector_search_index
+from db.mongo import get_collection, get_vector_search_collection
+
+load_dotenv()
+
+# 검색 시 청크 점수 집계 방식 (mean: 문서 평균 벡터만 검색 | max: 문서 벡터 + 청크 벡터 중 최고 점수)
+CHUNK_AGGREGATIONS = ("mean", "max")
+CHUNK_AGGREGATION = os.getenv("CHUNK_AGGREGATION", "mean")
+if CHUNK_AGGREGATION not in CHUNK_AGGREGATIONS:
+    raise ValueError(f"CHUNK_AGGREGATION 값이 올바르지 않습니다: {CHUNK_AGGREGATION}")
+
+CHUNK_CANDIDATE_FACTOR = 4  # 한 문서의 여러 청크가 상위를 차지하는 경우를 고려한 후보 배수
+
+
+def resolve_chunk_aggregation(aggregation: Optional[str]) -> str:
+    aggregation = aggregation or CHUNK_AGGREGATION
+    if aggregation not in CHUNK_AGGREGATIONS:
+        raise ValueError(f"지원하지 않는 청크 집계 방식: {aggregation}")
+    return aggregation
+
+
+def merge_max_scores(*result_lists: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """
+    _id별 최고 점수만 남겨 점수순 정렬
+    """
+    best: Dict[Any, Dict[str, Any]] = {}
+    for hits in result_lists:
+        for hit in hits:
+            if hit["_id"] not in best or hit["score"] > best[hit["_id"]]["score"]:
+                best[hit["_id"]] = hit
+    return sorted(best.values(), key=lambda hit: hit["score"], reverse=True)[:limit]
+
+
+class ChunkStore:
+    """
+    원본 컬렉션 하나에 딸린 청크 컬렉션
+    filter_fields: 원본에서 복사해 둘 필드 (벡터 검색 사전 필터용, 예: startDay / endDay)
+    """
+
+    def __init__(self, collection_name: str, filter_fields: Sequence[str] = ()):
+        self.collection_name = collection_name
+        self.filter_fields = list(filter_fields)
+        # 로컬 벡터 인덱스 (VECTOR_SEARCH_BACKEND=local 일 때만 생성)
+        self.index = create_local_index(collection_name, EMBEDDING_DIMENSIONS)
+
+    def collection(self):
+        return get_collection(self.collection_name)
+
+    def search_collection(self):
+        return get_vector_search_collection(self.collection_name)
+
+    async def insert(self, parents: Sequence[Tuple[Any, List[Tuple[str, List[float]]], Dict[str, Any]]]) -> int:
+        """
+        parents: [(원본 _id, [(청크 텍스트, 벡터)], 원본 문서)] - 청크가 하나뿐인 문서는 건너뜀
+        """
+        docs, vectors = [], []
+        for parent_id, chunks, parent in parents:
+            if len(chunks) < 2:
+                continue
+            for i, (text, vector) in enumerate(chunks):
+                docs.append({
+                    "parent_id": parent_id,
+                    "chunk_index": i,
+                    "text": text,
+                    "embedding": encode_embedding(vector),
+                    **{field: parent.get(field) for field in self.filter_fields}
+                })
+                vectors.append(vector)
+        if not docs:
+            return 0
+        result = await self.collection().insert_many(docs, ordered=False)
+        if self.index is not None and self.index.loaded:
+            await asyncio.to_thread(self.index.add, result.inserted_ids, vectors)
+        return len(result.inserted_ids)
+
+    async def delete(self, parent_ids: Sequence[Any]):
+        parent_ids = list(parent_ids)
+        if not parent_ids:
+            return
+        if self.index is not None:
+            cursor = self.collection().find({"parent_id": {"$in": parent_ids}}, {"_id": 1})
+            async for doc in cursor:
+                self.index.remove(doc["_id"])
+        await self.collection().delete_many({"parent_id": {"$in": parent_ids}})
+
+    async def update_fields(self, parent_id: Any, values: Dict[str, Any]):
+        # 원본에서 복사해 둔 필터 필드 갱신 (예: 재게시 공고의 게시 기간)
+        values = {field: value for field, value in values.items() if field in self.filter_fields}
+        if values:
+            await self.collection().update_many({"parent_id": parent_id}, {"$set": values})
+
+    async def search(self, query_vector: List[float], top_k: int,
+                     search_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        청크 벡터 검색 → 원본 문서별 최고 점수 ({"_id": 원본 _id, "score"})
+        """
+        limit = top_k * CHUNK_CANDIDATE_FACTOR
+        if self.index is not None:
+            hits = await local_vector_search(self.index, self.search_collection(), query_vector, limit, search_filter)
+            cursor = self.collection().find({"_id": {"$in": [hit["_id"] for hit in hits]}}, {"parent_id": 1})
+            parents = {doc["_id"]: doc["parent_id"] async for doc in cursor}
+            hits = [{"_id": parents[hit["_id"]], "score": hit["score"]} for hit in hits if hit["_id"] in parents]
+        else:
+            hits = await self._atlas_vector_search(query_vector, limit, search_filter)
+        return merge_max_scores(hits, limit=top_k)
+
+    async def _atlas_vector_search(self, query_vector: List[float], limit: int,
+                                   search_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        vector_search = {
+            "index": "vector_index",
+            "queryVector": query_vector,
+            "path": "embedding",
+            "numCandidates": max(100, limit * 2),
+            "limit": limit,
+            "similarity": "cosine"
+        }
+        if search_filter:
+            vector_search["filter"] = search_filter
+        pipeline = [
+            {"$vectorSearch": vector_search},
+            {"$project": {"_id": "$parent_id", "score": {"$meta": "vectorSearchScore"}}}
+        ]
+        return await self.search_collection().aggregate(pipeline).to_list(length=None)
+
+    def vector_index_fields(self) -> List[Dict[str, Any]]:
+        return vector_index_fields(EMBEDDING_DIMENSIONS, self.filter_fields)
+
+    async def create_indexes(self):
+        # parent_id 조회 / 삭제용 일반 인덱스
+        await self.collection().create_index("parent_id", name="parent_id_1")
+
+    async def create_vector_index(self):
+        # 청크 Atlas 벡터 인덱스 (VECTOR_SEARCH_BACKEND=atlas 일 때만)
+        await ensure_vector_search_index(self.collection(), self.vector_index_fields())
+
+    async def warm_up(self):
+        if self.index is not None:
+            await self.index.load(self.search_collection())
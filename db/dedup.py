@@ -0,0 +1,174 @@
+"""
+저장 전 중복 검사 (임베딩 / insert 전에 실행)
+
+- 정확히 같은 내용: 정규화 텍스트의 sha256 (content_hash) → 기존 object_id 반환
+- 거의 같은 내용: 64bit SimHash를 16bit씩 4개 밴드로 나눠 저장(simhash_bands, multikey 인덱스)
+  해밍 거리 3 이하인 문서는 최소 한 밴드가 같으므로 밴드 일치 후보만 거리 계산
+"""
+import os
+import hashlib
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+from dotenv import load_dotenv
+from pymongo.errors import OperationFailure
+from services.embedding_service import normalize_text
+from services.tokenizer import tokenize
+from db.mongo import get_collection
+
+load_dotenv()
+
+# 유사 중복 처리 (flag: 저장하되 near_duplicate_of 표시 | skip: 저장하지 않고 기존 문서 반환 | off: 검사 안 함)
+# 같은 양식의 다른 사람 이력서 / 일부 수정된 재게시 공고도 유사 중복이 되므로 기본은 flag
+DEDUP_NEAR_DUPLICATES = os.getenv("DEDUP_NEAR_DUPLICATES", "flag").lower()
+if DEDUP_NEAR_DUPLICATES not in ("skip", "flag", "off"):
+    raise ValueError(f"DEDUP_NEAR_DUPLICATES 값이 올바르지 않습니다: {DEDUP_NEAR_DUPLICATES}")
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "3"))  # 유사 중복으로 볼 최대 해밍 거리
+
+DUPLICATE_KEY_ERROR = 11000  # content_hash 고유 인덱스 위반 (동시에 같은 문서를 저장한 경우)
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+if DEDUP_MAX_DISTANCE >= SIMHASH_BANDS:
+    logging.warning(f"[중복 검사] DEDUP_MAX_DISTANCE({DEDUP_MAX_DISTANCE})가 밴드 수 이상이면 일부 유사 중복을 놓칠 수 있음")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).lower().encode("utf-8")).hexdigest()
+
+
+def simhash(text: str) -> int:
+    """
+    토큰 빈도 가중 SimHash (64bit, 부호 없는 정수)
+    """
+    weights = [0] * SIMHASH_BITS
+    for token, count in Counter(tokenize(text)).items():
+        h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if h >> bit & 1 else -count
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def simhash_bands(value: int) -> List[str]:
+    mask = (1 << _BAND_BITS) - 1
+    return [f"{i}:{value >> (i * _BAND_BITS) & mask:04x}" for i in range(SIMHASH_BANDS)]
+
+
+def _to_int64(value: int) -> int:
+    # MongoDB는 부호 있는 64bit 정수만 저장
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _from_int64(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def dedup_fields(text: str) -> Dict[str, Any]:
+    """
+    문서에 함께 저장할 중복 검사용 필드
+    """
+    value = simhash(text)
+    return {"content_hash": content_hash(text), "simhash": _to_int64(value), "simhash_bands": simhash_bands(value)}
+
+
+def skip_insert(duplicate: Optional[Dict[str, Any]]) -> bool:
+    """
+    중복 검사 결과로 저장을 건너뛸지 (정확한 중복은 항상, 유사 중복은 skip 설정일 때)
+    """
+    return duplicate is not None and (duplicate["duplicate"] == "exact" or DEDUP_NEAR_DUPLICATES == "skip")
+
+
+class DedupIndex:
+    """
+    컬렉션 하나의 중복 검사 (content_hash / simhash_bands 인덱스 사용)
+    """
+
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+
+    def collection(self):
+        return get_collection(self.collection_name)
+
+    async def find_duplicates(self, fields_list: List[Dict[str, Any]],
+                              pending: Sequence[Dict[str, Any]] = ()) -> List[Optional[Dict[str, Any]]]:
+        """
+        dedup_fields 결과 목록을 한 번에 검사
+        → 문서별 None 또는 {"_id": 기존 문서, "duplicate": "exact" | "near", "distance"}
+        같은 목록 안의 앞선 항목과 중복이면 "index"(앞선 항목의 순번)가 추가되고,
+        "_id"는 앞선 항목에 미리 정해 둔 _id (없으면 None)
+        pending: 다른 배치에서 검사를 통과했지만 아직 저장되지 않았을 수 있는 문서 (_id 포함, 앞선 항목으로 취급)
+        """
+        if not fields_list:
+            return []
+        collection = self.collection()
+        hashes = list({fields["content_hash"] for fields in fields_list})
+        existing_exact = {
+            doc["content_hash"]: doc["_id"]
+            async for doc in collection.find({"content_hash": {"$in": hashes}}, {"content_hash": 1})
+        }
+
+        candidates = []
+        if DEDUP_NEAR_DUPLICATES != "off":
+            bands = list({band for fields in fields_list for band in fields["simhash_bands"]})
+            cursor = collection.find({"simhash_bands": {"$in": bands}}, {"simhash": 1, "simhash_bands": 1})
+            candidates = [(doc["_id"], _from_int64(doc["simhash"]), set(doc["simhash_bands"])) async for doc in cursor]
+
+        results = []
+        seen = [(None, fields) for fields in pending]  # seen: 저장될 앞선 항목 (순번, fields), pending은 순번 없음
+        for position, fields in enumerate(fields_list):
+            result, earlier = None, None
+            value = _from_int64(fields["simhash"])
+            if fields["content_hash"] in existing_exact:
+                result = {"_id": existing_exact[fields["content_hash"]], "duplicate": "exact", "distance": 0}
+            elif (earlier := next((e for e in seen if fields["content_hash"] == e[1]["content_hash"]), None)):
+                result = {"_id": earlier[1].get("_id"), "duplicate": "exact", "distance": 0}
+            elif DEDUP_NEAR_DUPLICATES != "off":
+                bands = set(fields["simhash_bands"])
+                nearest = min(
+                    ((hamming_distance(value, other), oid) for oid, other, other_bands in candidates if bands & other_bands),
+                    default=None, key=lambda item: item[0]
+                )
+                if nearest is not None and nearest[0] <= DEDUP_MAX_DISTANCE:
+                    result = {"_id": nearest[1], "duplicate": "near", "distance": nearest[0]}
+                elif (earlier := next((e for e in seen
+                                       if hamming_distance(value, _from_int64(e[1]["simhash"])) <= DEDUP_MAX_DISTANCE), None)):
+                    result = {"_id": earlier[1].get("_id"), "duplicate": "near",
+                              "distance": hamming_distance(value, _from_int64(earlier[1]["simhash"]))}
+            if earlier is not None and earlier[0] is not None:
+                result["index"] = earlier[0]
+            results.append(result)
+            if result is None or result["duplicate"] == "near" and DEDUP_NEAR_DUPLICATES == "flag":
+                seen.append((position, fields))
+        return results
+
+    async def find_duplicate(self, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return (await self.find_duplicates([fields]))[0]
+
+    async def find_exact(self, hash_value: str) -> Optional[Any]:
+        """
+        content_hash가 같은 저장된 문서의 _id (고유 인덱스 위반으로 저장이 거부된 경우 기존 문서 찾기)
+        """
+        doc = await self.collection().find_one({"content_hash": hash_value}, {"_id": 1})
+        return doc["_id"] if doc else None
+
+    async def create_indexes(self):
+        collection = self.collection()
+        # 검사와 저장 사이에 같은 문서가 동시에 들어와도 하나만 저장되도록 고유 인덱스
+        # (dedup 필드가 없는 기존 문서는 제외, 이전 버전의 일반 인덱스는 교체)
+        options = {"name": "content_hash_1", "unique": True,
+                   "partialFilterExpression": {"content_hash": {"$exists": True}}}
+        existing = (await collection.index_information()).get("content_hash_1")
+        if existing is not None and not existing.get("unique"):
+            await collection.drop_index("content_hash_1")
+        try:
+            await collection.create_index("content_hash", **options)
+        except OperationFailure as e:
+            if e.code == DUPLICATE_KEY_ERROR:
+                logging.error(f"[중복 검사 인덱스] {self.collection_name}에 content_hash가 같은 문서가 이미 있어 고유 인덱스를 만들 수 없음")
+            raise
+        await collection.create_index("simhash_bands", name="simhash_bands_1")
@@ -0,0 +1,82 @@
+import os
+import logging
+from typing import Any, List, Optional, Sequence, Union
+import numpy as np
+from bson.binary import Binary, BinaryVectorDtype, USER_DEFINED_SUBTYPE, VECTOR_SUBTYPE
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 임베딩 저장 형식
+# - array   : BSON double 배열 (기존 방식, 1536차원 약 14KB+)
+# - int8    : BSON Vector(BinData subtype 9, int8) - Atlas $vectorSearch 인덱싱 가능
+# - float16 : packed float16 BinData(user-defined subtype) - 로컬 벡터 인덱스 전용
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "array").lower()
+EMBEDDING_STORAGE_MODES = ("array", "int8", "float16")
+
+FLOAT16_SUBTYPE = USER_DEFINED_SUBTYPE
+_VECTOR_HEADER_SIZE = 2  # dtype 1바이트 + padding 1바이트
+_INT8 = BinaryVectorDtype.INT8.value[0]
+_FLOAT32 = BinaryVectorDtype.FLOAT32.value[0]
+
+if EMBEDDING_STORAGE not in EMBEDDING_STORAGE_MODES:
+    raise ValueError(f"EMBEDDING_STORAGE 값이 올바르지 않습니다: {EMBEDDING_STORAGE}")
+if EMBEDDING_STORAGE == "float16" and os.getenv("VECTOR_SEARCH_BACKEND", "atlas").lower() != "local":
+    logging.warning("[임베딩 저장 형식] float16은 Atlas $vectorSearch로 인덱싱되지 않음 → VECTOR_SEARCH_BACKEND=local 필요")
+
+
+def encode_embedding(vector: Sequence[float], mode: str = EMBEDDING_STORAGE) -> Union[List[float], Binary]:
+    """
+    저장 형식에 맞게 임베딩 인코딩 (빈 벡터는 그대로 [])
+    - int8은 벡터별 최대 절댓값 기준 대칭 양자화 (cosine 유사도는 스케일에 무관)
+    """
+    if vector is None or len(vector) == 0:
+        return []
+    if mode == "array":
+        return [float(v) for v in vector]
+
+    values = np.asarray(vector, dtype=np.float32)
+    if mode == "float16":
+        return Binary(values.astype("<f2").tobytes(), FLOAT16_SUBTYPE)
+    if mode == "int8":
+        scale = float(np.abs(values).max()) or 1.0
+        quantized = np.clip(np.rint(values / scale * 127), -127, 127).astype(np.int8)
+        header = BinaryVectorDtype.INT8.value + b"\x00"
+        return Binary(header + quantized.tobytes(), VECTOR_SUBTYPE)
+    raise ValueError(f"지원하지 않는 임베딩 저장 형식: {mode}")
+
+
+def decode_embedding(value: Any) -> Optional[np.ndarray]:
+    """
+    저장된 임베딩을 NumPy 배열로 디코딩
+    - BinData는 복사 없이 버퍼를 그대로 참조 (float16 / int8 / float32 dtype 유지)
+    - int8은 방향만 보존되므로 cosine 계산 용도로 사용
+    """
+    if value is None:
+        return None
+    if isinstance(value, Binary):
+        if value.subtype == FLOAT16_SUBTYPE:
+            return np.frombuffer(value, dtype="<f2")
+        if value.subtype == VECTOR_SUBTYPE and len(value) >= _VECTOR_HEADER_SIZE:
+            dtype = value[0]
+            if dtype == _INT8:
+                return np.frombuffer(value, dtype=np.int8, offset=_VECTOR_HEADER_SIZE)
+            if dtype == _FLOAT32:
+                return np.frombuffer(value, dtype="<f4", offset=_VECTOR_HEADER_SIZE)
+        logging.warning(f"[임베딩 디코딩] 지원하지 않는 BinData 형식: subtype={value.subtype}")
+        return None
+    if isinstance(value, (list, tuple)):
+        return np.asarray(value, dtype=np.float32) if value else None
+    return None
+
+
+def storage_mode_of(value: Any) -> Optional[str]:
+    if isinstance(value, Binary):
+        if value.subtype == FLOAT16_SUBTYPE:
+            return "float16"
+        if value.subtype == VECTOR_SUBTYPE and len(value) and value[0] == _INT8:
+            return "int8"
+        return None
+    if isinstance(value, list):
+        return "array"
+    return None
@@ -0,0 +1,126 @@
+"""
+이력서 ↔ 채용공고 평가 결과 캐시 (eval_cache 컬렉션)
+
+같은 쌍을 다시 평가할 때(결과 새로고침, match_resume 후 compare_resume_posting 등) 모델을 다시 부르지 않음
+- 키: (이력서 텍스트 해시, 공고 텍스트 해시, 모델 ID, 프롬프트 버전)
+- 메모리 LRU → MongoDB 2단 (Mongo 문서는 createdAt TTL 인덱스로 만료)
+- 모델 ID / 프롬프트 버전이 바뀌면 키가 달라져 이전 결과는 쓰이지 않고,
+  첫 조회 시 같은 평가기의 이전 버전 문서를 백그라운드로 삭제
+
+문서 형태: {"_id": 키, "evaluator": "runpod" | "gpt", "version": "모델 ID:프롬프트 버전",
+           "value": 평가 결과, "createdAt": ...}
+"""
+import os
+import copy
+import asyncio
+import hashlib
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from services.cache import LRUCache
+from services.embedding_service import normalize_text
+from db.mongo import get_collection
+
+load_dotenv()
+
+EVAL_CACHE_COLLECTION = "eval_cache"
+EVAL_CACHE_ENABLED = os.getenv("EVAL_CACHE_ENABLED", "true").lower() == "true"
+EVAL_CACHE_MEMORY_SIZE = int(os.getenv("EVAL_CACHE_MEMORY_SIZE", "1000"))
+EVAL_CACHE_TTL_DAYS = float(os.getenv("EVAL_CACHE_TTL_DAYS", "7"))
+
+
+def eval_cache_collection():
+    return get_collection(EVAL_CACHE_COLLECTION)
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text or "").encode("utf-8")).hexdigest()
+
+
+class EvalCache:
+    """
+    평가기 하나(RunPod 모델 / GPT)의 결과 캐시
+    반환값은 복사본 (라우터에서 결과 dict에 필드를 덧붙여도 캐시는 바뀌지 않음)
+    """
+
+    def __init__(self, evaluator: str, model_id: str, prompt_version: str,
+                 memory_size: int = EVAL_CACHE_MEMORY_SIZE, ttl_days: float = EVAL_CACHE_TTL_DAYS):
+        self.evaluator = evaluator
+        self.version = f"{model_id}:{prompt_version}"
+        self.ttl = timedelta(days=ttl_days)
+        self.memory = LRUCache(memory_size, ttl_seconds=self.ttl.total_seconds())
+        self._purge_task: Optional[asyncio.Task] = None
+        self.counts: Counter = Counter()
+
+    def key(self, resume_text: str, job_text: str) -> str:
+        raw = f"{self.evaluator}\0{self.version}\0{_text_hash(resume_text)}\0{_text_hash(job_text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _purge_outdated(self):
+        # 프로세스당 한 번 (루프가 바뀌면 다시) 이전 모델 / 프롬프트 버전의 결과 삭제
+        loop = asyncio.get_running_loop()
+        if self._purge_task is None or self._purge_task.get_loop() is not loop:
+            self._purge_task = loop.create_task(self.purge_outdated())
+
+    async def purge_outdated(self) -> int:
+        try:
+            result = await eval_cache_collection().delete_many(
+                {"evaluator": self.evaluator, "version": {"$ne": self.version}}
+            )
+            if result.deleted_count:
+                logging.info(f"[평가 캐시 이전 버전 삭제] {self.evaluator}: {result.deleted_count}건")
+            return result.deleted_count
+        except Exception as e:
+            logging.error(f"[평가 캐시 이전 버전 삭제 실패]: {e}")
+            return 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not EVAL_CACHE_ENABLED:
+            return None
+        value = self.memory.get(key)
+        if value is None:
+            self._purge_outdated()
+            try:
+                # TTL 인덱스 삭제는 주기적으로 실행되므로 만료 시각을 직접 확인
+                doc = await eval_cache_collection().find_one(
+                    {"_id": key, "createdAt": {"$gt": datetime.utcnow() - self.ttl}}, {"value": 1}
+                )
+            except Exception as e:
+                logging.error(f"[평가 캐시 조회 실패]: {e}")
+                doc = None
+            if doc is None:
+                self.counts["misses"] += 1
+                return None
+            value = doc["value"]
+            self.memory.set(key, value)
+            self.counts["mongo_hits"] += 1
+        else:
+            self.counts["memory_hits"] += 1
+        return copy.deepcopy(value)
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        if not EVAL_CACHE_ENABLED:
+            return
+        value = copy.deepcopy(value)
+        self.memory.set(key, value)
+        try:
+            await eval_cache_collection().replace_one(
+                {"_id": key},
+                {"evaluator": self.evaluator, "version": self.version, "value": value, "createdAt": datetime.utcnow()},
+                upsert=True
+            )
+            self.counts["stored"] += 1
+        except Exception as e:
+            logging.error(f"[평가 캐시 저장 실패]: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": EVAL_CACHE_ENABLED, "version": self.version, "memory": self.memory.stats(), **self.counts}
+
+
+async def create_eval_cache_index():
+    # createdAt 기준 TTL (EVAL_CACHE_TTL_DAYS를 바꾸면 인덱스를 지우고 다시 만들어야 함)
+    await eval_cache_collection().create_index(
+        "createdAt", name="createdAt_ttl", expireAfterSeconds=int(EVAL_CACHE_TTL_DAYS * 86400)
+    )
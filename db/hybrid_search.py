@@ -0,0 +1,86 @@
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, List, Optional
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorCollection
+from services.tokenizer import query_keywords
+
+load_dotenv()
+
+# 검색 방식 (vector: 벡터 검색만 | hybrid: 키워드 + 벡터 결과를 RRF로 결합, 결합 점수는 rrf_score)
+SEARCH_MODES = ("vector", "hybrid")
+SEARCH_MODE = os.getenv("SEARCH_MODE", "vector")
+if SEARCH_MODE not in SEARCH_MODES:
+    raise ValueError(f"SEARCH_MODE 값이 올바르지 않습니다: {SEARCH_MODE}")
+
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))  # 방식별로 가져올 후보 수
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+KEYWORD_INDEX_NAME = "keywords_1"
+
+
+def resolve_search_mode(mode: Optional[str]) -> str:
+    mode = mode or SEARCH_MODE
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"지원하지 않는 검색 방식: {mode}")
+    return mode
+
+
+async def create_keyword_index(collection: AsyncIOMotorCollection):
+    """
+    keywords 배열 필드의 multikey 인덱스 (키워드 → 문서 역색인)
+    """
+    await collection.create_index("keywords", name=KEYWORD_INDEX_NAME)
+    logging.info(f"[키워드 인덱스 확인] {collection.name}.{KEYWORD_INDEX_NAME}")
+
+
+async def keyword_search(collection: AsyncIOMotorCollection, query: str, limit: int,
+                         filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    질의 키워드와 겹치는 키워드 수로 정렬한 후보 (_id, score), filter는 추가 $match 조건
+    """
+    terms = query_keywords(query)
+    if not terms:
+        return []
+    pipeline = [
+        {"$match": {"keywords": {"$in": terms}, **(filter or {})}},
+        # keywords는 문서 안에서 중복이 없으므로 겹치는 항목 수 = 일치 키워드 수
+        {"$project": {
+            "_id": 1,
+            "score": {"$size": {"$filter": {"input": "$keywords", "cond": {"$in": ["$$this", terms]}}}}
+        }},
+        {"$sort": {"score": -1, "_id": 1}},
+        {"$limit": limit}
+    ]
+    return await collection.aggregate(pipeline).to_list(length=None)
+
+
+def reciprocal_rank_fusion(result_lists: Dict[str, List[Dict[str, Any]]], limit: int,
+                           k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Reciprocal Rank Fusion - 점수 척도가 다른 결과 목록을 순위만으로 결합
+    rrf_score = Σ 1 / (k + rank) 순으로 정렬, 방식별 원래 점수는 "{방식}_score"로 남김
+    score는 vector 모드와 같은 의미(벡터 유사도)를 유지 (키워드로만 찾은 문서는 None)
+    """
+    fused: Dict[Any, Dict[str, Any]] = {}
+    for source, hits in result_lists.items():
+        for rank, hit in enumerate(hits, start=1):
+            entry = fused.setdefault(hit["_id"], {"_id": hit["_id"], "rrf_score": 0.0})
+            entry["rrf_score"] += 1.0 / (k + rank)
+            entry[f"{source}_score"] = hit.get("score")
+    for entry in fused.values():
+        entry["score"] = entry.get("vector_score")
+    return sorted(fused.values(), key=lambda hit: hit["rrf_score"], reverse=True)[:limit]
+
+
+async def hybrid_search(collection: AsyncIOMotorCollection, query: str,
+                        vector_hits: Awaitable[List[Dict[str, Any]]], top_k: int,
+                        filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    키워드 검색과 벡터 검색(vector_hits)을 동시에 실행해 RRF로 결합
+    """
+    keyword_hits, vector_hits = await asyncio.gather(
+        keyword_search(collection, query, max(top_k, HYBRID_CANDIDATES), filter), vector_hits
+    )
+    return reciprocal_rank_fusion({"vector": vector_hits, "keyword": keyword_hits}, top_k)
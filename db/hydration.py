@@ -0,0 +1,51 @@
+import os
+from typing import Any, Dict, List
+from dotenv import load_dotenv
+from services.cache import LRUCache
+from db.mongo import get_collection
+
+load_dotenv()
+
+HYDRATION_CACHE_SIZE = int(os.getenv("HYDRATION_CACHE_SIZE", "1024"))
+
+
+class DocumentHydrator:
+    """
+    벡터 검색 결과(_id, score)에 본문 필드를 붙이는 hydration 단계
+    - 캐시에 없는 _id만 모아 한 번의 $in 조회로 가져옴
+    - 문서 필드는 _id 기준 LRU 캐시에 보관
+    """
+
+    def __init__(self, collection_name: str, fields: List[str], cache_size: int = HYDRATION_CACHE_SIZE):
+        self.collection_name = collection_name
+        self.projection = {field: 1 for field in fields}
+        self.cache = LRUCache(cache_size)
+
+    async def _fetch(self, ids: List[Any]) -> Dict[Any, Dict[str, Any]]:
+        cursor = get_collection(self.collection_name).find({"_id": {"$in": ids}}, self.projection)
+        return {doc["_id"]: doc async for doc in cursor}
+
+    async def hydrate(self, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        docs = {}
+        missing = []
+        for hit in hits:
+            cached = self.cache.get(hit["_id"])
+            if cached is None:
+                missing.append(hit["_id"])
+            else:
+                docs[hit["_id"]] = cached
+
+        if missing:
+            fetched = await self._fetch(missing)
+            for oid, doc in fetched.items():
+                self.cache.set(oid, doc)
+            docs.update(fetched)
+
+        # 검색 순서 유지, 그 사이 삭제된 문서는 제외
+        return [{**docs[hit["_id"]], **hit} for hit in hits if hit["_id"] in docs]
+
+    def invalidate(self, oid: Any):
+        self.cache.delete(oid)
+
+    def stats(self) -> Dict[str, int]:
+        return self.cache.stats()
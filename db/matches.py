@@ -0,0 +1,184 @@
+"""
+이력서 ↔ 채용공고 top-K 매칭 테이블 (matches 컬렉션)
+
+문서 형태: {"_id": 원본 문서 _id, "kind": "resume" | "posting",
+           "matches": [{"_id": 상대 문서 _id, "score": 유사도}, ...], "updatedAt": ...}
+
+새 이력서 / 공고가 저장되면 백그라운드 워커가 그 문서의 이웃만 다시 계산
+- 새 문서의 top-K 목록을 저장
+- 후보로 나온 상대 문서들의 목록에는 새 문서를 점수순으로 끼워 넣고 K개로 자름
+"""
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from db.mongo import get_collection
+from db.embedding_codec import decode_embedding
+
+load_dotenv()
+
+MATCHES_COLLECTION = "matches"
+MATCH_TABLE_ENABLED = os.getenv("MATCH_TABLE_ENABLED", "true").lower() == "true"
+MATCH_TOP_K = int(os.getenv("MATCH_TOP_K", "10"))
+MATCH_REVERSE_CANDIDATES = int(os.getenv("MATCH_REVERSE_CANDIDATES", "50"))  # 역방향 갱신을 시도할 후보 수
+MATCH_WORKER_CONCURRENCY = int(os.getenv("MATCH_WORKER_CONCURRENCY", "2"))
+
+MATCH_KINDS = {"resume": "posting", "posting": "resume"}  # 원본 종류 → 매칭 대상 종류
+
+
+def matches_collection():
+    return get_collection(MATCHES_COLLECTION)
+
+
+async def _load_vector(kind: str, oid) -> Optional[List[float]]:
+    from db.postings import POSTINGS_COLLECTION
+    from db.resumes import RESUMES_COLLECTION
+    collection_name = RESUMES_COLLECTION if kind == "resume" else POSTINGS_COLLECTION
+    doc = await get_collection(collection_name).find_one({"_id": oid}, {"embedding": 1})
+    vector = decode_embedding(doc.get("embedding")) if doc else None
+    return None if vector is None or len(vector) == 0 else vector.astype(float).tolist()
+
+
+async def _is_active_posting(oid) -> bool:
+    from db.postings import POSTINGS_COLLECTION, active_posting_filter
+    return await get_collection(POSTINGS_COLLECTION).count_documents({"_id": oid, **active_posting_filter()}, limit=1) > 0
+
+
+async def _search_targets(kind: str, vector: List[float], top_k: int) -> List[Dict[str, Any]]:
+    # postings / resumes 모듈이 이 모듈을 import 하므로 검색 함수는 호출 시점에 가져옴
+    if kind == "resume":
+        from db.postings import search_postings_by_vector, active_posting_filter
+        return await search_postings_by_vector(vector, top_k, active_posting_filter())
+    from db.resumes import search_resumes_by_vector
+    return await search_resumes_by_vector(vector, top_k)
+
+
+async def update_matches_for(kind: str, oid) -> bool:
+    """
+    문서 하나의 top-K 목록을 계산하고, 후보 상대 문서들의 목록에 역방향으로 반영
+    """
+    vector = await _load_vector(kind, oid)
+    if vector is None:
+        return False
+    candidates = await _search_targets(kind, vector, max(MATCH_TOP_K, MATCH_REVERSE_CANDIDATES))
+    entries = [{"_id": hit["_id"], "score": float(hit["score"])} for hit in candidates]
+    now = datetime.utcnow()
+
+    await matches_collection().replace_one(
+        {"_id": oid},
+        {"kind": kind, "matches": entries[:MATCH_TOP_K], "updatedAt": now},
+        upsert=True
+    )
+
+    # 게시 기간 밖의 공고는 이력서 쪽 목록에 넣지 않음 (검색과 같은 기간 조건, 게시 시작일에 다시 반영)
+    if kind == "posting" and not await _is_active_posting(oid):
+        return True
+
+    # 유사도는 대칭이므로 같은 점수로 상대 문서의 목록에 삽입 (이미 있는 경우 제외)
+    operations = [
+        UpdateOne(
+            {"_id": entry["_id"], "matches._id": {"$ne": oid}},
+            {
+                "$push": {"matches": {
+                    "$each": [{"_id": oid, "score": entry["score"]}],
+                    "$sort": {"score": -1},
+                    "$slice": MATCH_TOP_K
+                }},
+                "$set": {"updatedAt": now}
+            }
+        )
+        for entry in entries
+    ]
+    if operations:
+        await matches_collection().bulk_write(operations, ordered=False)
+    return True
+
+
+async def get_matches(kind: str, oid) -> Optional[List[Dict[str, Any]]]:
+    """
+    저장된 top-K 목록 (없으면 그 자리에서 계산해 저장, 원본 문서가 없으면 None)
+    """
+    doc = await matches_collection().find_one({"_id": oid, "kind": kind})
+    if doc is None:
+        if not await update_matches_for(kind, oid):
+            return None
+        doc = await matches_collection().find_one({"_id": oid, "kind": kind})
+    return doc.get("matches", []) if doc else []
+
+
+async def remove_from_matches(ids: Sequence[Any]):
+    """
+    삭제 / 보관된 문서를 매칭 테이블에서 제거 (자기 목록 + 다른 문서 목록 속 항목)
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    collection = matches_collection()
+    await collection.delete_many({"_id": {"$in": ids}})
+    await collection.update_many({"matches._id": {"$in": ids}}, {"$pull": {"matches": {"_id": {"$in": ids}}}})
+
+
+async def create_matches_index():
+    # 역방향 $pull / 중복 확인용
+    await matches_collection().create_index("matches._id", name="matches_id_1")
+
+
+class MatchUpdater:
+    """
+    새로 저장된 문서의 매칭 갱신을 요청 경로 밖에서 처리하는 백그라운드 워커
+    (큐에는 _id만 넣고 임베딩은 워커가 DB에서 읽음)
+    """
+
+    def __init__(self, concurrency: int = MATCH_WORKER_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    def _bind_loop(self):
+        # asyncio.run()으로 새 루프가 생기는 경우(스크립트 등) 이전 루프의 큐 / 워커는 버림
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._workers = []
+        return loop
+
+    def submit(self, kind: str, ids: Sequence[Any]):
+        if not MATCH_TABLE_ENABLED or not ids:
+            return
+        loop = self._bind_loop()
+        for oid in ids:
+            self._queue.put_nowait((kind, oid))
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.concurrency:
+            self._workers.append(loop.create_task(self._run()))
+
+    async def _run(self):
+        while True:
+            kind, oid = await self._queue.get()
+            try:
+                await update_matches_for(kind, oid)
+            except Exception as e:
+                logging.error(f"[매칭 테이블 갱신 실패] {kind} {oid}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def join(self):
+        # 큐에 쌓인 갱신이 모두 끝날 때까지 대기 (스크립트 / 일괄 재계산용)
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+
+match_updater = MatchUpdater()
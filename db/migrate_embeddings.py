@@ -0,0 +1,77 @@
+"""
+기존 postings / resumes 문서와 청크(posting_chunks / resume_chunks)의 embedding 필드를 다른 저장 형식으로 변환
+(청크 벡터 인덱스도 EMBEDDING_DIMENSIONS를 따르므로 차원 축소 시 청크까지 함께 변환해야 max 집계 검색이 유지됨)
+
+사용 예:
+    python -m db.migrate_embeddings --mode int8
+    python -m db.migrate_embeddings --mode float16 --collection resumes --dry-run
+    python -m db.migrate_embeddings --mode array --dimensions 512
+"""
+import os
+import argparse
+import logging
+import certifi
+import numpy as np
+from typing import Optional
+from pymongo import MongoClient, UpdateOne
+from dotenv import load_dotenv
+from db.embedding_codec import EMBEDDING_STORAGE_MODES, encode_embedding, decode_embedding, storage_mode_of
+
+load_dotenv()
+logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+# embedding 필드가 있는 컬렉션 (기본값: 전부)
+EMBEDDING_COLLECTIONS = ["postings", "resumes", "posting_chunks", "resume_chunks"]
+
+
+def migrate_collection(collection, mode: str, batch_size: int = 500, dry_run: bool = False,
+                       dimensions: Optional[int] = None) -> dict:
+    report = {"collection": collection.name, "scanned": 0, "converted": 0, "skipped": 0}
+    operations = []
+
+    cursor = collection.find({"embedding": {"$exists": True}}, {"embedding": 1}).batch_size(batch_size)
+    for doc in cursor:
+        report["scanned"] += 1
+        value = doc.get("embedding")
+        vector = decode_embedding(value)
+        truncate = dimensions is not None and vector is not None and len(vector) > dimensions
+        if vector is None or (storage_mode_of(value) == mode and not truncate):
+            report["skipped"] += 1
+            continue
+        if truncate:
+            # Matryoshka 축소: 앞부분만 남기고 재정규화
+            vector = vector[:dimensions].astype(np.float32)
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"embedding": encode_embedding(vector, mode)}}))
+        report["converted"] += 1
+        if len(operations) >= batch_size:
+            if not dry_run:
+                collection.bulk_write(operations, ordered=False)
+            operations = []
+            logging.info(f"[임베딩 변환 진행] {collection.name}: {report['converted']}건")
+
+    if operations and not dry_run:
+        collection.bulk_write(operations, ordered=False)
+
+    logging.info(f"[임베딩 변환 완료] {report}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="embedding 필드 저장 형식 변환")
+    parser.add_argument("--mode", required=True, choices=EMBEDDING_STORAGE_MODES)
+    parser.add_argument("--collection", nargs="+", choices=EMBEDDING_COLLECTIONS, default=EMBEDDING_COLLECTIONS)
+    parser.add_argument("--dimensions", type=int, default=None, help="지정 시 앞부분만 남겨 차원 축소")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv("MONGODB_URI"), tlsCAFile=certifi.where())
+    db = client["Rezoom"]
+    for name in args.collection:
+        migrate_collection(db[name], args.mode, args.batch_size, args.dry_run, args.dimensions)
+
+
+if __name__ == "__main__":
+    main()
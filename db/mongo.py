@@ -0,0 +1,83 @@
+import os
+import asyncio
+import logging
+import certifi
+from typing import Optional
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import ReadPreference
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URI")
+MONGO_DB_NAME = "Rezoom"
+
+# 커넥션 풀 설정
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+
+# 벡터 검색 읽기 노드 (primary | primaryPreferred | secondary | secondaryPreferred | nearest)
+MONGO_VECTOR_SEARCH_READ_PREFERENCE = os.getenv("MONGO_VECTOR_SEARCH_READ_PREFERENCE", "primary")
+
+_READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+if MONGO_VECTOR_SEARCH_READ_PREFERENCE not in _READ_PREFERENCES:
+    raise ValueError(f"MONGO_VECTOR_SEARCH_READ_PREFERENCE 값이 올바르지 않습니다: {MONGO_VECTOR_SEARCH_READ_PREFERENCE}")
+
+# 공용 비동기 클라이언트 (FastAPI lifespan에서 생성 / 종료, 스크립트에서는 첫 사용 시 생성)
+_client: Optional[AsyncIOMotorClient] = None
+
+
+def connect_mongo() -> AsyncIOMotorClient:
+    global _client
+    if _client is None:
+        # 생성자는 서버에 접속하지 않으므로 Mongo가 잠시 내려가 있어도 기동은 막히지 않음
+        _client = AsyncIOMotorClient(
+            MONGODB_URI,
+            tlsCAFile=certifi.where(),
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        )
+    return _client
+
+
+def close_mongo():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    return connect_mongo()[MONGO_DB_NAME]
+
+
+def get_collection(name: str) -> AsyncIOMotorCollection:
+    return get_database()[name]
+
+
+def get_vector_search_collection(name: str) -> AsyncIOMotorCollection:
+    """
+    벡터 검색 전용 컬렉션 핸들 (설정에 따라 secondary 노드로 읽기 분산)
+    """
+    return get_database()[name].with_options(
+        read_preference=_READ_PREFERENCES[MONGO_VECTOR_SEARCH_READ_PREFERENCE]
+    )
+
+
+async def ping_mongo(timeout: float = 2.0) -> bool:
+    try:
+        await asyncio.wait_for(connect_mongo().admin.command("ping"), timeout=timeout)
+        return True
+    except Exception as e:
+        logging.warning(f"[MongoDB ping 실패]: {e}")
+        return False
@@ -0,0 +1,292 @@
+"""
+채용공고 PDF 일괄 적재 파이프라인 (폴더 → postings)
+
+단계별로 워커 수를 따로 제한하고, 단계 사이는 크기 제한 큐로 연결 (뒤 단계가 밀리면 앞 단계도 대기)
+    파일 읽기 / 내용 해시 → OCR (POSTING_IMPORT_OCR_CONCURRENCY)
+    → 중복 검사 + 임베딩 (POSTING_IMPORT_EMBED_CONCURRENCY)
+    → 배치 저장 (POSTING_IMPORT_BATCH_SIZE개씩 insert_many)
+
+파일별 결과는 posting_import_manifest 컬렉션에 기록
+    {"_id": 파일명, "content_hash", "status": stored | duplicate | failed, "object_id", "error",
+     "duplicate_of": 같은 배치 안에서 먼저 처리된 중복 파일명, "run_id", "updatedAt"}
+다시 실행하면 내용이 같은 파일 중 stored / duplicate는 건너뛰고 나머지만 처리
+(가리키는 공고가 삭제 / 보관되어 postings에 없으면 다시 적재)
+(중간에 끊긴 파일의 OCR 결과는 내용 해시 캐시에 남아 있어 다시 요청하지 않음)
+
+    python -m db.admin import-postings [폴더]
+"""
+import os
+import time
+import uuid
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from bson import ObjectId
+from pymongo import UpdateOne
+from services.ocr_client import OCR_MAX_CONCURRENCY
+from services.ocr_service import extract_document, hash_stream
+from services.chunking import embed_document
+from db.dedup import dedup_fields, skip_insert
+from db.postings import postings_collection, postings_dedup, build_posting_document, insert_postings, refresh_posting_period
+from db.mongo import get_collection
+
+load_dotenv()
+
+POSTING_IMPORT_DIR = os.getenv("POSTING_IMPORT_DIR", "document")
+POSTING_IMPORT_MANIFEST_COLLECTION = "posting_import_manifest"
+POSTING_IMPORT_OCR_CONCURRENCY = int(os.getenv("POSTING_IMPORT_OCR_CONCURRENCY", str(OCR_MAX_CONCURRENCY)))
+POSTING_IMPORT_EMBED_CONCURRENCY = int(os.getenv("POSTING_IMPORT_EMBED_CONCURRENCY", "4"))
+POSTING_IMPORT_BATCH_SIZE = int(os.getenv("POSTING_IMPORT_BATCH_SIZE", "50"))
+POSTING_IMPORT_DEFAULT_DAYS = int(os.getenv("POSTING_IMPORT_DEFAULT_DAYS", "30"))  # 게시 기간을 지정하지 않았을 때
+
+_DONE_STATUSES = ["stored", "duplicate"]
+_BATCH_WAIT_SECONDS = 0.5  # 배치를 채우려고 기다리는 최대 시간
+_EXISTS_CHECK_BATCH_SIZE = 1000
+
+# 현재 / 마지막 실행 진행 상태 (진행 상황 API에서 노출)
+import_state: Dict[str, Any] = {"run_id": None, "status": "idle"}
+_import_task: Optional[asyncio.Task] = None
+
+
+def manifest_collection():
+    return get_collection(POSTING_IMPORT_MANIFEST_COLLECTION)
+
+
+async def _record(entries: List[Dict[str, Any]], run_id: str):
+    if not entries:
+        return
+    now = datetime.utcnow()
+    await manifest_collection().bulk_write([
+        UpdateOne({"_id": entry["filename"]}, {"$set": {
+            "content_hash": entry["content_hash"],
+            "status": entry["status"],
+            "object_id": entry.get("object_id"),
+            "error": entry.get("error"),
+            "duplicate_of": entry.get("duplicate_of"),
+            "run_id": run_id,
+            "updatedAt": now
+        }}, upsert=True)
+        for entry in entries
+    ], ordered=False)
+
+
+async def _finished_files() -> Dict[str, str]:
+    """
+    다시 처리하지 않아도 되는 파일 → 내용 해시
+    stored / duplicate로 기록됐어도 가리키는 공고가 삭제 / 보관되어 postings에 없으면 다시 적재
+    """
+    entries = [
+        doc async for doc in manifest_collection().find(
+            {"status": {"$in": _DONE_STATUSES}}, {"content_hash": 1, "object_id": 1}
+        )
+    ]
+    object_ids = list({ObjectId(doc["object_id"]) for doc in entries if ObjectId.is_valid(doc.get("object_id") or "")})
+    existing = set()
+    for i in range(0, len(object_ids), _EXISTS_CHECK_BATCH_SIZE):
+        cursor = postings_collection().find({"_id": {"$in": object_ids[i:i + _EXISTS_CHECK_BATCH_SIZE]}}, {"_id": 1})
+        existing.update([str(doc["_id"]) async for doc in cursor])
+    return {doc["_id"]: doc.get("content_hash") for doc in entries if doc.get("object_id") in existing}
+
+
+async def import_postings(directory: str = POSTING_IMPORT_DIR, start_day: Optional[date] = None,
+                          end_day: Optional[date] = None) -> Dict[str, Any]:
+    """
+    폴더의 PDF 전체 적재 → 실행 보고서 (진행 중에는 import_state에 같은 내용이 갱신됨)
+    start_day / end_day 생략 시 오늘부터 POSTING_IMPORT_DEFAULT_DAYS일
+    """
+    start_day = start_day or date.today()
+    end_day = end_day or start_day + timedelta(days=POSTING_IMPORT_DEFAULT_DAYS)
+    run_id = uuid.uuid4().hex[:12]
+    report = import_state
+    report.clear()
+    report.update({
+        "run_id": run_id, "status": "running", "directory": directory,
+        "total": 0, "skipped": 0, "ocr_done": 0, "embedded": 0,
+        "stored": 0, "duplicate": 0, "failed": 0,
+        "started_at": datetime.utcnow(), "finished_at": None, "elapsed_time": 0.0
+    })
+    start = time.time()
+
+    try:
+        filenames = sorted(f for f in os.listdir(directory) if f.lower().endswith(".pdf"))
+        report["total"] = len(filenames)
+        finished = await _finished_files()
+
+        ocr_queue: asyncio.Queue = asyncio.Queue()
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=POSTING_IMPORT_EMBED_CONCURRENCY * 2)
+        insert_queue: asyncio.Queue = asyncio.Queue(maxsize=POSTING_IMPORT_BATCH_SIZE * 2)
+
+        async def fail(filename: str, content_hash: Optional[str], error: Any):
+            report["failed"] += 1
+            logging.error(f"[공고 일괄 적재 실패] {filename}: {error}")
+            await _record([{"filename": filename, "content_hash": content_hash, "status": "failed", "error": error}], run_id)
+
+        async def ocr_worker():
+            while (filename := await ocr_queue.get()) is not None:
+                content_hash = None
+                try:
+                    # 파일은 연 채로 스트리밍 (해시 / 텍스트 레이어 / OCR 전송 모두 청크 단위)
+                    with open(os.path.join(directory, filename), "rb") as f:
+                        # 크기 제한은 extract_document에서 확인해 failed로 기록
+                        content_hash, _ = await asyncio.to_thread(hash_stream, f, float("inf"))
+                        if finished.get(filename) == content_hash:
+                            report["skipped"] += 1
+                            continue
+                        extracted = await extract_document(filename, f, "application/pdf")
+                    text = extracted["text"]
+                    if not text or len(text.strip()) < 10:
+                        await fail(filename, content_hash, extracted.get("error") or "텍스트 없음")
+                        continue
+                    report["ocr_done"] += 1
+                    await embed_queue.put((filename, content_hash, text))
+                except Exception as e:
+                    await fail(filename, content_hash, getattr(e, "detail", None) or str(e))
+
+        async def embed_worker():
+            while (item := await embed_queue.get()) is not None:
+                filename, content_hash, text = item
+                try:
+                    # 임베딩 전에 이미 저장된 공고와 비교 (같은 배치 안의 중복은 저장 단계에서 다시 확인)
+                    fields = dedup_fields(text)
+                    duplicate = await postings_dedup.find_duplicate(fields)
+                    if skip_insert(duplicate):
+                        report["duplicate"] += 1
+                        if duplicate["duplicate"] == "exact":
+                            await refresh_posting_period(duplicate["_id"], start_day, end_day)
+                        await _record([{"filename": filename, "content_hash": content_hash,
+                                        "status": "duplicate", "object_id": str(duplicate["_id"])}], run_id)
+                        continue
+                    embedding, chunks = await embed_document(text)
+                    if not embedding:
+                        await fail(filename, content_hash, "임베딩 생성 실패")
+                        continue
+                    doc = build_posting_document(text, embedding, fields, start_day, end_day, duplicate)
+                    report["embedded"] += 1
+                    await insert_queue.put((filename, content_hash, doc, chunks))
+                except Exception as e:
+                    await fail(filename, content_hash, str(e))
+
+        async def insert_worker():
+            done = False
+            while not done:
+                item = await insert_queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                while len(batch) < POSTING_IMPORT_BATCH_SIZE:
+                    try:
+                        item = await asyncio.wait_for(insert_queue.get(), _BATCH_WAIT_SECONDS)
+                    except asyncio.TimeoutError:
+                        break
+                    if item is None:
+                        done = True
+                        break
+                    batch.append(item)
+                await store_batch(batch)
+
+        async def store_batch(batch: List[tuple]):
+            entries = []
+            try:
+                duplicates = await postings_dedup.find_duplicates([doc for _, _, doc, _ in batch])
+                ready = []
+                for (filename, content_hash, doc, chunks), duplicate in zip(batch, duplicates):
+                    # 같은 배치 안의 앞선 파일과 중복이면 그 파일명도 기록 (_id는 저장 전에 정해 둔 값)
+                    duplicate_of = batch[duplicate["index"]][0] if duplicate and "index" in duplicate else None
+                    if skip_insert(duplicate):
+                        report["duplicate"] += 1
+                        entries.append({"filename": filename, "content_hash": content_hash, "status": "duplicate",
+                                        "object_id": str(duplicate["_id"]), "duplicate_of": duplicate_of})
+                    else:
+                        if duplicate and "near_duplicate_of" not in doc:
+                            doc["near_duplicate_of"] = duplicate["_id"]
+                        ready.append((filename, content_hash, doc, chunks))
+                inserted = await insert_postings([doc for _, _, doc, _ in ready], [chunks for _, _, _, chunks in ready])
+                inserted_ids = {id(doc) for doc in inserted}
+                for filename, content_hash, doc, _ in ready:
+                    if id(doc) in inserted_ids:
+                        report["stored"] += 1
+                        entries.append({"filename": filename, "content_hash": content_hash,
+                                        "status": "stored", "object_id": str(doc["_id"])})
+                    elif (existing := await postings_dedup.find_exact(doc["content_hash"])) is not None:
+                        # 다른 요청이 같은 공고를 먼저 저장해 고유 인덱스로 거부됨
+                        report["duplicate"] += 1
+                        await refresh_posting_period(existing, start_day, end_day)
+                        entries.append({"filename": filename, "content_hash": content_hash, "status": "duplicate",
+                                        "object_id": str(existing), "duplicate_of": None})
+                    else:
+                        report["failed"] += 1
+                        entries.append({"filename": filename, "content_hash": content_hash,
+                                        "status": "failed", "error": "MongoDB 저장 실패"})
+            except Exception as e:
+                logging.error(f"[공고 일괄 저장 실패] {len(batch)}건: {e}")
+                report["failed"] += len(batch) - len(entries)
+                recorded = {entry["filename"] for entry in entries}
+                entries += [{"filename": filename, "content_hash": content_hash, "status": "failed", "error": str(e)}
+                            for filename, content_hash, _, _ in batch if filename not in recorded]
+            await _record(entries, run_id)
+            logging.info(
+                f"[공고 일괄 적재 진행] {report['stored'] + report['duplicate'] + report['failed'] + report['skipped']}"
+                f" / {report['total']} (저장 {report['stored']})"
+            )
+
+        for filename in filenames:
+            ocr_queue.put_nowait(filename)
+        ocr_workers = [asyncio.create_task(ocr_worker()) for _ in range(max(1, POSTING_IMPORT_OCR_CONCURRENCY))]
+        embed_workers = [asyncio.create_task(embed_worker()) for _ in range(max(1, POSTING_IMPORT_EMBED_CONCURRENCY))]
+        insert_task = asyncio.create_task(insert_worker())
+        try:
+            # 앞 단계 워커가 모두 끝난 뒤 다음 단계에 종료 신호 전달
+            for _ in ocr_workers:
+                ocr_queue.put_nowait(None)
+            await asyncio.gather(*ocr_workers)
+            for _ in embed_workers:
+                await embed_queue.put(None)
+            await asyncio.gather(*embed_workers)
+            await insert_queue.put(None)
+            await insert_task
+        finally:
+            for task in [*ocr_workers, *embed_workers, insert_task]:
+                task.cancel()
+        report["status"] = "finished"
+    except asyncio.CancelledError:
+        report["status"] = "cancelled"
+        raise
+    except Exception as e:
+        logging.error(f"[공고 일괄 적재 중단]: {e}")
+        report["status"] = "failed"
+        report["error"] = str(e)
+    finally:
+        report["finished_at"] = datetime.utcnow()
+        report["elapsed_time"] = round(time.time() - start, 2)
+    logging.info(f"[공고 일괄 적재 완료] {report}")
+    return dict(report)
+
+
+def start_posting_import(directory: str = POSTING_IMPORT_DIR, start_day: Optional[date] = None,
+                         end_day: Optional[date] = None) -> Dict[str, Any]:
+    """
+    백그라운드로 적재 시작 (이미 실행 중이면 새로 시작하지 않고 현재 상태 반환)
+    """
+    global _import_task
+    if _import_task is None or _import_task.done():
+        import_state.update({"run_id": None, "status": "starting"})
+        _import_task = asyncio.create_task(import_postings(directory, start_day, end_day))
+    return dict(import_state)
+
+
+async def cancel_posting_import():
+    # 서버 종료 시 진행 중인 적재 중단 (manifest에 기록된 파일은 다음 실행에서 건너뜀)
+    if _import_task is not None and not _import_task.done():
+        _import_task.cancel()
+        await asyncio.gather(_import_task, return_exceptions=True)
+
+
+async def import_progress() -> Dict[str, Any]:
+    """
+    현재 / 마지막 실행 진행 상태 + manifest 전체의 상태별 파일 수
+    """
+    pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+    manifest = {doc["_id"]: doc["count"] async for doc in manifest_collection().aggregate(pipeline)}
+    return {**import_state, "manifest": manifest}
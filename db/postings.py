@@ -1,150 +1,301 @@
-from typing import List, Dict, Any
-import os
+from typing import List, Dict, Any, Tuple
 import logging
 import asyncio
-from pymongo import MongoClient
-from pymongo.operations import SearchIndexModel
-from pymongo.errors import OperationFailure
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+import os
 from dotenv import load_dotenv
 from typing import Optional
-import certifi
-from openai import OpenAI
 from datetime import datetime, date, time
+from services.embedding_service import get_embedding, EMBEDDING_DIMENSIONS
+from db.vector_index import create_local_index, local_vector_search, vector_index_fields, ensure_vector_search_index
+from db.embedding_codec import encode_embedding, decode_embedding
+from db.hydration import DocumentHydrator
+from db.matches import match_updater, remove_from_matches
+from db.dedup import DUPLICATE_KEY_ERROR, DedupIndex, dedup_fields, skip_insert
+from db.chunks import ChunkStore, resolve_chunk_aggregation, merge_max_scores
+from services.chunking import embed_document
+from db.hybrid_search import HYBRID_CANDIDATES, resolve_search_mode, hybrid_search
+from services.tokenizer import extract_keywords
+from db.mongo import get_collection, get_vector_search_collection
 # 환경 설정
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
-# MongoDB 연결
-ca = certifi.where()
-client = MongoClient(os.getenv("MONGODB_URI"), tlsCAFile=ca)
-db = client["Rezoom"]
-postings_collection = db["postings"]
+# MongoDB 컬렉션 (공용 클라이언트는 db.mongo / FastAPI lifespan에서 관리)
+POSTINGS_COLLECTION = "postings"
+POSTINGS_ARCHIVE_COLLECTION = "postings_archive"  # 만료 공고 보관용 (벡터 인덱스 없음)
+POSTING_ARCHIVE_BATCH_SIZE = int(os.getenv("POSTING_ARCHIVE_BATCH_SIZE", "500"))
+
+
+def postings_collection():
+    return get_collection(POSTINGS_COLLECTION)
+
 
-# OpenAI client 초기화
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-EMBEDDING_MODEL = "text-embedding-3-small"
+def postings_search_collection():
+    return get_vector_search_collection(POSTINGS_COLLECTION)
 
-# MongoDB 연결 테스트
-try:
-    client.admin.command('ping')
-    logging.info("MongoDB Atlas 연결 성공!")
 
-    doc_count = postings_collection.count_documents({})
-    logging.info(f"현재 컬렉션의 문서 수: {doc_count}")
+# 로컬 벡터 인덱스 (VECTOR_SEARCH_BACKEND=local 일 때만 생성, 첫 검색 시 구성)
+postings_index = create_local_index("postings", EMBEDDING_DIMENSIONS)
 
-    index_info = postings_collection.index_information()
-    logging.info(f"현재 생성된 인덱스 정보:\n{index_info}")
+# 긴 공고의 청크 벡터 (기간 필드는 청크 검색 사전 필터용으로 복사)
+posting_chunks = ChunkStore("posting_chunks", ["startDay", "endDay"])
 
-except Exception as e:
-    logging.error(f"MongoDB Atlas 연결 실패: {str(e)}")
-    raise e
+# 저장 전 중복 검사
+postings_dedup = DedupIndex(POSTINGS_COLLECTION)
 
-# 임베딩 생성 함수
+# 검색 결과 hydration (벡터 검색은 _id / score만, 본문은 $in 일괄 조회 + LRU 캐시)
+postings_hydrator = DocumentHydrator(
+    POSTINGS_COLLECTION, ["original_text", "title", "description", "url", "startDay", "endDay"]
+)
+
+# 임베딩 생성 함수 (공용 배칭 임베딩 서비스 사용)
 async def get_embedding_async(text: str) -> List[float]:
     if not text or not text.strip():
         logging.warning("[임베딩 요청 차단] 빈 텍스트")
         return[]
-    return await asyncio.to_thread(_sync_get_embedding, text)
+    return await get_embedding(text)
+
+# 채용공고 저장 (긴 공고는 청크로 나눠 임베딩, 대표 벡터는 청크 평균)
+# → (object_id, 중복 여부 None | "exact" | "near"), 중복이면 임베딩 / 저장 없이 기존 object_id 반환
+#   (본문이 같은 공고는 기존 문서의 게시 기간을 새 기간으로 갱신)
+def build_posting_document(job_text: str, embedding: List[float], fields: Dict[str, Any], start_day: date,
+                           end_day: date, duplicate: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    doc = {
+        "_id": ObjectId(),  # 저장 전 일괄 중복 검사에서 앞선 문서를 가리킬 수 있도록 미리 지정
+        "original_text": job_text,
+        "embedding": encode_embedding(embedding),
+        "keywords": extract_keywords(job_text),
+        "source": "pdf",
+        "startDay": datetime.combine(start_day, time.min),
+        "endDay": datetime.combine(end_day, time.min),
+        **fields
+    }
+    if duplicate:
+        doc["near_duplicate_of"] = duplicate["_id"]
+    return doc
+
 
-def _sync_get_embedding(text: str) -> List[float]:
-    if not text.strip():
-        logging.error("임베딩 요청 텍스트가 비어 있음")
+async def insert_postings(documents: List[Dict[str, Any]],
+                          chunks_by_document: List[List[Tuple[str, List[float]]]]) -> List[Dict[str, Any]]:
+    """
+    insert_many 후 로컬 인덱스 / 청크 / 매칭 테이블 반영 → 저장된 문서 목록 (_id 포함)
+    """
+    if not documents:
         return []
     try:
-        response = openai_client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=[text.strip()]
+        await postings_collection().insert_many(documents, ordered=False)
+        failed = set()
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        failed = {err["index"] for err in errors}
+        # 고유 인덱스로 거부된 중복은 호출한 쪽에서 기존 문서로 처리
+        duplicates = sum(1 for err in errors if err.get("code") == DUPLICATE_KEY_ERROR)
+        if len(failed) > duplicates:
+            logging.error(f"[채용공고 일부 저장 실패]: {len(failed) - duplicates}건")
+    inserted = [(doc, chunks) for i, (doc, chunks) in enumerate(zip(documents, chunks_by_document)) if i not in failed]
+    if postings_index is not None and postings_index.loaded:
+        await asyncio.to_thread(
+            postings_index.add, [doc["_id"] for doc, _ in inserted], [decode_embedding(doc["embedding"]) for doc, _ in inserted]
         )
-        embedding = response.data[0].embedding
-        if not embedding or len(embedding) != 1536:
-            logging.error(f"[임베딩 오류] 벡터 길이 오류: {len(embedding)}")
-            return []
-        return embedding
-    except Exception as e:
-        logging.error(f"[임베딩 생성 실패]: {e}")
-        return []
+    await posting_chunks.insert([(doc["_id"], chunks, doc) for doc, chunks in inserted])
+    match_updater.submit("posting", [doc["_id"] for doc, _ in inserted])
+    return [doc for doc, _ in inserted]
 
-# 채용공고 저장
-async def store_job_posting(job_text: str, start_day: date, end_day: date) -> str:
+
+async def refresh_posting_period(oid: Any, start_day: date, end_day: date) -> bool:
+    """
+    같은 본문의 공고가 다른 게시 기간으로 다시 올라온 경우 기존 문서의 기간을 새 기간으로 갱신
+    (보관된 공고는 postings에 없으므로 중복으로 잡히지 않고 새로 저장됨)
+    """
+    period = {"startDay": datetime.combine(start_day, time.min), "endDay": datetime.combine(end_day, time.min)}
+    result = await postings_collection().update_one(
+        {"_id": oid, "$or": [{"startDay": {"$ne": period["startDay"]}}, {"endDay": {"$ne": period["endDay"]}}]},
+        {"$set": period}
+    )
+    if not result.modified_count:
+        return False
+    await posting_chunks.update_fields(oid, period)
+    postings_hydrator.invalidate(oid)
+    # 게시 기간이 바뀌면 이력서 쪽 매칭 목록 포함 여부도 달라짐
+    match_updater.submit("posting", [oid])
+    logging.info(f"[채용공고 재게시] {oid} 게시 기간 갱신 → {start_day} ~ {end_day}")
+    return True
+
+
+async def store_job_posting(job_text: str, start_day: date, end_day: date) -> Tuple[str, Optional[str]]:
     try:
-        embedding = await get_embedding_async(job_text)
-        doc = {
-            "original_text": job_text,
-            "embedding": embedding,
-            "source": "pdf",
-            "startDay": datetime.combine(start_day, time.min),
-            "endDay": datetime.combine(end_day, time.min)      
-        }
-        result = postings_collection.insert_one(doc)
-        return str(result.inserted_id)
+        fields = dedup_fields(job_text)
+        duplicate = await postings_dedup.find_duplicate(fields)
+        if skip_insert(duplicate):
+            logging.info(f"[채용공고 중복] {duplicate['duplicate']} → {duplicate['_id']}")
+            if duplicate["duplicate"] == "exact":
+                await refresh_posting_period(duplicate["_id"], start_day, end_day)
+            return str(duplicate["_id"]), duplicate["duplicate"]
+
+        embedding, chunks = await embed_document(job_text)
+        if not embedding:
+            logging.error("[PDF 채용공고 저장 실패]: 임베딩 생성 실패")
+            return "", None
+        doc = build_posting_document(job_text, embedding, fields, start_day, end_day, duplicate)
+        if not await insert_postings([doc], [chunks]):
+            # 중복 검사 이후 같은 공고가 먼저 저장되어 고유 인덱스로 거부된 경우 (동시 업로드)
+            existing = await postings_dedup.find_exact(fields["content_hash"])
+            if existing is None:
+                return "", None
+            logging.info(f"[채용공고 중복] exact → {existing}")
+            await refresh_posting_period(existing, start_day, end_day)
+            return str(existing), "exact"
+        return str(doc["_id"]), duplicate["duplicate"] if duplicate else None
     except Exception as e:
         logging.error(f"[PDF 채용공고 저장 실패]: {e}")
-        return ""
+        return "", None
     
     
 
 # 문서 개수 확인
-def get_document_count():
-    return postings_collection.count_documents({})
+async def get_document_count():
+    return await postings_collection().count_documents({})
+
+# 게시 기간 필터 (기준일에 startDay <= 기준일 <= endDay 인 공고만)
+def active_posting_filter(on: Optional[date] = None) -> Dict[str, Any]:
+    day = datetime.combine(on or date.today(), time.min)
+    return {"startDay": {"$lte": day}, "endDay": {"$gte": day}}
+
+
+def is_active_posting(doc: Dict[str, Any], on: Optional[date] = None) -> bool:
+    # active_posting_filter와 같은 조건을 이미 읽어 온 문서에 적용
+    day = datetime.combine(on or date.today(), time.min)
+    start_day, end_day = doc.get("startDay"), doc.get("endDay")
+    return start_day is not None and end_day is not None and start_day <= day <= end_day
+
+
+async def opened_posting_ids(after: date, until: date) -> List[Any]:
+    # after < startDay <= until 인 공고 (게시가 시작되어 이력서 쪽 매칭 목록에 들어가야 하는 공고)
+    cursor = postings_collection().find(
+        {"startDay": {"$gt": datetime.combine(after, time.min), "$lte": datetime.combine(until, time.min)}}, {"_id": 1}
+    )
+    return [doc["_id"] async for doc in cursor]
+
 
 # 유사도 검색 함수
-async def search_similar_postings_with_score(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-    query_vector = await get_embedding_async(query)
+# - mode: vector | hybrid (생략 시 SEARCH_MODE 설정)
+# - aggregation: mean (공고 평균 벡터) | max (평균 벡터 + 청크 벡터 중 최고 점수), 생략 시 CHUNK_AGGREGATION 설정
+# - 기본은 오늘 게시 중인 공고만 검색, include_expired=True면 기간 조건 없이 검색
+async def search_similar_postings_with_score(
+    query: str,
+    top_k: int = 5,
+    mode: Optional[str] = None,
+    active_on: Optional[date] = None,
+    include_expired: bool = False,
+    aggregation: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    mode = resolve_search_mode(mode)
+    aggregation = resolve_chunk_aggregation(aggregation)
+    search_filter = None if include_expired else active_posting_filter(active_on)
+    # 긴 질의(이력서 전문)도 청크 평균 벡터로 검색
+    query_vector, _ = await embed_document(query)
     if not query_vector:
         raise ValueError("임베딩 벡터가 비어있음 ㅎ")
+    if mode == "hybrid":
+        hits = await hybrid_search(
+            postings_search_collection(), query,
+            search_postings_by_vector(query_vector, max(top_k, HYBRID_CANDIDATES), search_filter, aggregation),
+            top_k, search_filter
+        )
+    else:
+        hits = await search_postings_by_vector(query_vector, top_k, search_filter, aggregation)
+    return await postings_hydrator.hydrate(hits)
+
+
+async def search_postings_by_vector(query_vector: List[float], top_k: int,
+                                    search_filter: Optional[Dict[str, Any]] = None,
+                                    aggregation: Optional[str] = None) -> List[Dict[str, Any]]:
+    if postings_index is not None:
+        document_hits = local_vector_search(
+            postings_index, postings_search_collection(), query_vector, top_k, search_filter
+        )
+    else:
+        document_hits = _atlas_vector_search(query_vector, top_k, search_filter)
+    if resolve_chunk_aggregation(aggregation) == "mean":
+        return await document_hits
+    document_hits, chunk_hits = await asyncio.gather(
+        document_hits, posting_chunks.search(query_vector, top_k, search_filter)
+    )
+    return merge_max_scores(document_hits, chunk_hits, limit=top_k)
+
+
+async def _atlas_vector_search(query_vector: List[float], top_k: int,
+                               search_filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    vector_search = {
+        "index": "vector_index",
+        "queryVector": query_vector,
+        "path": "embedding",
+        "numCandidates": max(100, top_k),
+        "limit": top_k,
+        "similarity": "cosine"
+    }
+    if search_filter:
+        # 인덱스에 filter 필드로 등록된 startDay / endDay로 사전 필터링
+        vector_search["filter"] = search_filter
     pipeline = [
-        {
-            "$vectorSearch": {
-                "index": "vector_index",
-                "queryVector": query_vector,
-                "path": "embedding",
-                "numCandidates": 100,
-                "limit": top_k,
-                "similarity": "cosine"
-            }
-        },
+        {"$vectorSearch": vector_search},
         {
             "$project": {
                 "_id": 1,
-                "title": 1,
-                "description": 1,
-                "url": 1,
-                "score": {"$meta": "vectorSearchScore"},
-                "startDay":1,
-                "endDay":1
+                "score": {"$meta": "vectorSearchScore"}
             }
         }
     ]
-    return list(postings_collection.aggregate(pipeline))
-
-# 벡터 인덱스 생성
-def create_vector_index_if_not_exists():
-    index_name = "vector_index"
-    existing_indexes = postings_collection.list_search_indexes()
-    if index_name in [idx["name"] for idx in existing_indexes]:
-        logging.info(f"'{index_name}' posting 컬렉션의 인덱스 이미 존재")
-        return
-
-    index_model = SearchIndexModel(
-        definition={
-            "fields": [
-                {
-                    "type": "vector",
-                    "path": "embedding",
-                    "numDimensions": 1536,
-                    "similarity": "cosine"
-                }
-            ]
-        },
-        name=index_name,
-        type="vectorSearch"
-    )
+    return await postings_search_collection().aggregate(pipeline).to_list(length=None)
+
+
+# ==== 만료 공고 보관 ====
+# endDay가 지난 공고를 postings_archive 컬렉션으로 옮겨 검색 대상 / 벡터 인덱스에서 제외
+async def archive_expired_postings(before: Optional[date] = None, batch_size: int = POSTING_ARCHIVE_BATCH_SIZE) -> int:
+    cutoff = datetime.combine(before or date.today(), time.min)
+    collection = postings_collection()
+    archive = get_collection(POSTINGS_ARCHIVE_COLLECTION)
+    archived = 0
+    while True:
+        docs = await collection.find({"endDay": {"$lt": cutoff}}).limit(batch_size).to_list(length=None)
+        if not docs:
+            break
+        now = datetime.utcnow()
+        for doc in docs:
+            doc["archivedAt"] = now
+        try:
+            await archive.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # 이전 실행에서 보관만 되고 삭제되지 않은 문서(_id 중복)는 무시
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+        ids = [doc["_id"] for doc in docs]
+        await collection.delete_many({"_id": {"$in": ids}})
+        await posting_chunks.delete(ids)
+        await remove_from_matches(ids)
+        for oid in ids:
+            postings_hydrator.invalidate(oid)
+            if postings_index is not None:
+                postings_index.remove(oid)
+        archived += len(ids)
+    if archived:
+        logging.info(f"[만료 공고 보관] {archived}건 → {POSTINGS_ARCHIVE_COLLECTION}")
+    return archived
+
+
+# 보관 / 게시 시작 반영 작업용 인덱스 (endDay / startDay 범위 조회)
+async def create_posting_date_index():
+    await postings_collection().create_index("endDay", name="endDay_1")
+    await postings_collection().create_index("startDay", name="startDay_1")
+
+
+# 벡터 인덱스 정의 (startDay / endDay는 $vectorSearch 사전 필터용)
+POSTINGS_VECTOR_INDEX_FIELDS = vector_index_fields(EMBEDDING_DIMENSIONS, ["startDay", "endDay"])
 
-    try:
-        postings_collection.create_search_index(model=index_model)
-        logging.info(f"'{index_name}' 인덱스 생성!")
-    except OperationFailure as e:
-        logging.error(f"벡터 인덱스 생성 실패: {e.details}")
 
-# 인덱스 초기화 실행
-create_vector_index_if_not_exists()
+# 벡터 인덱스 생성 (기동 후 백그라운드 작업 또는 python -m db.admin ensure-indexes 로 실행)
+# 필터 필드 / 차원 / 유사도가 다른 기존 인덱스는 정의를 갱신
+async def create_vector_index_if_not_exists():
+    await ensure_vector_search_index(postings_collection(), POSTINGS_VECTOR_INDEX_FIELDS)
@@ -1,177 +1,395 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable, Union, BinaryIO, Tuple
 import os
+import io
+import time
 import pandas as pd
-from pymongo import MongoClient
-from pymongo.errors import OperationFailure
-from pymongo.operations import SearchIndexModel
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from dotenv import load_dotenv
-from openai import OpenAI
-import certifi
+from services.embedding_service import get_embedding as _get_shared_embedding, EMBEDDING_DIMENSIONS
+from db.vector_index import create_local_index, local_vector_search, vector_index_fields, ensure_vector_search_index
+from db.embedding_codec import encode_embedding, decode_embedding
+from db.hydration import DocumentHydrator
+from db.matches import match_updater, remove_from_matches
+from db.dedup import DUPLICATE_KEY_ERROR, DedupIndex, dedup_fields, skip_insert
+from db.chunks import ChunkStore, resolve_chunk_aggregation, merge_max_scores
+from services.chunking import embed_document, embed_documents
+from db.hybrid_search import HYBRID_CANDIDATES, resolve_search_mode, hybrid_search
+from services.tokenizer import extract_keywords
+from db.mongo import get_collection, get_vector_search_collection
 import logging
 import asyncio
 # 환경설정 및 로깅
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
-# MongoDB 연결
-ca = certifi.where()
-client = MongoClient(os.getenv("MONGODB_URI"), tlsCAFile=ca)
-db = client["Rezoom"]
-resumes_collection = db["resumes"]
+# MongoDB 컬렉션 (공용 클라이언트는 db.mongo / FastAPI lifespan에서 관리)
+RESUMES_COLLECTION = "resumes"
 
-# OpenAI 설정
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-EMBEDDING_MODEL = "text-embedding-3-small"
 
-# 동기 임베딩 함수 (내부에서 사용)
-def _sync_get_embedding(text: str) -> List[float]:
-    if not text or not text.strip():
-        logging.warning("[임베딩 요청 차단] 빈 텍스트")
-        return []
-    try:
-        response = openai_client.embeddings.create(
-            input=[text.strip()],
-            model=EMBEDDING_MODEL
-        )
-        embedding = response.data[0].embedding
-        if not embedding or len(embedding) != 1536:
-            logging.error(f"[임베딩 오류] 벡터 길이 오류: {len(embedding)}")
-            return []
-        return embedding
-    except Exception as e:
-        logging.error(f"[임베딩 생성 실패]: {e}")
-        return []
+def resumes_collection():
+    return get_collection(RESUMES_COLLECTION)
+
+
+def resumes_search_collection():
+    return get_vector_search_collection(RESUMES_COLLECTION)
+
+
+# 로컬 벡터 인덱스 (VECTOR_SEARCH_BACKEND=local 일 때만 생성, 첫 검색 시 구성)
+resumes_index = create_local_index("resumes", EMBEDDING_DIMENSIONS)
+
+# 긴 이력서의 청크 벡터
+resume_chunks = ChunkStore("resume_chunks")
+
+# 저장 전 중복 검사
+resumes_dedup = DedupIndex(RESUMES_COLLECTION)
+
+# 검색 결과 hydration (벡터 검색은 _id / score만, 본문은 $in 일괄 조회 + LRU 캐시)
+resumes_hydrator = DocumentHydrator(RESUMES_COLLECTION, ["structured", "original_text"])
+
+# CSV 적재 설정
+CSV_CHUNK_SIZE = int(os.getenv("CSV_CHUNK_SIZE", "500"))
+CSV_INGEST_CONCURRENCY = int(os.getenv("CSV_INGEST_CONCURRENCY", "4"))
+CSV_ENCODINGS = ["utf-8-sig", "cp949"]  # cp949는 euc-kr 상위 호환
+CSV_FIELDS = ["name", "phone", "email", "skills", "education", "experience", "self_intro"]
 
-# 비동기 wrapper
+# 비동기 임베딩 (공용 배칭 임베딩 서비스 사용)
 async def get_embedding(text: str) -> List[float]:
     if not text or not text.strip():
         logging.warning("[임베딩 요청 차단] 빈 텍스트")
         return []
-    return await asyncio.to_thread(_sync_get_embedding, text)
+    return await _get_shared_embedding(text)
 
-# 사용자 이력서 저장
-async def store_resume_from_pdf(resume_text: str) -> str:
+# 사용자 이력서 저장 (긴 이력서는 청크로 나눠 임베딩, 대표 벡터는 청크 평균)
+# → (object_id, 중복 여부 None | "exact" | "near"), 중복이면 임베딩 / 저장 없이 기존 object_id 반환
+async def store_resume_from_pdf(resume_text: str) -> Tuple[str, Optional[str]]:
     try:
-        embedding = await get_embedding(resume_text)
+        fields = dedup_fields(resume_text)
+        duplicate = await resumes_dedup.find_duplicate(fields)
+        if skip_insert(duplicate):
+            logging.info(f"[이력서 중복] {duplicate['duplicate']} → {duplicate['_id']}")
+            return str(duplicate["_id"]), duplicate["duplicate"]
+
+        embedding, chunks = await embed_document(resume_text)
+        if not embedding:
+            logging.error("[PDF 이력서 저장 실패]: 임베딩 생성 실패")
+            return "", None
         doc = {
             "original_text": resume_text,
             "structured": {},  # PDF는 정형 데이터 파싱 생략하겠음
-            "embedding": embedding,
-            "source": "pdf"
+            "embedding": encode_embedding(embedding),
+            "keywords": extract_keywords(resume_text),
+            "source": "pdf",
+            **fields
         }
-        result = resumes_collection.insert_one(doc)
-        return str(result.inserted_id)
+        if duplicate:
+            doc["near_duplicate_of"] = duplicate["_id"]
+        try:
+            result = await resumes_collection().insert_one(doc)
+        except DuplicateKeyError:
+            # 중복 검사 이후 같은 이력서가 먼저 저장됨 (동시 업로드)
+            existing = await resumes_dedup.find_exact(fields["content_hash"])
+            if existing is None:
+                raise
+            logging.info(f"[이력서 중복] exact → {existing}")
+            return str(existing), "exact"
+        if resumes_index is not None and resumes_index.loaded:
+            await asyncio.to_thread(resumes_index.add, [result.inserted_id], [embedding])
+        await resume_chunks.insert([(result.inserted_id, chunks, doc)])
+        match_updater.submit("resume", [result.inserted_id])
+        return str(result.inserted_id), duplicate["duplicate"] if duplicate else None
     except Exception as e:
         logging.error(f"[PDF 이력서 저장 실패]: {e}")
-        return ""
+        return "", None
 
-# CSV 이력서 처리 == 이건 csv structed 추가하려고
-def process_resume_csv(filepath: str) -> int:
-    success_count = 0
+# CSV 인코딩 감지 (앞부분 샘플을 후보 인코딩으로 디코딩해봄)
+def detect_csv_encoding(sample: bytes) -> str:
+    # 샘플 끝에서 잘린 멀티바이트 문자를 피하기 위해 마지막 줄바꿈까지만 사용
+    cut = sample.rfind(b"\n")
+    if cut > 0:
+        sample = sample[:cut]
+    for encoding in CSV_ENCODINGS:
+        try:
+            sample.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("CSV 인코딩을 감지할 수 없습니다.")
+
+
+def _open_csv_source(source: Union[str, bytes, BinaryIO]) -> BinaryIO:
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    if isinstance(source, str):
+        return open(source, "rb")
+    return source
+
+
+# 청크 단위 벡터화 검증 / 문서 구성 (임베딩은 아직 없음)
+def _prepare_resume_chunk(df: pd.DataFrame) -> tuple[List[Dict[str, Any]], List[str]]:
+    df = df.fillna("").astype(str).apply(lambda col: col.str.strip())
+    for field in CSV_FIELDS:
+        if field not in df.columns:
+            df[field] = ""
+
+    # 전체 텍스트를 하나의 문자열로 (빈 값 제외)
+    original_text = df.where(df != "").stack().dropna().groupby(level=0).agg(" ".join)
+    original_text = original_text.reindex(df.index, fill_value="")
+
+    valid = (df["name"] != "") & (df["skills"] != "")
+    df = df[valid]
+    original_text = original_text[valid]
+
+    skills_list = df["skills"].str.split(",").map(lambda items: [s.strip() for s in items if s.strip()])
+    embed_inputs = (
+        skills_list.map(", ".join) + " " + df["experience"] + " " + df["self_intro"]
+    ).tolist()
+
+    documents = [
+        {
+            "original_text": text,
+            "structured": {
+                "name": name,
+                "phone": phone,
+                "email": email,
+                "skills": skills,
+                "education": education,
+                "experience": experience,
+                "self_intro": self_intro
+            },
+            "keywords": extract_keywords(text, skills),
+            "source": "csv"
+        }
+        for text, name, phone, email, skills, education, experience, self_intro in zip(
+            original_text, df["name"], df["phone"], df["email"], skills_list,
+            df["education"], df["experience"], df["self_intro"]
+        )
+    ]
+    return documents, embed_inputs
 
+
+# 저장에 성공한 문서 목록 + 고유 인덱스로 거부된 중복 수 반환
+# (다른 요청이 같은 이력서를 먼저 저장한 경우, 그 외 실패는 저장 실패로 집계)
+async def _insert_resumes(documents: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    duplicates = 0
+    try:
+        await resumes_collection().insert_many(documents, ordered=False)
+        inserted = documents
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        failed = {err["index"] for err in errors}
+        duplicates = sum(1 for err in errors if err.get("code") == DUPLICATE_KEY_ERROR)
+        if len(failed) > duplicates:
+            logging.error(f"[CSV 이력서 일부 저장 실패]: {len(failed) - duplicates}건")
+        inserted = [doc for i, doc in enumerate(documents) if i not in failed]
+    if resumes_index is not None and resumes_index.loaded:
+        await asyncio.to_thread(
+            resumes_index.add, [doc["_id"] for doc in inserted], [decode_embedding(doc["embedding"]) for doc in inserted]
+        )
+    return inserted, duplicates
+
+
+# CSV 이력서 스트리밍 적재
+# - 청크 단위 읽기 → 벡터화 검증 → 배치 임베딩 → insert_many
+# - 동시에 처리 중인 청크 수를 제한해 메모리와 API 호출량을 묶어둠
+async def ingest_resume_csv(
+    source: Union[str, bytes, BinaryIO],
+    chunk_size: int = CSV_CHUNK_SIZE,
+    concurrency: int = CSV_INGEST_CONCURRENCY,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    start = time.time()
+    report = {
+        "encoding": None,
+        "chunks": 0,
+        "total_rows": 0,
+        "valid_rows": 0,
+        "inserted": 0,
+        "skipped_invalid": 0,
+        "skipped_duplicate": 0,
+        "embedding_failed": 0,
+        "insert_failed": 0,
+        "elapsed_time": 0.0
+    }
+
+    stream = _open_csv_source(source)
     try:
-        df = pd.read_csv(filepath, encoding='cp949')  # 또는 utf-8 안 돼면 둘 중에 하나
-        for _, row in df.iterrows():
+        sample = stream.read(64 * 1024)
+        stream.seek(0)
+        report["encoding"] = detect_csv_encoding(sample)
+
+        reader = await asyncio.to_thread(
+            pd.read_csv, stream, encoding=report["encoding"], chunksize=chunk_size,
+            dtype=str, keep_default_na=False
+        )
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        tasks = []
+        # 중복 검사는 청크끼리 순서대로 실행하고, 검사를 통과했지만 아직 저장 중인 다른 청크의 행도 함께 비교
+        dedup_lock = asyncio.Lock()
+        in_flight: Dict[Any, Dict[str, Any]] = {}
+
+        async def process_chunk(df: pd.DataFrame):
+            claimed = []
             try:
-                # 전체 텍스트를 하나의 문자열로
-                original_text = " ".join(str(v).strip() for v in row.values if pd.notnull(v))
-                name = row.get("name", "").strip()
-                skills = row.get("skills", "").strip()
-                if not name or not skills:
-                    continue
-
-                skills_list = [s.strip() for s in skills.split(",") if s.strip()]
-                education = row.get("education", "").strip()
-                experience = row.get("experience", "").strip()
-                self_intro = row.get("self_intro", "").strip()
-                phone = row.get("phone", "").strip()
-                email = row.get("email", "").strip()
-
-                embed_input = f"{', '.join(skills_list)} {experience} {self_intro}"
-                embedding = asyncio.run(get_embedding(embed_input))
-                if not embedding:
-                    continue
-
-                document = {
-                    "original_text": original_text,
-                    "structured": {
-                        "name": name,
-                        "phone": phone,
-                        "email": email,
-                        "skills": skills_list,
-                        "education": education,
-                        "experience": experience,
-                        "self_intro": self_intro
-                    },
-                    "embedding": embedding,
-                    "source": "csv"
-                }
-
-                resumes_collection.insert_one(document)
-                success_count += 1
+                documents, embed_inputs = _prepare_resume_chunk(df)
+                report["total_rows"] += len(df)
+                report["valid_rows"] += len(documents)
+                report["skipped_invalid"] += len(df) - len(documents)
+
+                # 임베딩 전에 중복 제외 (이미 저장된 이력서 / 같은 파일 안의 반복 행)
+                # _id를 미리 정해 두어 앞선 행과 겹치는 유사 중복도 near_duplicate_of를 가짐
+                for document in documents:
+                    document["_id"] = ObjectId()
+                    document.update(dedup_fields(document["original_text"]))
+                kept = []
+                async with dedup_lock:
+                    duplicates = await resumes_dedup.find_duplicates(documents, list(in_flight.values()))
+                    for document, embed_input, duplicate in zip(documents, embed_inputs, duplicates):
+                        if skip_insert(duplicate):
+                            report["skipped_duplicate"] += 1
+                            continue
+                        if duplicate:
+                            document["near_duplicate_of"] = duplicate["_id"]
+                        kept.append((document, embed_input))
+                        in_flight[document["_id"]] = document
+                        claimed.append(document["_id"])
+                documents = [document for document, _ in kept]
+                embed_inputs = [embed_input for _, embed_input in kept]
 
+                # 행별 입력이 길면 청크로 나뉘고, 청크 전체가 한 번에 배처로 전달됨
+                embedded = await embed_documents(embed_inputs)
+                ready, chunks_by_document = [], []
+                for document, (embedding, chunks) in zip(documents, embedded):
+                    if not embedding:
+                        report["embedding_failed"] += 1
+                        continue
+                    document["embedding"] = encode_embedding(embedding)
+                    ready.append(document)
+                    chunks_by_document.append(chunks)
+
+                inserted, rejected = await _insert_resumes(ready) if ready else ([], 0)
+                inserted_ids = {id(doc) for doc in inserted}
+                await resume_chunks.insert([
+                    (doc["_id"], chunks, doc) for doc, chunks in zip(ready, chunks_by_document) if id(doc) in inserted_ids
+                ])
+                match_updater.submit("resume", [doc["_id"] for doc in inserted])
+                report["inserted"] += len(inserted)
+                report["skipped_duplicate"] += rejected
+                report["insert_failed"] += len(ready) - len(inserted) - rejected
+                report["chunks"] += 1
+                logging.info(
+                    f"[CSV 적재 진행] 청크 {report['chunks']} / 누적 행 {report['total_rows']} / 저장 {report['inserted']}"
+                )
+                if on_progress:
+                    on_progress(dict(report))
             except Exception as e:
-                logging.error(f"[하이브리드 이력서 저장 실패]: {e}")
+                logging.error(f"[CSV 청크 처리 실패]: {e}")
+            finally:
+                # 저장이 끝난(또는 실패한) 행은 이후 청크가 DB 조회로 확인
+                for oid in claimed:
+                    in_flight.pop(oid, None)
+                semaphore.release()
+
+        while True:
+            await semaphore.acquire()
+            df = await asyncio.to_thread(next, reader, None)
+            if df is None:
+                semaphore.release()
+                break
+            tasks.append(asyncio.create_task(process_chunk(df)))
+
+        await asyncio.gather(*tasks)
 
     except Exception as e:
         logging.error(f"[CSV 파싱 실패]: {e}")
+    finally:
+        if stream is not source:
+            stream.close()
+
+    report["elapsed_time"] = round(time.time() - start, 2)
+    logging.info(f"[하이브리드 저장 완료] 유효 이력서 수: {report['inserted']}")
+    return report
 
-    logging.info(f"[하이브리드 저장 완료] 유효 이력서 수: {success_count}")
-    return success_count
+
+# CSV 이력서 처리 (동기 호출용 - 스크립트 등 이벤트 루프 밖에서 사용)
+# 루프가 끝나기 전에 매칭 테이블 갱신까지 마침
+def process_resume_csv(filepath: str) -> int:
+    async def run() -> int:
+        report = await ingest_resume_csv(filepath)
+        await match_updater.join()
+        return report["inserted"]
+    return asyncio.run(run())
 
 # 유사도 검색
-async def search_similar_resumes_with_score(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-    query_vector = await get_embedding(query)
-    
+# - mode: vector | hybrid (생략 시 SEARCH_MODE 설정)
+# - aggregation: mean (이력서 평균 벡터) | max (평균 벡터 + 청크 벡터 중 최고 점수), 생략 시 CHUNK_AGGREGATION 설정
+async def search_similar_resumes_with_score(query: str, top_k: int = 5, mode: Optional[str] = None,
+                                            aggregation: Optional[str] = None) -> List[Dict[str, Any]]:
+    mode = resolve_search_mode(mode)
+    aggregation = resolve_chunk_aggregation(aggregation)
+    # 긴 질의(공고 전문)도 청크 평균 벡터로 검색
+    query_vector, _ = await embed_document(query)
+    if mode == "hybrid":
+        hits = await hybrid_search(
+            resumes_search_collection(), query,
+            search_resumes_by_vector(query_vector, max(top_k, HYBRID_CANDIDATES), aggregation), top_k
+        )
+    else:
+        hits = await search_resumes_by_vector(query_vector, top_k, aggregation)
+    return await resumes_hydrator.hydrate(hits)
+
+
+async def search_resumes_by_vector(query_vector: List[float], top_k: int,
+                                   aggregation: Optional[str] = None) -> List[Dict[str, Any]]:
+    if resumes_index is not None:
+        document_hits = local_vector_search(resumes_index, resumes_search_collection(), query_vector, top_k)
+    else:
+        document_hits = _atlas_vector_search(query_vector, top_k)
+    if resolve_chunk_aggregation(aggregation) == "mean":
+        return await document_hits
+    document_hits, chunk_hits = await asyncio.gather(document_hits, resume_chunks.search(query_vector, top_k))
+    return merge_max_scores(document_hits, chunk_hits, limit=top_k)
+
+
+async def _atlas_vector_search(query_vector: List[float], top_k: int) -> List[Dict[str, Any]]:
     pipeline = [
         {
             "$vectorSearch": {
                 "index": "vector_index",
                 "queryVector": query_vector,
                 "path": "embedding",
-                "numCandidates": 100,
+                "numCandidates": max(100, top_k),
                 "limit": top_k,
                 "similarity": "cosine"
             }
         },
         {
             "$project": {
-                "structured": "$structured",
-                "original_text": "$original_text",   
+                "_id": 1,
                 "score": {"$meta": "vectorSearchScore"}
             }
         }
     ]
-    return list(resumes_collection.aggregate(pipeline))
-
-
-# 벡터 인덱스 생성
-def create_resume_vector_index_if_not_exists():
-    index_name = "vector_index"
-    existing_indexes = resumes_collection.list_search_indexes()
-    if index_name in [idx["name"] for idx in existing_indexes]:
-        logging.info(f"'{index_name}' resumes 컬렉션의 인덱스 이미 존재")
-        return
-    index_model = SearchIndexModel(
-        definition={
-            "fields": [
-                {
-                    "type": "vector",
-                    "path": "embedding",
-                    "numDimensions": 1536,
-                    "similarity": "cosine"
-                }
-            ]
-        },
-        name=index_name,
-        type="vectorSearch"
-    )
-    try:
-        resumes_collection.create_search_index(model=index_model)
-        logging.info(f"[벡터 인덱스 생성 완료] '{index_name}'")
-    except OperationFailure as e:
-        logging.error(f"[벡터 인덱스 생성 실패]: {e.details}")
-
-# 인덱스 생성 실행
-create_resume_vector_index_if_not_exists()
-print("\n저장된 이력서 수:", resumes_collection.count_documents({}))
+    return await resumes_search_collection().aggregate(pipeline).to_list(length=None)
+
+
+# 이력서 삭제 (로컬 인덱스에서도 제외)
+async def delete_resume_document(object_id) -> int:
+    result = await resumes_collection().delete_one({"_id": object_id})
+    if result.deleted_count:
+        resumes_hydrator.invalidate(object_id)
+        if resumes_index is not None:
+            resumes_index.remove(object_id)
+        await resume_chunks.delete([object_id])
+        await remove_from_matches([object_id])
+    return result.deleted_count
+
+
+# 벡터 인덱스 정의
+RESUMES_VECTOR_INDEX_FIELDS = vector_index_fields(EMBEDDING_DIMENSIONS)
+
+
+# 벡터 인덱스 생성 (기동 후 백그라운드 작업 또는 python -m db.admin ensure-indexes 로 실행)
+# 차원 / 유사도가 다른 기존 인덱스는 정의를 갱신
+async def create_resume_vector_index_if_not_exists():
+    await ensure_vector_search_index(resumes_collection(), RESUMES_VECTOR_INDEX_FIELDS)
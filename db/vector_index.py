@@ -0,0 +1,426 @@
+import os
+import math
+import heapq
+import random
+import logging
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo.operations import SearchIndexModel
+from pymongo.errors import OperationFailure
+from db.embedding_codec import decode_embedding
+
+load_dotenv()
+
+# 벡터 검색 백엔드 설정
+# - atlas : MongoDB Atlas $vectorSearch (기본값)
+# - local : 프로세스 내 벡터 인덱스 (Atlas Search 없는 일반 MongoDB에서도 동작)
+VECTOR_SEARCH_BACKEND = os.getenv("VECTOR_SEARCH_BACKEND", "atlas").lower()
+LOCAL_INDEX_MODE = os.getenv("LOCAL_INDEX_MODE", "exact").lower()  # exact | hnsw
+LOCAL_INDEX_DTYPE = os.getenv("LOCAL_INDEX_DTYPE", "float32").lower()  # float32 | float16
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "")  # 지정 시 벡터 행렬을 디스크에 두고 mmap으로 사용
+
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "100"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+_INITIAL_CAPACITY = 1024
+_LOAD_BATCH_SIZE = 1000
+_FILTER_OVERFETCH = 4  # 필터 검색 시 top_k 대비 후보 배수
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class HNSWGraph:
+    """
+    계층형 근접 그래프(HNSW) - 벡터는 LocalVectorIndex의 행렬 행 번호로 참조
+    - 유사도는 정규화된 벡터의 내적(cosine)
+    """
+
+    def __init__(self, vectors_of, m: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION):
+        self._vectors_of = vectors_of  # 행 번호 리스트 → (n, dim) float32 행렬
+        self.m = m
+        self.m0 = m * 2
+        self.ef_construction = ef_construction
+        self.level_mult = 1 / math.log(max(m, 2))
+        self.layers: List[Dict[int, List[int]]] = []
+        self.entry_point: Optional[int] = None
+
+    def __len__(self):
+        return len(self.layers[0]) if self.layers else 0
+
+    def _similarities(self, query: np.ndarray, nodes: Sequence[int]) -> np.ndarray:
+        return self._vectors_of(list(nodes)) @ query
+
+    def _search_layer(self, query: np.ndarray, entry_points: List[int], ef: int, level: int) -> List[Tuple[float, int]]:
+        visited = set(entry_points)
+        sims = self._similarities(query, entry_points)
+        candidates = [(-float(s), n) for s, n in zip(sims, entry_points)]
+        results = [(float(s), n) for s, n in zip(sims, entry_points)]
+        heapq.heapify(candidates)
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        graph = self.layers[level]
+        while candidates:
+            neg_sim, node = heapq.heappop(candidates)
+            if len(results) >= ef and -neg_sim < results[0][0]:
+                break
+            neighbors = [n for n in graph.get(node, []) if n not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            for sim, neighbor in zip(self._similarities(query, neighbors), neighbors):
+                sim = float(sim)
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, neighbor))
+                    heapq.heappush(results, (sim, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return results
+
+    def _prune(self, node: int, neighbors: List[int], max_links: int) -> List[int]:
+        if len(neighbors) <= max_links:
+            return neighbors
+        sims = self._similarities(self._vectors_of([node])[0], neighbors)
+        order = np.argsort(-sims)[:max_links]
+        return [neighbors[i] for i in order]
+
+    def add(self, node: int):
+        level = int(-math.log(1.0 - random.random()) * self.level_mult)
+        top_level = self._level_of(self.entry_point) if self.entry_point is not None else -1
+        while len(self.layers) <= level:
+            self.layers.append({})
+
+        if self.entry_point is None:
+            for l in range(level + 1):
+                self.layers[l][node] = []
+            self.entry_point = node
+            return
+
+        query = self._vectors_of([node])[0]
+        entry_points = [self.entry_point]
+
+        # 상위 계층은 greedy 탐색으로 진입점만 좁힘
+        for l in range(top_level, level, -1):
+            best = max(self._search_layer(query, entry_points, 1, l))
+            entry_points = [best[1]]
+
+        for l in range(min(level, top_level), -1, -1):
+            found = self._search_layer(query, entry_points, self.ef_construction, l)
+            max_links = self.m0 if l == 0 else self.m
+            neighbors = [n for _, n in heapq.nlargest(max_links, found)]
+            self.layers[l][node] = neighbors
+            for neighbor in neighbors:
+                links = self.layers[l].setdefault(neighbor, [])
+                links.append(node)
+                self.layers[l][neighbor] = self._prune(neighbor, links, max_links)
+            entry_points = [n for _, n in found]
+
+        for l in range(level + 1):
+            self.layers[l].setdefault(node, [])
+        if level > top_level:
+            self.entry_point = node
+
+    def _level_of(self, node: int) -> int:
+        return max(l for l, graph in enumerate(self.layers) if node in graph)
+
+    def search(self, query: np.ndarray, k: int, ef: int = HNSW_EF_SEARCH) -> List[Tuple[float, int]]:
+        if self.entry_point is None:
+            return []
+        entry_points = [self.entry_point]
+        for l in range(self._level_of(self.entry_point), 0, -1):
+            best = max(self._search_layer(query, entry_points, 1, l))
+            entry_points = [best[1]]
+        found = self._search_layer(query, entry_points, max(ef, k), 0)
+        return heapq.nlargest(k, found)
+
+
+class LocalVectorIndex:
+    """
+    프로세스 내 벡터 인덱스
+    - 정규화된 임베딩을 연속된 float32 / float16 행렬로 보관 (LOCAL_INDEX_DIR 지정 시 mmap)
+    - 컬렉션의 embedding은 array / int8 / float16 저장 형식 모두 읽음
+    - exact: NumPy 전수 내적 / hnsw: 근사 그래프 탐색 (그래프 구성 전에는 exact로 대체)
+    - 점수는 Atlas cosine vectorSearchScore와 같은 (1 + cos) / 2 스케일
+    """
+
+    def __init__(self, name: str, dim: int, dtype: str = LOCAL_INDEX_DTYPE,
+                 mode: str = LOCAL_INDEX_MODE, directory: str = LOCAL_INDEX_DIR):
+        self.name = name
+        self.dim = dim
+        self.dtype = np.float16 if dtype == "float16" else np.float32
+        self.mode = mode
+        self.directory = directory
+        self.ids: List[ObjectId] = []
+        self._positions: Dict[ObjectId, int] = {}
+        self._deleted: set = set()
+        self._matrix = np.zeros((0, dim), dtype=self.dtype)
+        self._size = 0
+        self._graph: Optional[HNSWGraph] = None
+        self._lock = threading.RLock()
+        self._load_lock = asyncio.Lock()
+        self.loaded = False
+
+    def __len__(self):
+        return self._size - len(self._deleted)
+
+    # ---- 저장소 ----
+    def _paths(self) -> Tuple[str, str]:
+        base = os.path.join(self.directory, f"{self.name}.{np.dtype(self.dtype).name}")
+        return f"{base}.npy", f"{base}.ids"
+
+    def _allocate(self, capacity: int) -> np.ndarray:
+        if not self.directory:
+            return np.zeros((capacity, self.dim), dtype=self.dtype)
+        os.makedirs(self.directory, exist_ok=True)
+        matrix_path, _ = self._paths()
+        tmp_path = matrix_path + ".tmp"
+        matrix = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self.dtype, shape=(capacity, self.dim))
+        matrix[:self._size] = self._matrix[:self._size]
+        matrix.flush()
+        del matrix
+        os.replace(tmp_path, matrix_path)
+        return np.load(matrix_path, mmap_mode="r+")
+
+    def _ensure_capacity(self, extra: int):
+        needed = self._size + extra
+        if needed <= self._matrix.shape[0]:
+            return
+        capacity = max(_INITIAL_CAPACITY, self._matrix.shape[0])
+        while capacity < needed:
+            capacity *= 2
+        self._matrix = self._allocate(capacity)
+
+    def _load_from_disk(self) -> bool:
+        if not self.directory:
+            return False
+        matrix_path, ids_path = self._paths()
+        if not (os.path.exists(matrix_path) and os.path.exists(ids_path)):
+            return False
+        with open(ids_path) as f:
+            ids = [ObjectId(line.strip()) for line in f if line.strip()]
+        matrix = np.load(matrix_path, mmap_mode="r+")
+        if matrix.shape[1] != self.dim or len(ids) > matrix.shape[0]:
+            logging.warning(f"[로컬 인덱스] '{self.name}' 디스크 파일 형식 불일치 → 재구성")
+            return False
+        self._matrix = matrix
+        self.ids = ids
+        self._size = len(ids)
+        self._positions = {oid: i for i, oid in enumerate(ids)}
+        return True
+
+    # ---- 구성 / 추가 ----
+    def add(self, ids: Sequence[ObjectId], vectors: Sequence[Sequence[float]]):
+        rows, new_ids = [], []
+        for oid, vector in zip(ids, vectors):
+            # 더 긴 벡터는 앞부분만 사용 (Matryoshka 축소, 정규화는 아래에서 수행)
+            if vector is None or len(vector) < self.dim or oid in self._positions:
+                continue
+            rows.append(vector[:self.dim])
+            new_ids.append(oid)
+        if not rows:
+            return
+
+        block = _normalize(np.asarray(rows, dtype=np.float32)).astype(self.dtype)
+        with self._lock:
+            self._ensure_capacity(len(rows))
+            start = self._size
+            self._matrix[start:start + len(rows)] = block
+            for offset, oid in enumerate(new_ids):
+                self._positions[oid] = start + offset
+            self.ids.extend(new_ids)
+            self._size += len(rows)
+
+            if self.directory:
+                _, ids_path = self._paths()
+                with open(ids_path, "a") as f:
+                    f.writelines(f"{oid}\n" for oid in new_ids)
+            if self._graph is not None:
+                for position in range(start, self._size):
+                    self._graph.add(position)
+
+    def remove(self, oid: ObjectId):
+        with self._lock:
+            position = self._positions.get(oid)
+            if position is not None:
+                self._deleted.add(position)
+
+    async def load(self, collection, query: Optional[Dict[str, Any]] = None):
+        """
+        디스크 파일(있으면) + 컬렉션에서 아직 반영되지 않은 문서의 embedding으로 인덱스 구성
+        - collection은 비동기(motor) 컬렉션, 행렬 작업은 스레드에서 수행
+        """
+        async with self._load_lock:
+            if self.loaded:
+                return
+            restored = await asyncio.to_thread(self._load_from_disk)
+            condition = dict(query or {})
+            if restored and self.ids:
+                last_id = max(self.ids)
+                await self._drop_missing(collection, {**condition, "_id": {"$lte": last_id}})
+                # ObjectId는 생성 시각 순이므로 마지막 id 이후 문서만 추가 반영
+                condition["_id"] = {"$gt": last_id}
+
+            cursor = collection.find(condition, {"embedding": 1}, batch_size=_LOAD_BATCH_SIZE)
+            batch_ids, batch_vectors = [], []
+            async for doc in cursor:
+                batch_ids.append(doc["_id"])
+                batch_vectors.append(decode_embedding(doc.get("embedding")))
+                if len(batch_ids) >= _LOAD_BATCH_SIZE:
+                    await asyncio.to_thread(self.add, batch_ids, batch_vectors)
+                    batch_ids, batch_vectors = [], []
+            await asyncio.to_thread(self.add, batch_ids, batch_vectors)
+
+            if self.mode == "hnsw":
+                await asyncio.to_thread(self._build_graph)
+            self.loaded = True
+            logging.info(f"[로컬 인덱스] '{self.name}' 구성 완료: {len(self)}건 ({self.mode}, {np.dtype(self.dtype).name})")
+
+    async def _drop_missing(self, collection, condition: Dict[str, Any]):
+        """
+        디스크에서 복원한 id 중 컬렉션에 더 이상 없는 문서(꺼져 있는 동안 / 다른 프로세스에서 삭제·보관된 문서)를
+        삭제 표시 (삭제 표시는 디스크에 남지 않으므로 로드할 때마다 컬렉션 기준으로 다시 계산)
+        """
+        present = np.zeros(self._size, dtype=bool)
+        async for doc in collection.find(condition, {"_id": 1}, batch_size=_LOAD_BATCH_SIZE * 10):
+            position = self._positions.get(doc["_id"])
+            if position is not None:
+                present[position] = True
+        missing = np.flatnonzero(~present)
+        if len(missing):
+            with self._lock:
+                self._deleted.update(int(position) for position in missing)
+            logging.info(f"[로컬 인덱스] '{self.name}' 컬렉션에 없는 복원 항목 {len(missing)}건 제외")
+
+    def _build_graph(self):
+        graph = HNSWGraph(self._rows)
+        with self._lock:
+            for position in range(self._size):
+                graph.add(position)
+            self._graph = graph
+
+    def _rows(self, positions: List[int]) -> np.ndarray:
+        return np.asarray(self._matrix[positions], dtype=np.float32)
+
+    # ---- 검색 ----
+    def search(self, query_vector: Sequence[float], top_k: int) -> List[Tuple[ObjectId, float]]:
+        if self._size == 0:
+            return []
+        query = _normalize(np.asarray(query_vector[:self.dim], dtype=np.float32))
+        with self._lock:
+            if self._graph is not None:
+                found = self._graph.search(query, top_k + len(self._deleted))
+                hits = [(sim, pos) for sim, pos in found if pos not in self._deleted][:top_k]
+            else:
+                sims = np.asarray(self._matrix[:self._size] @ query.astype(self.dtype), dtype=np.float32)
+                if self._deleted:
+                    sims[list(self._deleted)] = -np.inf
+                k = min(top_k, self._size)
+                top = np.argpartition(-sims, k - 1)[:k]
+                top = top[np.argsort(-sims[top])]
+                hits = [(float(sims[pos]), int(pos)) for pos in top if np.isfinite(sims[pos])]
+            return [(self.ids[pos], (1 + sim) / 2) for sim, pos in hits]
+
+
+def create_local_index(name: str, dim: int) -> Optional[LocalVectorIndex]:
+    if VECTOR_SEARCH_BACKEND != "local":
+        return None
+    return LocalVectorIndex(name, dim)
+
+
+async def local_vector_search(
+    index: LocalVectorIndex,
+    collection,
+    query_vector: List[float],
+    top_k: int,
+    filter: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    로컬 인덱스로 top_k를 찾아 Atlas 검색 단계와 같은 형태({"_id", "score"})로 반환
+    (인덱스가 아직 없으면 컬렉션에서 구성)
+    filter가 있으면 후보를 넉넉히 뽑은 뒤 해당 조건을 만족하는 _id만 남김
+    """
+    if not index.loaded:
+        await index.load(collection)
+    if not filter:
+        hits = await asyncio.to_thread(index.search, query_vector, top_k)
+        return [{"_id": oid, "score": score} for oid, score in hits]
+
+    k = top_k * _FILTER_OVERFETCH
+    while True:
+        hits = await asyncio.to_thread(index.search, query_vector, k)
+        cursor = collection.find({"_id": {"$in": [oid for oid, _ in hits]}, **filter}, {"_id": 1})
+        allowed = {doc["_id"] async for doc in cursor}
+        results = [{"_id": oid, "score": score} for oid, score in hits if oid in allowed]
+        if len(results) >= top_k or len(hits) < k:
+            return results[:top_k]
+        k *= _FILTER_OVERFETCH
+
+
+# ==== Atlas 벡터 검색 인덱스 정의 관리 ====
+# EMBEDDING_DIMENSIONS를 바꾸면(migrate_embeddings --dimensions) 기존 인덱스의 numDimensions가 맞지 않아
+# $vectorSearch가 실패하므로, 존재 여부뿐 아니라 차원 / 유사도 / 필터 필드까지 비교해 다르면 정의를 갱신
+ATLAS_VECTOR_INDEX_NAME = "vector_index"
+
+
+def vector_index_fields(dimensions: int, filter_paths: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    return [
+        {"type": "vector", "path": "embedding", "numDimensions": dimensions, "similarity": "cosine"},
+        *({"type": "filter", "path": path} for path in filter_paths)
+    ]
+
+
+def search_index_differences(existing: Optional[Dict[str, Any]], fields: List[Dict[str, Any]]) -> List[str]:
+    """
+    list_search_indexes 항목과 원하는 정의 비교 → 다른 점 목록 (같으면 빈 목록)
+    """
+    if existing is None:
+        return ["인덱스 없음"]
+    definition = existing.get("latestDefinition") or existing.get("definition") or {}
+    current = {(field.get("type"), field.get("path")): field for field in definition.get("fields", [])}
+    differences = []
+    for field in fields:
+        found = current.get((field["type"], field["path"]))
+        if found is None:
+            differences.append(f"{field['type']} 필드 없음: {field['path']}")
+            continue
+        for key in ("numDimensions", "similarity"):
+            if key in field and found.get(key) != field[key]:
+                differences.append(f"{field['path']}.{key}: {found.get(key)} → {field[key]}")
+    return differences
+
+
+async def ensure_vector_search_index(collection, fields: List[Dict[str, Any]],
+                                     index_name: str = ATLAS_VECTOR_INDEX_NAME) -> List[str]:
+    """
+    인덱스가 없으면 생성, 정의가 다르면 갱신 → 처리 전 다른 점 목록
+    """
+    existing_indexes = await collection.list_search_indexes().to_list(length=None)
+    existing = next((idx for idx in existing_indexes if idx["name"] == index_name), None)
+    differences = search_index_differences(existing, fields)
+    if not differences:
+        logging.info(f"'{index_name}' {collection.name} 컬렉션의 인덱스 이미 존재")
+        return differences
+    try:
+        if existing is None:
+            await collection.create_search_index(
+                model=SearchIndexModel(definition={"fields": fields}, name=index_name, type="vectorSearch")
+            )
+            logging.info(f"[벡터 인덱스 생성 완료] {collection.name}.{index_name}")
+        else:
+            # Atlas는 새 정의로 인덱스를 다시 빌드 (빌드가 끝날 때까지 이전 정의로 검색)
+            await collection.update_search_index(index_name, {"fields": fields})
+            logging.warning(f"[벡터 인덱스 정의 갱신] {collection.name}.{index_name}: {differences}")
+    except OperationFailure as e:
+        logging.error(f"[벡터 인덱스 생성 / 갱신 실패] {collection.name}.{index_name}: {e.details}")
+        raise
+    return differences
@@ -5,6 +5,10 @@ class ResumeNotFoundException(HTTPException):
     def __init__(self):
         super().__init__(status_code=404, detail="해당 이력서를 찾을 수 없음")
 
+class PostingNotFoundException(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=404, detail="해당 채용공고를 찾을 수 없음")
+
 class InvalidObjectIdException(HTTPException):
     def __init__(self):
         super().__init__(status_code=400, detail="유효하지 않은 ObjectId 형식")
@@ -13,6 +17,10 @@ class ResumeTextMissingException(HTTPException):
     def __init__(self):
         super().__init__(status_code=400, detail="이력서 텍스트가 유효하지 않음")
 
+class DocumentTooLargeException(HTTPException):
+    def __init__(self, detail: str = "업로드 파일이 허용 크기를 초과함"):
+        super().__init__(status_code=413, detail=detail)
+
 class JobPostingTextMissingException(HTTPException):
     def __init__(self):
         super().__init__(status_code=400, detail="채용공고 텍스트가 유효하지 않음")
@@ -53,4 +61,11 @@ class AIAnalylizeException(HTTPException):
     def __init__(self):
         super().__init__(status_code=500, detail="AI 분석 중 서버 오류 발생")
 
-        
\ No newline at end of file
+        
+class WebhookUnauthorizedException(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=403, detail="콜백 토큰이 유효하지 않음")
+
+class WebhookDisabledException(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=404, detail="RunPod 콜백을 사용하지 않는 설정 (RUNPOD_RUN_MODE=webhook 아님)")
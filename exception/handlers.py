@@ -3,6 +3,7 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.status import HTTP_422_UNPROCESSABLE_ENTITY
+from services.ocr_client import OcrError
 import logging
 
 
@@ -30,6 +31,17 @@ def register_exception_handlers(app: FastAPI):
             content={"message": f"HTTP 에러: {exc.detail}"}
         )
 
+    @app.exception_handler(OcrError)
+    async def ocr_error_handler(request: Request, exc: OcrError):
+        logging.error(f"[OcrError] {exc.reason}: {str(exc)}")
+        # 일시적인 실패(요청 한도 / 시간 초과 / 네트워크)는 503, 그 외 OCR 서버 응답 오류는 502
+        headers = {"Retry-After": str(int(exc.retry_after))} if exc.retry_after else None
+        return JSONResponse(
+            status_code=503 if exc.retryable else 502,
+            content={"message": "OCR 처리 실패", "detail": exc.to_dict()},
+            headers=headers
+        )
+
     @app.exception_handler(ValueError)
     async def value_error_handler(request: Request, exc: ValueError):
         logging.error(f"[ValueError] {str(exc)}")
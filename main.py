@@ -1,13 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import resumes, postings, agent
+from fastapi.responses import JSONResponse
+from routers import resumes, postings, agent, runpod
 
 from exception.handlers import register_exception_handlers
+from services.embedding_service import get_embedding_cache_stats
+from services.ocr_service import get_ocr_cache_stats, ocr_client
+from services.runpod_client import runpod_client
+from services.model_service import scoring_batcher, eval_cache
+from services.upload_limit import RequestSizeLimitMiddleware
+from db.postings import postings_hydrator
+from db.resumes import resumes_hydrator
+from db.mongo import connect_mongo, close_mongo, ping_mongo
+from db.matches import match_updater
+from db.admin import run_startup_provisioning, run_archival_loop, provisioning_state
+from db.posting_import import cancel_posting_import
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 공용 Mongo 클라이언트 생성 (서버 접속은 첫 요청 시), 인덱스 프로비저닝 / 만료 공고 보관은 백그라운드로
+    connect_mongo()
+    background_tasks = [
+        asyncio.create_task(run_startup_provisioning()),
+        asyncio.create_task(run_archival_loop())
+    ]
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await cancel_posting_import()
+    await match_updater.close()
+    await ocr_client.close()
+    await runpod_client.close()
+    close_mongo()
+
+
+app = FastAPI(lifespan=lifespan)
 
 register_exception_handlers(app)
 
+# 요청 본문 크기 제한 (multipart 본문을 다 받기 전에 413, CORS 미들웨어 안쪽이라 413에도 CORS 헤더가 붙음)
+app.add_middleware(RequestSizeLimitMiddleware)
+
 # CORS 설정
 app.add_middleware(
     CORSMiddleware,
@@ -21,8 +57,44 @@ app.add_middleware(
 app.include_router(resumes.router, prefix="/resumes", tags=["Resume"])
 app.include_router(postings.router, prefix="/postings", tags=["Posting"])
 app.include_router(agent.router, prefix="/agent", tags=["Agent"])
+app.include_router(runpod.router, prefix="/runpod", tags=["RunPod"])
 
 
 @app.get("/")
 async def root():
     return {"message": "AI 이력서 매칭 API입니다."}
+
+
+# ==== 헬스 체크 ====
+# liveness: 프로세스 응답 여부만 확인
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+# readiness: MongoDB 연결 확인 (인덱스 프로비저닝 상태는 참고용으로 함께 노출)
+# 벡터 인덱스 정의가 현재 설정과 다르면($vectorSearch 실패) unavailable
+@app.get("/health/ready")
+async def readiness():
+    mongo_ok = await ping_mongo()
+    ready = mongo_ok and not provisioning_state.get("vector_index_differences")
+    body = {
+        "status": "ready" if ready else "unavailable",
+        "mongo": mongo_ok,
+        "provisioning": provisioning_state
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        "embedding": get_embedding_cache_stats(),
+        "ocr": get_ocr_cache_stats(),
+        "posting_documents": postings_hydrator.stats(),
+        "resume_documents": resumes_hydrator.stats(),
+        "pending_match_updates": match_updater.pending(),
+        "runpod": runpod_client.stats(),
+        "scoring_batches": scoring_batcher.stats(),
+        "evaluations": eval_cache.stats()
+    }
@@ -1,38 +1,46 @@
-from fastapi import APIRouter, UploadFile, File
-from services.ocr_service import extract_text_from_uploadfile, extract_text_from_path
-from db.resumes import search_similar_resumes_with_score
-from db.postings import store_job_posting, get_embedding_async
+from fastapi import APIRouter, UploadFile, File, Path
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from bson import ObjectId, errors
+from services.ocr_service import extract_text_from_uploadfile
+from db.resumes import search_similar_resumes_with_score, resumes_hydrator
+from db.matches import get_matches
+from db.posting_import import POSTING_IMPORT_DIR, start_posting_import, import_progress
 from exception.base import (
- JobPostingTextMissingException, SimilarFoundException
+ JobPostingTextMissingException, SimilarFoundException, InvalidObjectIdException, PostingNotFoundException
 )   
-from services.model_service import analyze_job_resume_matching
-import os, time, asyncio, re
+from services.model_service import analyze_job_resume_matching, evaluate_as_completed
+from typing import Optional
+from datetime import date
+import asyncio, json
 import logging
 
 router = APIRouter()
-PDF_DIR = "document"
+PDF_DIR = POSTING_IMPORT_DIR
 
 
-# ==== 채용공고 PDF OCR + 임베딩 저장 ====
-async def process_pdf_async(pdf_file: str):
-    filepath = os.path.join(PDF_DIR, pdf_file)
-    filename = os.path.basename(filepath)
-    try:
-        text = await extract_text_from_path(filepath)
-        if not text:
-            return filename, False
-        embedding = await get_embedding_async(text)
-        store_job_posting(filename[:-4], text, embedding)
-        return filename, True
-    except Exception as e:
-        logging.error(f"[{filename} 처리 실패] {e}")
-        return filename, False
+def _match_entry(match: dict, model_result) -> dict:
+    # 모델 결과에서 점수 추출 (평가 실패 시 점수 0)
+    if isinstance(model_result, dict) and "data" in model_result:
+        raw_result = model_result["data"]
 
+        # dict에서 직접 total_score 추출
+        if isinstance(raw_result, dict) and "total_score" in raw_result:
+            score = int(raw_result["total_score"])
+        else:
+            score = 0
+    else:
+        raw_result = "모델 평가 실패 ~~ "
+        score = 0
 
+    return {
+        "object_id": str(match.get("_id")),
+        "result": raw_result,
+        "total_score": score
+    }
 
-# ==== 채용공고 이력서 매칭 ====
-@router.post("/match_job_posting")
-async def match_job_posting(job_posting: UploadFile = File(...)):
+
+async def _find_matching_resumes(job_posting: UploadFile, mode: Optional[str]):
     # 1. 채용공고 텍스트 추출
     posting_text = await extract_text_from_uploadfile(job_posting)  # 채용공고 텍스트 추출
     if not posting_text or len(posting_text.strip()) < 10:
@@ -40,11 +48,18 @@ async def match_job_posting(job_posting: UploadFile = File(...)):
 
     # 2. 유사한 이력서 검색
     try:
-        top_matches = await search_similar_resumes_with_score(posting_text, top_k=5)  # 유사한 이력서 검색
+        top_matches = await search_similar_resumes_with_score(posting_text, top_k=5, mode=mode)  # 유사한 이력서 검색
         logging.info(f"[탑 매치 수]: {len(top_matches)}")
     except Exception as e:
         logging.error(f"[유사 이력서 검색 실패]: {e}")
         raise SimilarFoundException()  # 예외 발생 시
+    return posting_text, top_matches
+
+
+# ==== 채용공고 이력서 매칭 ====
+@router.post("/match_job_posting")
+async def match_job_posting(job_posting: UploadFile = File(...), mode: Optional[str] = None):
+    posting_text, top_matches = await _find_matching_resumes(job_posting, mode)
 
     # 3. 모델 평가 비동기 실행 (이제 RunPod Worker로 추론 요청)
     model_tasks = [
@@ -57,30 +72,8 @@ async def match_job_posting(job_posting: UploadFile = File(...)):
     model_results = await asyncio.gather(*model_tasks, return_exceptions=True)  # 비동기 평가 수행
 
     # 4. 결과 정리
-    results = []
-    for i, match in enumerate(top_matches):
-        model_result = model_results[i]
-
-        # 모델 결과가 <result> 태그로 시작하는지 확인
-        if isinstance(model_result, dict) and "data" in model_result:
-            raw_result = model_result["data"]
-            
-            # dict에서 직접 total_score 추출
-            if isinstance(raw_result, dict) and "total_score" in raw_result:
-                score = int(raw_result["total_score"])
-            else:
-                score = 0
-        else:
-            raw_result = "모델 평가 실패 ~~ "
-            score = 0
-
-        results.append({
-            "object_id": str(match.get("_id")),
-            "result": raw_result,
-            "total_score": score
-        })
-
-        final_results = sorted(results, key=lambda x: float(x["total_score"]), reverse=True)
+    results = [_match_entry(match, model_result) for match, model_result in zip(top_matches, model_results)]
+    final_results = sorted(results, key=lambda x: float(x["total_score"]), reverse=True)
 
     return {
         "matching_resume": [
@@ -90,23 +83,70 @@ async def match_job_posting(job_posting: UploadFile = File(...)):
     }
 
 
+# ==== 채용공고 매칭 스트리밍 (NDJSON, 한 줄에 이벤트 하나) ====
+# candidates: 검색된 이력서 목록 (평가 전) → match: 평가가 끝나는 순서대로 한 건씩 → summary: 점수순 최종 결과
+@router.post("/match_job_posting/stream")
+async def match_job_posting_stream(job_posting: UploadFile = File(...), mode: Optional[str] = None):
+    # 텍스트 추출 / 검색 오류는 스트리밍 시작 전에 일반 오류 응답으로 반환
+    posting_text, top_matches = await _find_matching_resumes(job_posting, mode)
+
+    def line(event: dict) -> str:
+        return json.dumps(jsonable_encoder(event), ensure_ascii=False) + "\n"
+
+    async def events():
+        yield line({
+            "event": "candidates",
+            "candidates": [{"index": i, "object_id": str(match.get("_id"))} for i, match in enumerate(top_matches)]
+        })
+        results = []
+        pairs = [(match.get("original_text", ""), posting_text) for match in top_matches]
+        async for i, model_result in evaluate_as_completed(pairs):
+            entry = _match_entry(top_matches[i], model_result)
+            results.append(entry)
+            yield line({"event": "match", "index": i, **entry})
+        final_results = sorted(results, key=lambda x: float(x["total_score"]), reverse=True)
+        yield line({
+            "event": "summary",
+            "matching_resume": [
+                {k: v for k, v in item.items() if k != "total_score"}
+                for item in final_results
+            ]
+        })
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 
-# ==== 채용공고 PDF 일괄 처리 ==== 채용공고는 하나씩 올리는게 번거로워 document에 있는 폴더의 pdf를 등록하게끔 해놨습니다. 나중에 수정 예정
-@router.post("/upload_postings_pdf")
-async def store_all_documents_endpoint_async():
-    start = time.time()
-    pdf_files = [f for f in os.listdir(PDF_DIR) if f.lower().endswith(".pdf")]
-    tasks = [process_pdf_async(f) for f in pdf_files]
-    results = await asyncio.gather(*tasks)
 
-    success = [f for f, ok in results if ok]
-    failed = [f for f, ok in results if not ok]
+# ==== 채용공고 ObjectId로 저장된 top-K 이력서 조회 (매칭 테이블) ====
+@router.get("/{posting_id}/matches")
+async def get_posting_matches(posting_id: str = Path(..., description="MongoDB posting 문서의 ObjectId")):
+    try:
+        object_id = ObjectId(posting_id)
+    except (errors.InvalidId, TypeError):
+        raise InvalidObjectIdException()
+
+    matches = await get_matches("posting", object_id)
+    if matches is None:
+        raise PostingNotFoundException()
 
+    resumes = await resumes_hydrator.hydrate(matches)
     return {
-        "total": len(pdf_files),
-        "success": len(success),
-        "failed": failed,
-        "elapsed_time": round(time.time() - start, 2)
+        "object_id": posting_id,
+        "matches": [
+            {**{k: v for k, v in resume.items() if k != "_id"}, "object_id": str(resume["_id"])}
+            for resume in resumes
+        ]
     }
-    
-    
\ No newline at end of file
+
+
+
+# ==== 채용공고 PDF 일괄 적재 (백그라운드 실행, 진행 상황은 /upload_postings_pdf/progress) ====
+# start_day / end_day 생략 시 오늘부터 POSTING_IMPORT_DEFAULT_DAYS일
+@router.post("/upload_postings_pdf")
+async def store_all_documents_endpoint_async(start_day: Optional[date] = None, end_day: Optional[date] = None):
+    return start_posting_import(PDF_DIR, start_day, end_day)
+
+
+@router.get("/upload_postings_pdf/progress")
+async def store_all_documents_progress():
+    return await import_progress()
@@ -1,27 +1,51 @@
 from fastapi import APIRouter, UploadFile, File, Path, Form
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from bson import ObjectId, errors
 from pydantic import BaseModel
 from typing import Optional
-from services.ocr_service import extract_text_from_uploadfile
-from services.model_service import analyze_job_resume_matching
-from db.postings import store_job_posting, search_similar_postings_with_score
+from services.ocr_service import extract_text_from_uploadfile, extract_document_from_uploadfile, document_text
+from services.model_service import analyze_job_resume_matching, evaluate_as_completed
+from db.postings import store_job_posting, search_similar_postings_with_score, postings_hydrator, is_active_posting
+from db.matches import get_matches
 from db.resumes import (
-    store_resume_from_pdf, process_resume_csv, resumes_collection
+    store_resume_from_pdf, ingest_resume_csv, delete_resume_document
 )
 from exception.base import (
     SimilarFoundException, ResumeTextMissingException,InvalidObjectIdException, MongoSaveException,
-    ResumeNotFoundException ,BothNotFoundException, ModelProcessingException, HTTPException
+    ResumeNotFoundException, BothNotFoundException, ModelProcessingException, HTTPException
 )
-import asyncio, logging
+import asyncio, json, logging
 from datetime import datetime
 import xml.etree.ElementTree as ET
 
 router = APIRouter()
 
 
-@router.post("/match_resume")
-async def match_resume(resume: UploadFile = File(...)):
+def _match_entry(match: dict, model_result) -> dict:
+    # 모델 평가 결과 → 응답 항목 (평가 실패 시 점수 0)
+    if isinstance(model_result, dict) and "data" in model_result:
+        raw_result = model_result["data"]
+
+        # dict에서 직접 total_score 추출
+        if isinstance(raw_result, dict) and "total_score" in raw_result:
+            score = int(raw_result["total_score"])
+        else:
+            score = 0
+    else:
+        raw_result = "모델 평가 실패 ~~"
+        score = 0
+
+    return {
+        "object_id": str(match.get("_id")),
+        "result": raw_result,
+        "startDay": match.get("startDay", ""),
+        "endDay": match.get("endDay", ""),
+        "total_score": score
+    }
+
 
+async def _find_matching_postings(resume: UploadFile, mode: Optional[str]):
     resume_text = await extract_text_from_uploadfile(resume)
 
     if not resume_text or len(resume_text.strip()) < 10:
@@ -29,11 +53,18 @@ async def match_resume(resume: UploadFile = File(...)):
 
     # 2. 유사한 채용공고 검색
     try:
-        top_matches = await search_similar_postings_with_score(resume_text, top_k=5)
+        top_matches = await search_similar_postings_with_score(resume_text, top_k=5, mode=mode)
         logging.info(f"[탑 매치 수]: {len(top_matches)}")
     except Exception as e:
         logging.error(f"[유사 채용공고 검색 실패]: {e}")
         raise SimilarFoundException()
+    return resume_text, top_matches
+
+
+@router.post("/match_resume")
+async def match_resume(resume: UploadFile = File(...), mode: Optional[str] = None):
+
+    resume_text, top_matches = await _find_matching_postings(resume, mode)
 
     # 3. 모델 평가 비동기 실행
     model_tasks = [
@@ -44,32 +75,8 @@ async def match_resume(resume: UploadFile = File(...)):
         for match in top_matches
     ]
     model_results = await asyncio.gather(*model_tasks, return_exceptions=True)
-    results = []
-    for i, match in enumerate(top_matches):
-        model_result = model_results[i]
-
-        if isinstance(model_result, dict) and "data" in model_result:
-            raw_result = model_result["data"]
-            
-            # dict에서 직접 total_score 추출
-            if isinstance(raw_result, dict) and "total_score" in raw_result:
-                score = int(raw_result["total_score"])
-            else:
-                score = 0
-        else:
-            raw_result = "모델 평가 실패 ~~"
-            score = 0
-
-        results.append({
-            "object_id": str(match.get("_id")),
-            "result": raw_result,
-            "startDay": match.get("startDay", ""),
-            "endDay": match.get("endDay", ""),
-            "total_score": score
-        })
-
-        final_results = sorted(results, key=lambda x: float(x["total_score"]), reverse=True)
-        print(score)
+    results = [_match_entry(match, model_result) for match, model_result in zip(top_matches, model_results)]
+    final_results = sorted(results, key=lambda x: float(x["total_score"]), reverse=True)
     return {
         "resume_text": resume_text,
         "matching_resumes": [
@@ -79,6 +86,45 @@ async def match_resume(resume: UploadFile = File(...)):
     }
 
 
+# ==== 이력서 매칭 스트리밍 (NDJSON, 한 줄에 이벤트 하나) ====
+# candidates: 검색된 공고 목록 (평가 전) → match: 평가가 끝나는 순서대로 한 건씩 → summary: 점수순 최종 결과
+@router.post("/match_resume/stream")
+async def match_resume_stream(resume: UploadFile = File(...), mode: Optional[str] = None):
+
+    # 텍스트 추출 / 검색 오류는 스트리밍 시작 전에 일반 오류 응답으로 반환
+    resume_text, top_matches = await _find_matching_postings(resume, mode)
+
+    def line(event: dict) -> str:
+        return json.dumps(jsonable_encoder(event), ensure_ascii=False) + "\n"
+
+    async def events():
+        yield line({
+            "event": "candidates",
+            "resume_text": resume_text,
+            "candidates": [
+                {"index": i, "object_id": str(match.get("_id")), "startDay": match.get("startDay", ""),
+                 "endDay": match.get("endDay", "")}
+                for i, match in enumerate(top_matches)
+            ]
+        })
+        results = []
+        pairs = [(resume_text, match.get("original_text", "")) for match in top_matches]
+        async for i, model_result in evaluate_as_completed(pairs):
+            entry = _match_entry(top_matches[i], model_result)
+            results.append(entry)
+            yield line({"event": "match", "index": i, **entry})
+        final_results = sorted(results, key=lambda x: float(x["total_score"]), reverse=True)
+        yield line({
+            "event": "summary",
+            "matching_resumes": [
+                {k: v for k, v in item.items() if k != "total_score"}
+                for item in final_results
+            ]
+        })
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 def parse_date(date_str: str):
     try:
         return datetime.strptime(date_str, "%Y-%m-%d").date()
@@ -95,7 +141,8 @@ async def upload_pdf_endpoint(
 ):
     try:
         print("저장요청")
-        text  = await extract_text_from_uploadfile(file)
+        extracted = await extract_document_from_uploadfile(file)
+        text  = document_text(extracted)
 
         if not text  or len(text .strip()) < 10:
             raise ResumeTextMissingException()
@@ -104,18 +151,21 @@ async def upload_pdf_endpoint(
         if start_day and end_day:
             start_date = parse_date(start_day)
             end_date = parse_date(end_day)
-            object_id = await store_job_posting(
+            object_id, duplicate = await store_job_posting(
                 job_text=text ,
                 start_day=start_date,
                 end_day=end_date
             )
         else:
-            object_id = await store_resume_from_pdf(text)
+            object_id, duplicate = await store_resume_from_pdf(text)
 
         if not object_id:
             raise MongoSaveException()
 
-        return {"object_id": object_id}
+        # duplicate: None(새로 저장) | "exact"(기존 문서의 object_id, 공고는 게시 기간 갱신)
+        #            | "near"(DEDUP_NEAR_DUPLICATES=flag: 새로 저장 후 표시 / skip: 기존 문서의 object_id)
+        # extraction_method: text_layer(PDF 텍스트) | ocr | mixed(일부 페이지만 OCR)
+        return {"object_id": object_id, "duplicate": duplicate, "extraction_method": extracted["method"]}
 
     except Exception as e:
         logging.error(f"[업로드 실패]: {e}")
@@ -130,13 +180,37 @@ async def delete_resume(resume_id: str = Path(..., description="MongoDB resume 
     except (errors.InvalidId, TypeError):
         raise InvalidObjectIdException()
 
-    result = resumes_collection.delete_one({"_id": object_id})
-    if result.deleted_count == 0:
+    deleted_count = await delete_resume_document(object_id)
+    if deleted_count == 0:
         raise ResumeNotFoundException()
 
     return {"message": "이력서 삭제 완료", "object_id": resume_id}
 
 
+# ==== 이력서 ObjectId로 저장된 top-K 채용공고 조회 (매칭 테이블) ====
+@router.get("/{resume_id}/matches")
+async def get_resume_matches(resume_id: str = Path(..., description="MongoDB resume 문서의 ObjectId")):
+    try:
+        object_id = ObjectId(resume_id)
+    except (errors.InvalidId, TypeError):
+        raise InvalidObjectIdException()
+
+    matches = await get_matches("resume", object_id)
+    if matches is None:
+        raise ResumeNotFoundException()
+
+    # 보관 전이지만 이미 마감되었거나 아직 게시 전인 공고는 제외 (검색과 같은 기간 조건)
+    postings = await postings_hydrator.hydrate(matches)
+    return {
+        "object_id": resume_id,
+        "matches": [
+            {**{k: v for k, v in posting.items() if k != "_id"}, "object_id": str(posting["_id"])}
+            for posting in postings
+            if is_active_posting(posting)
+        ]
+    }
+
+
 # ==== 이력서 & 채용공고 1:1 매칭 ====  agent 연동 
 @router.post("/compare_resume_posting")
 async def compare_resume_posting(
@@ -167,13 +241,14 @@ async def compare_resume_posting(
 @router.post("/upload_resume_csv")
 async def upload_resume_csv(file: UploadFile = File(...)):
     try:
-        content = await file.read()
-        inserted_count = process_resume_csv(content)
+        report = await ingest_resume_csv(file.file)
+        inserted_count = report["inserted"]
 
         return {
             "message": f"{file.filename}에서 {inserted_count}개의 유효한 이력서를 저장했습니다.",
             "file": file.filename,
-            "inserted": inserted_count
+            "inserted": inserted_count,
+            "report": report
         }
  
     except Exception as e:
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Body
+from typing import Any, Dict, Optional
+from services.runpod_client import runpod_client, verify_webhook_token, webhook_enabled
+from exception.base import WebhookUnauthorizedException, WebhookDisabledException
+import logging
+
+router = APIRouter()
+
+
+# ==== RunPod 작업 완료 콜백 (RUNPOD_RUN_MODE=webhook) ====
+# RunPod이 /status 응답과 같은 형식({"id", "status", "output"})으로 호출
+# webhook 모드가 아니면 404, 토큰(RUNPOD_WEBHOOK_SECRET)이 맞지 않으면 403
+@router.post("/webhook")
+async def runpod_webhook(payload: Dict[str, Any] = Body(...), token: Optional[str] = None):
+    if not webhook_enabled():
+        raise WebhookDisabledException()
+    if not verify_webhook_token(token):
+        raise WebhookUnauthorizedException()
+    delivered = runpod_client.complete(payload)
+    logging.info(f"[RunPod 콜백 수신] ID = {payload.get('id')} / {payload.get('status')} (대기 중인 요청: {delivered})")
+    return {"received": True}
@@ -0,0 +1,102 @@
+"""
+임베딩 차원 축소(Matryoshka) 벤치마크
+- 원본 차원 exact 검색 결과를 기준으로 축소 차원별 top-k recall / 검색 지연 / 인덱스 메모리 측정
+- 코퍼스는 컬렉션에 저장된 embedding, 질의는 코퍼스에서 뽑은 문서(자기 자신은 제외)
+
+사용 예:
+    python -m scripts.benchmark_embedding_dims --collection postings --dims 1536 1024 512 256
+    python -m scripts.benchmark_embedding_dims --collection resumes --mode hnsw --dtype float16
+"""
+import os
+import time
+import argparse
+import logging
+import certifi
+import numpy as np
+from bson import ObjectId
+from pymongo import MongoClient
+from dotenv import load_dotenv
+from db.embedding_codec import decode_embedding
+from db.vector_index import LocalVectorIndex
+from services.embedding_service import EMBEDDING_MODEL_DIMENSIONS
+
+load_dotenv()
+logging.basicConfig(level=logging.WARNING, format='[%(levelname)s] %(message)s')
+
+
+def load_corpus(collection_name: str, limit: int) -> tuple[list, np.ndarray]:
+    client = MongoClient(os.getenv("MONGODB_URI"), tlsCAFile=certifi.where())
+    cursor = client["Rezoom"][collection_name].find({}, {"embedding": 1}).limit(limit).batch_size(1000)
+    ids, rows = [], []
+    for doc in cursor:
+        vector = decode_embedding(doc.get("embedding"))
+        if vector is not None and len(vector) == EMBEDDING_MODEL_DIMENSIONS:
+            ids.append(doc["_id"])
+            rows.append(vector.astype(np.float32))
+    return ids, np.vstack(rows) if rows else np.zeros((0, EMBEDDING_MODEL_DIMENSIONS), dtype=np.float32)
+
+
+def run(ids: list, vectors: np.ndarray, dims: list, top_k: int, num_queries: int, mode: str, dtype: str):
+    rng = np.random.default_rng(42)
+    query_rows = rng.choice(len(ids), size=min(num_queries, len(ids)), replace=False)
+
+    def build(dim: int, index_mode: str, index_dtype: str) -> LocalVectorIndex:
+        index = LocalVectorIndex(f"bench{dim}", dim, dtype=index_dtype, mode=index_mode, directory="")
+        index.add(ids, vectors)
+        if index_mode == "hnsw":
+            index._build_graph()
+        index.loaded = True
+        return index
+
+    # 기준: 원본 차원 float32 exact 검색 (자기 자신 제외 top_k)
+    baseline_index = build(EMBEDDING_MODEL_DIMENSIONS, "exact", "float32")
+    baseline = {}
+    for row in query_rows:
+        hits = baseline_index.search(vectors[row], top_k + 1)
+        baseline[row] = set([oid for oid, _ in hits if oid != ids[row]][:top_k])
+
+    print(f"corpus={len(ids)} queries={len(query_rows)} top_k={top_k} mode={mode} dtype={dtype}")
+    print(f"{'dims':>6} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'index MB':>9}")
+    for dim in dims:
+        index = build(dim, mode, dtype)
+        recalls, latencies = [], []
+        for row in query_rows:
+            start = time.perf_counter()
+            hits = index.search(vectors[row], top_k + 1)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found = [oid for oid, _ in hits if oid != ids[row]][:top_k]
+            expected = baseline[row]
+            recalls.append(len(expected.intersection(found)) / max(len(expected), 1))
+        memory_mb = index._matrix[:index._size].nbytes / (1024 * 1024)
+        print(
+            f"{dim:>6} {np.mean(recalls):>9.3f} {np.percentile(latencies, 50):>8.2f} "
+            f"{np.percentile(latencies, 95):>8.2f} {memory_mb:>9.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩 차원별 recall / 지연 / 메모리 벤치마크")
+    parser.add_argument("--collection", default="postings", choices=["postings", "resumes"])
+    parser.add_argument("--dims", type=int, nargs="+", default=[1536, 1024, 512, 256, 128])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100000, help="코퍼스 최대 문서 수")
+    parser.add_argument("--mode", default="exact", choices=["exact", "hnsw"])
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--synthetic", type=int, default=0, help="DB 대신 N개의 임의 벡터 사용 (동작 확인용)")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(args.synthetic, EMBEDDING_MODEL_DIMENSIONS)).astype(np.float32)
+        ids = [ObjectId() for _ in range(args.synthetic)]
+    else:
+        ids, vectors = load_corpus(args.collection, args.limit)
+    if len(ids) <= args.top_k:
+        raise SystemExit("벤치마크할 임베딩이 부족합니다.")
+
+    run(ids, vectors, args.dims, args.top_k, args.queries, args.mode, args.dtype)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+평가 마이크로 배칭 점검 (RunPod 로컬 대역 서버 사용)
+- 배치를 지원하는 워커: 동시 요청이 배치 작업으로 묶여 모두 결과를 받는지
+- 배치를 지원하지 않는 워커(--no-batch): 배치 작업이 실패해도 단건 재요청으로 모두 결과를 받는지
+
+사용 예:
+    python -m scripts.check_scoring_batch --pairs 8
+    python -m scripts.check_scoring_batch --no-batch
+"""
+import os
+import sys
+import asyncio
+import argparse
+import logging
+from aiohttp import web
+
+PORT = 8011
+os.environ.setdefault("RUNPOD_API_KEY", "stub")
+os.environ["RUNPOD_BASE_URL"] = f"http://127.0.0.1:{PORT}/v2"
+os.environ["RUNPOD_RUN_MODE"] = "sync"
+
+from scripts.runpod_stub import create_app, SAMPLE_RESULT  # noqa: E402
+from services.runpod_client import runpod_client  # noqa: E402
+from services.model_service import ScoringBatcher  # noqa: E402
+
+logging.basicConfig(level=logging.WARNING, format='[%(levelname)s] %(message)s')
+
+
+async def check(pairs: int, batch: bool) -> bool:
+    runner = web.AppRunner(create_app(0.1, batch=batch))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+    batcher = ScoringBatcher(window_ms=50, max_batch_size=pairs)
+    try:
+        results = await asyncio.gather(
+            *(batcher.score(f"이력서 {i}", f"공고 {i}") for i in range(pairs)), return_exceptions=True
+        )
+    finally:
+        await runpod_client.close()
+        await runner.cleanup()
+
+    ok = all(isinstance(result, dict) and result.get("result") == SAMPLE_RESULT for result in results)
+    print(f"워커 배치 지원: {batch} / 결과 {sum(isinstance(r, dict) for r in results)}/{pairs} / {batcher.stats()}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="평가 마이크로 배칭 점검")
+    parser.add_argument("--pairs", type=int, default=8, help="동시에 보낼 (이력서, 공고) 쌍 수")
+    parser.add_argument("--no-batch", action="store_true", help="배치 입력을 지원하지 않는 워커로 점검")
+    args = parser.parse_args()
+    ok = asyncio.run(check(args.pairs, not args.no_batch))
+    print("통과" if ok else "실패")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
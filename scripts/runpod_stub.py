@@ -0,0 +1,127 @@
+"""
+RunPod 서버리스 엔드포인트 로컬 대역 서버 (RunPod 클라이언트 / webhook 모드 테스트용)
+
+/run, /runsync, /status/{id}, /cancel/{id}를 흉내 내고, 작업은 --delay 초 뒤에 고정 평가 결과로 완료
+/run 요청에 "webhook"이 있으면 완료 시 그 주소로 결과를 POST (RunPod과 같은 형식)
+입력이 {"batch": [...]} 이면 {"results": [...]} 로 쌍마다 결과를 돌려줌
+(--no-batch: 배치 미지원 워커처럼 batch 입력 작업을 FAILED로 끝냄)
+
+사용 예:
+    python -m scripts.runpod_stub --port 8001 --delay 1.5
+    RUNPOD_BASE_URL=http://127.0.0.1:8001/v2 RUNPOD_RUN_MODE=webhook RUNPOD_WEBHOOK_SECRET=local \\
+        RUNPOD_WEBHOOK_URL=http://127.0.0.1:8000/runpod/webhook uvicorn main:app
+"""
+import time
+import uuid
+import asyncio
+import argparse
+import logging
+from aiohttp import web, ClientSession
+
+logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+
+SAMPLE_RESULT = (
+    "<result><total_score>78</total_score><resume_score>40</resume_score><selfintro_score>38</selfintro_score>"
+    "<summary>로컬 대역 서버 평가 결과</summary><eval_resume>경력 요건 충족</eval_resume>"
+    "<eval_selfintro>지원 동기 명확</eval_selfintro></result>"
+)
+
+
+class StubEndpoint:
+
+    def __init__(self, delay: float, drop_webhooks: bool = False, batch: bool = True):
+        self.delay = delay
+        self.drop_webhooks = drop_webhooks  # 콜백을 보내지 않음 (폴링 대체 경로 확인용)
+        self.batch = batch
+        self.jobs = {}
+
+    def _status(self, job_id: str) -> dict:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return {"id": job_id, "status": "NOT_FOUND"}
+        if job["status"] == "CANCELLED":
+            return {"id": job_id, "status": "CANCELLED"}
+        if time.monotonic() < job["done_at"]:
+            return {"id": job_id, "status": "IN_PROGRESS"}
+        job_input = job["input"] or {}
+        if "batch" in job_input and not self.batch:
+            # 단건 입력만 아는 워커: input["resume"] 조회에서 예외 → 작업 실패
+            return {"id": job_id, "status": "FAILED", "error": "KeyError: 'resume'"}
+        if isinstance(job_input.get("batch"), list):
+            output = {"results": [{"result": SAMPLE_RESULT} for _ in job_input["batch"]]}
+        else:
+            output = {"result": SAMPLE_RESULT}
+        return {
+            "id": job_id,
+            "status": "COMPLETED",
+            "delayTime": 0,
+            "executionTime": int(self.delay * 1000),
+            "output": output
+        }
+
+    def _create(self, body: dict) -> str:
+        job_id = uuid.uuid4().hex
+        self.jobs[job_id] = {"status": "IN_PROGRESS", "done_at": time.monotonic() + self.delay, "input": body.get("input")}
+        return job_id
+
+    async def _send_webhook(self, url: str, job_id: str):
+        await asyncio.sleep(self.delay)
+        if self.drop_webhooks:
+            return
+        try:
+            async with ClientSession() as session:
+                async with session.post(url, json=self._status(job_id)) as resp:
+                    logging.info(f"[콜백 전송] {job_id} → {resp.status}")
+        except Exception as e:
+            logging.error(f"[콜백 전송 실패] {job_id}: {e}")
+
+    async def run(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        job_id = self._create(body)
+        if body.get("webhook"):
+            asyncio.create_task(self._send_webhook(body["webhook"], job_id))
+        return web.json_response({"id": job_id, "status": "IN_QUEUE"})
+
+    async def runsync(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        job_id = self._create(body)
+        wait = int(request.query.get("wait", "90000")) / 1000
+        await asyncio.sleep(min(wait, self.delay))
+        return web.json_response(self._status(job_id))
+
+    async def status(self, request: web.Request) -> web.Response:
+        return web.json_response(self._status(request.match_info["job_id"]))
+
+    async def cancel(self, request: web.Request) -> web.Response:
+        job = self.jobs.get(request.match_info["job_id"])
+        if job is None:
+            return web.json_response({"error": "not found"}, status=404)
+        job["status"] = "CANCELLED"
+        return web.json_response({"id": request.match_info["job_id"], "status": "CANCELLED"})
+
+
+def create_app(delay: float, drop_webhooks: bool = False, batch: bool = True) -> web.Application:
+    endpoint = StubEndpoint(delay, drop_webhooks, batch)
+    app = web.Application()
+    app.add_routes([
+        web.post("/v2/{endpoint_id}/run", endpoint.run),
+        web.post("/v2/{endpoint_id}/runsync", endpoint.runsync),
+        web.get("/v2/{endpoint_id}/status/{job_id}", endpoint.status),
+        web.post("/v2/{endpoint_id}/cancel/{job_id}", endpoint.cancel),
+    ])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RunPod 로컬 대역 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=1.0, help="작업 완료까지 걸리는 시간(초)")
+    parser.add_argument("--drop-webhooks", action="store_true", help="콜백을 보내지 않음 (폴링 대체 확인)")
+    parser.add_argument("--no-batch", action="store_true", help="배치 입력을 지원하지 않는 워커처럼 batch 작업을 실패 처리")
+    args = parser.parse_args()
+    web.run_app(create_app(args.delay, args.drop_webhooks, not args.no_batch), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
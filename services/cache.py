@@ -0,0 +1,222 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+class LRUCache:
+    """
+    프로세스 메모리 LRU 캐시 (최대 항목 수 기준 제거, ttl_seconds 지정 시 저장 후 만료)
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            if self.ttl_seconds is not None and self._expires.get(key, 0) <= time.time():
+                del self._data[key]
+                self._expires.pop(key, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def set(self, key: str, value: Any):
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.ttl_seconds is not None:
+                self._expires[key] = time.time() + self.ttl_seconds
+            while len(self._data) > self.max_entries:
+                evicted, _ = self._data.popitem(last=False)
+                self._expires.pop(evicted, None)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+class SqliteStore:
+    """
+    로컬 SQLite 파일 기반 영속 key-value 저장소
+    - 최대 항목 수를 넘으면 가장 오래 접근하지 않은 항목부터 제거
+    - ttl_seconds 지정 시 저장 후 그 시간이 지난 항목은 없는 것으로 보고 정리
+    """
+
+    def __init__(self, path: str, table: str, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.table = table
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed_at REAL NOT NULL, created_at REAL)"
+        )
+        # created_at 컬럼이 없던 기존 파일 보완
+        columns = [row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")]
+        if "created_at" not in columns:
+            self._conn.execute(f"ALTER TABLE {table} ADD COLUMN created_at REAL")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_created_at ON {table} (created_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl_seconds is not None and (row[1] or 0) + self.ttl_seconds <= time.time():
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: bytes):
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, accessed_at, created_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            if self.ttl_seconds is not None:
+                expired = self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE created_at IS NULL OR created_at <= ?", (now - self.ttl_seconds,)
+                ).rowcount
+                self.evictions += expired
+            count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            if count > self.max_entries:
+                # 매번 한 건씩 지우지 않도록 한도의 10%를 여유로 확보
+                overflow = count - self.max_entries + max(1, self.max_entries // 10)
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "size": len(self),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+class TieredCache:
+    """
+    메모리 LRU + 영속 저장소 2단 캐시
+    - 영속 계층에는 bytes로 저장하므로 encode / decode 함수를 받음
+    - 영속 계층에서 찾은 값은 메모리 계층으로 다시 올림
+    """
+
+    def __init__(
+        self,
+        memory: LRUCache,
+        store: Optional[SqliteStore],
+        encode: Callable[[Any], bytes],
+        decode: Callable[[bytes], Any]
+    ):
+        self.memory = memory
+        self.store = store
+        self.encode = encode
+        self.decode = decode
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        return self.load(key)
+
+    def load(self, key: str) -> Optional[Any]:
+        """
+        영속 계층만 조회 (디스크 I/O가 있으므로 비동기 코드에서는 스레드로 호출)
+        """
+        if self.store is None:
+            return None
+        try:
+            raw = self.store.get(key)
+        except Exception as e:
+            logging.error(f"[캐시 조회 실패]: {e}")
+            return None
+        if raw is None:
+            return None
+        value = self.decode(raw)
+        self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self.store is None:
+            return
+        try:
+            self.store.set(key, self.encode(value))
+        except Exception as e:
+            logging.error(f"[캐시 저장 실패]: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats(),
+            "persistent": self.store.stats() if self.store else None
+        }
@@ -0,0 +1,121 @@
+import os
+import re
+import math
+from typing import List, Tuple
+from dotenv import load_dotenv
+from services.embedding_service import estimate_tokens, get_embeddings
+
+load_dotenv()
+
+# 청크당 최대 추정 토큰 수 (모델 입력 한도 8191보다 충분히 작게)
+EMBEDDING_CHUNK_TOKENS = int(os.getenv("EMBEDDING_CHUNK_TOKENS", "1500"))
+
+# 섹션 시작으로 보는 줄 (마크다운 제목, [경력] / 【학력】, ■ ▶ ● 글머리, "1." / "IV." 번호)
+_HEADING_PATTERN = re.compile(r"^\s*(#{1,6}\s|\[[^\]]{1,30}\]|【[^】]{1,30}】|[■□▶●◆]|\d{1,2}\.\s|[IVX]{1,4}\.\s)")
+_SENTENCE_END = re.compile(r"(?<=[.!?。])\s+")
+
+
+def _split_blocks(text: str) -> List[tuple[bool, str]]:
+    """
+    빈 줄 / 섹션 제목 줄 기준으로 블록 분리 → [(제목으로 시작하는지, 블록 텍스트)]
+    """
+    blocks, current, current_heading = [], [], False
+    for line in text.replace("\r\n", "\n").split("\n"):
+        is_heading = bool(_HEADING_PATTERN.match(line))
+        if (not line.strip() or is_heading) and current:
+            blocks.append((current_heading, "\n".join(current)))
+            current, current_heading = [], False
+        if line.strip():
+            if not current:
+                current_heading = is_heading
+            current.append(line)
+    if current:
+        blocks.append((current_heading, "\n".join(current)))
+    return blocks
+
+
+def _split_oversized(block: str, max_tokens: int) -> List[str]:
+    """
+    한도를 넘는 블록은 문장 단위로, 문장도 넘으면 글자 수 기준으로 자름
+    """
+    pieces, current = [], ""
+    for sentence in _SENTENCE_END.split(block):
+        if current and estimate_tokens(sentence) > max_tokens:
+            pieces.append(current)
+            current = ""
+        while estimate_tokens(sentence) > max_tokens:
+            # 추정 토큰 비율로 자를 위치 계산
+            cut = max(1, int(len(sentence) * max_tokens / estimate_tokens(sentence)))
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:]
+        candidate = f"{current} {sentence}".strip()
+        if current and estimate_tokens(candidate) > max_tokens:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_text(text: str, max_tokens: int = EMBEDDING_CHUNK_TOKENS) -> List[str]:
+    """
+    임베딩용 청크 분할
+    - 섹션 / 문단 단위로 토큰 한도까지 묶음
+    - 새 섹션은 현재 청크가 한도의 절반을 넘었으면 새 청크에서 시작
+    - 짧은 문서는 청크 하나
+    """
+    if not text or not text.strip():
+        return []
+    if estimate_tokens(text) <= max_tokens:
+        return [text.strip()]
+
+    chunks, current, current_tokens = [], [], 0
+    for is_heading, block in _split_blocks(text):
+        parts = [block] if estimate_tokens(block) <= max_tokens else _split_oversized(block, max_tokens)
+        for i, part in enumerate(parts):
+            tokens = estimate_tokens(part)
+            section_break = is_heading and i == 0 and current_tokens > max_tokens // 2
+            if current and (section_break or current_tokens + tokens > max_tokens):
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def mean_embedding(vectors: List[List[float]]) -> List[float]:
+    """
+    청크 벡터 평균 후 L2 정규화 (문서 대표 벡터)
+    """
+    if not vectors:
+        return []
+    if len(vectors) == 1:
+        return vectors[0]
+    mean = [sum(values) / len(vectors) for values in zip(*vectors)]
+    norm = math.sqrt(sum(v * v for v in mean)) or 1.0
+    return [v / norm for v in mean]
+
+
+async def embed_documents(texts: List[str]) -> List[Tuple[List[float], List[Tuple[str, List[float]]]]]:
+    """
+    문서별 (대표 벡터, [(청크 텍스트, 청크 벡터)]) 반환
+    - 모든 문서의 청크를 한 번에 요청해 배처가 묶어서 전송
+    - 임베딩에 실패한 청크는 제외, 전부 실패하면 대표 벡터는 []
+    """
+    chunked = [split_text(text) for text in texts]
+    flat = [chunk for chunks in chunked for chunk in chunks]
+    vectors = iter(await get_embeddings(flat))
+
+    results = []
+    for chunks in chunked:
+        embedded = [(chunk, vector) for chunk, vector in zip(chunks, vectors) if vector]
+        results.append((mean_embedding([vector for _, vector in embedded]), embedded))
+    return results
+
+
+async def embed_document(text: str) -> Tuple[List[float], List[Tuple[str, List[float]]]]:
+    return (await embed_documents([text]))[0]
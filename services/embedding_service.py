@@ -0,0 +1,240 @@
+import os
+import re
+import math
+import logging
+import asyncio
+import hashlib
+import unicodedata
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+from openai import OpenAI
+from dotenv import load_dotenv
+from services.cache import LRUCache, SqliteStore, TieredCache
+
+load_dotenv()
+
+# OpenAI client (postings / resumes 공용)
+openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_MODEL_DIMENSIONS = 1536  # 모델 원본 차원
+# 저장 / 검색에 쓰는 차원 (Matryoshka 방식으로 앞부분만 잘라 재정규화, 예: 256 / 512)
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", str(EMBEDDING_MODEL_DIMENSIONS)))
+if not 0 < EMBEDDING_DIMENSIONS <= EMBEDDING_MODEL_DIMENSIONS:
+    raise ValueError(f"EMBEDDING_DIMENSIONS는 1~{EMBEDDING_MODEL_DIMENSIONS} 범위여야 합니다: {EMBEDDING_DIMENSIONS}")
+
+# 마이크로 배칭 설정
+# - 윈도우 동안 모인 요청을 하나의 multi-input 호출로 전송
+# - 배치 크기 / 추정 토큰 수 중 하나라도 한도에 닿으면 즉시 전송
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "20"))
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64"))
+EMBEDDING_MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "100000"))
+
+# 임베딩 캐시 설정 (경로를 비우면 영속 계층 없이 메모리만 사용)
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "2048"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토크나이저 없이 쓰는 보수적인 토큰 수 추정 (영문 약 4자/토큰, 한글 등 비ASCII는 1자/토큰)
+    """
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def truncate_embedding(embedding: List[float], dimensions: int = EMBEDDING_DIMENSIONS) -> List[float]:
+    """
+    Matryoshka 방식 차원 축소 - 앞 dimensions개만 남기고 L2 재정규화
+    """
+    if not embedding or len(embedding) <= dimensions:
+        return embedding
+    head = embedding[:dimensions]
+    norm = math.sqrt(sum(v * v for v in head)) or 1.0
+    return [v / norm for v in head]
+
+
+def _valid_embedding(embedding: List[float]) -> bool:
+    if not embedding or len(embedding) != EMBEDDING_MODEL_DIMENSIONS:
+        logging.error(f"[임베딩 오류] 벡터 길이 오류: {len(embedding) if embedding else 0}")
+        return False
+    return True
+
+
+# 동기 임베딩 함수 (여러 텍스트를 한 번의 API 호출로 처리)
+def _sync_get_embeddings(texts: List[str]) -> List[List[float]]:
+    if not texts:
+        return []
+    try:
+        response = openai_client.embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=[t.strip() for t in texts]
+        )
+        # 응답 순서는 index 기준으로 보장
+        ordered = sorted(response.data, key=lambda d: d.index)
+        return [d.embedding if _valid_embedding(d.embedding) else [] for d in ordered]
+    except Exception as e:
+        if len(texts) == 1:
+            logging.error(f"[임베딩 생성 실패]: {e}")
+            return [[]]
+        # 입력 하나가 배치 전체를 실패시키지 않도록 개별 호출로 재시도
+        logging.warning(f"[배치 임베딩 실패 → 개별 재시도] {len(texts)}건: {e}")
+        return [_sync_get_embeddings([t])[0] for t in texts]
+
+
+class EmbeddingBatcher:
+    """
+    동시에 들어온 임베딩 요청을 짧은 윈도우 동안 모아서 한 번에 보내고,
+    결과를 각 호출자에게 돌려주는 마이크로 배처
+    """
+
+    def __init__(self, window_ms: float, max_batch_size: int, max_batch_tokens: int):
+        self.window = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_tokens = max(1, max_batch_tokens)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[str, int, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _bind_loop(self):
+        # asyncio.run()으로 새 루프가 생기는 경우(스크립트 등) 이전 루프의 상태는 버림
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._pending = []
+            self._pending_tokens = 0
+            self._timer = None
+        return loop
+
+    async def embed(self, text: str) -> List[float]:
+        loop = self._bind_loop()
+        future = loop.create_future()
+        tokens = estimate_tokens(text)
+        self._pending.append((text, tokens, future))
+        self._pending_tokens += tokens
+
+        if len(self._pending) >= self.max_batch_size or self._pending_tokens >= self.max_batch_tokens:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._pending_tokens = self._pending, [], 0
+
+        # 크기 / 토큰 한도에 맞춰 배치 분할
+        batch, batch_tokens = [], 0
+        for item in pending:
+            if batch and (len(batch) >= self.max_batch_size or batch_tokens + item[1] > self.max_batch_tokens):
+                self._loop.create_task(self._run_batch(batch))
+                batch, batch_tokens = [], 0
+            batch.append(item)
+            batch_tokens += item[1]
+        if batch:
+            self._loop.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[Tuple[str, int, asyncio.Future]]):
+        texts = [text for text, _, _ in batch]
+        try:
+            embeddings = await asyncio.to_thread(_sync_get_embeddings, texts)
+        except Exception as e:
+            logging.error(f"[임베딩 배치 처리 실패]: {e}")
+            embeddings = [[] for _ in batch]
+
+        logging.info(f"[임베딩 배치 전송] {len(batch)}건")
+        for (_, _, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+
+embedding_batcher = EmbeddingBatcher(
+    window_ms=EMBEDDING_BATCH_WINDOW_MS,
+    max_batch_size=EMBEDDING_MAX_BATCH_SIZE,
+    max_batch_tokens=EMBEDDING_MAX_BATCH_TOKENS
+)
+
+
+def normalize_text(text: str) -> str:
+    """
+    캐시 키 / 임베딩 입력용 정규화 (유니코드 NFC + 공백 정리)
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def embedding_cache_key(normalized_text: str) -> str:
+    digest = hashlib.sha256(f"{EMBEDDING_MODEL}\0{normalized_text}".encode("utf-8")).hexdigest()
+    return f"{EMBEDDING_MODEL}:{digest}"
+
+
+def _encode_vector(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _decode_vector(raw: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(raw)
+    return values.tolist()
+
+
+def _build_embedding_cache() -> TieredCache:
+    store = None
+    if EMBEDDING_CACHE_PATH:
+        try:
+            store = SqliteStore(EMBEDDING_CACHE_PATH, "embeddings", EMBEDDING_CACHE_MAX_ENTRIES)
+        except Exception as e:
+            logging.error(f"[임베딩 캐시 저장소 초기화 실패 → 메모리 캐시만 사용]: {e}")
+    return TieredCache(LRUCache(EMBEDDING_CACHE_MEMORY_SIZE), store, _encode_vector, _decode_vector)
+
+
+embedding_cache = _build_embedding_cache()
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def get_embedding_cache_stats() -> Dict[str, Any]:
+    return embedding_cache.stats()
+
+
+async def _embed_and_cache(key: str, text: str) -> List[float]:
+    embedding = await embedding_batcher.embed(text)
+    if embedding:
+        await asyncio.to_thread(embedding_cache.set, key, embedding)
+    return embedding
+
+
+# 단일 텍스트 임베딩
+# - 캐시 조회 → 같은 텍스트의 진행 중 요청 공유 → 배처에서 묶여 전송
+# - 캐시에는 원본 차원으로 저장하고 반환 시 EMBEDDING_DIMENSIONS로 축소
+async def get_embedding(text: str) -> List[float]:
+    return truncate_embedding(await _get_full_embedding(text))
+
+
+async def _get_full_embedding(text: str) -> List[float]:
+    if not text or not text.strip():
+        logging.warning("[임베딩 요청 차단] 빈 텍스트")
+        return []
+
+    normalized = normalize_text(text)
+    key = embedding_cache_key(normalized)
+
+    embedding = embedding_cache.memory.get(key)
+    if embedding is None:
+        embedding = await asyncio.to_thread(embedding_cache.load, key)
+    if embedding is not None:
+        return embedding
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_embed_and_cache(key, normalized))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+# 여러 텍스트 임베딩 (입력 순서대로 반환, 빈 텍스트는 [])
+async def get_embeddings(texts: List[str]) -> List[List[float]]:
+    return list(await asyncio.gather(*(get_embedding(t) for t in texts)))
@@ -6,11 +6,17 @@ import json
 import re
 from dotenv import load_dotenv
 from typing import Optional
+from db.eval_cache import EvalCache
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY").strip()
 GPT_URL = "https://api.openai.com/v1/chat/completions"
+GPT_MODEL = os.getenv("GPT_MODEL", "gpt-4o-mini")  # 여기서 gpt-3.5-turbo도 가능
+# analyze_job_resume_matching 프롬프트를 바꾸면 올릴 것 (평가 결과 캐시 키에 포함)
+JOB_RESUME_PROMPT_VERSION = "1"
+
+eval_cache = EvalCache("gpt", GPT_MODEL, JOB_RESUME_PROMPT_VERSION)
 
 headers = {
     "Authorization": f"Bearer {OPENAI_API_KEY}",
@@ -21,7 +27,7 @@ headers = {
 # GPT API 호출 함수
 async def call_gpt_api(prompt: str, temperature: float = 0.7) -> Optional[str]:
     payload = {
-        "model": "gpt-4o-mini",  # 여기서 gpt-3.5-turbo도 가능
+        "model": GPT_MODEL,
         "messages": [{"role": "user", "content": prompt}],
         "temperature": temperature,
         "max_tokens": 1500
@@ -191,6 +197,12 @@ async def analyze_resume_job_matching(resume_text: str, job_text: str) -> str:
 
 # ==== 채 to 이 답변에 대한 output
 async def analyze_job_resume_matching(resume_text: str, job_text: str) -> dict:
+    # 같은 쌍을 같은 모델 / 프롬프트로 평가한 결과가 있으면 재사용
+    cache_key = eval_cache.key(resume_text, job_text)
+    cached = await eval_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     prompt = f"""
     
     너는 AI 채용 평가 전문가야. 아래와 같은 JSON 포맷으로만 응답해. 
@@ -267,6 +279,7 @@ async def analyze_job_resume_matching(resume_text: str, job_text: str) -> dict:
         cleaned = re.sub(r"\n?```$", "", cleaned.strip())
 
         result = json.loads(cleaned)
+        await eval_cache.set(cache_key, result)
         return result
 
     except Exception as e:
@@ -1,19 +1,126 @@
+import os
 import asyncio
-import aiohttp
 import logging
-import os
 import xml.etree.ElementTree as ET
 import re
-from typing import Optional
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 from dotenv import load_dotenv
 from fastapi import HTTPException
 from xml.etree.ElementTree import Element, tostring
 from xml.dom import minidom
+from services.runpod_client import runpod_client, RUNPOD_ENDPOINT_ID
+from db.eval_cache import EvalCache
 
 load_dotenv()
 
+# 평가 결과 캐시 버전 (워커의 모델을 바꾸면 RUNPOD_MODEL_ID, 워커의 프롬프트를 바꾸면 RUNPOD_PROMPT_VERSION 변경)
+RUNPOD_MODEL_ID = os.getenv("RUNPOD_MODEL_ID", RUNPOD_ENDPOINT_ID)
+RUNPOD_PROMPT_VERSION = os.getenv("RUNPOD_PROMPT_VERSION", "1")
+
+_RUNPOD_FAILED_RESULT = "<result><total_score>0</total_score><summary>RunPod 평가 실패</summary></result>"
+
+# 평가 요청 마이크로 배칭 설정
+# - 여러 요청에서 동시에 들어온 (이력서, 공고) 쌍을 윈도우 동안 모아 RunPod 작업 하나로 전송
+#   입력 {"batch": [{"resume", "jobpost"}, ...]} → 출력 {"results": [{"result"}, ...]} (같은 순서)
+# - 쌍이 하나뿐이면 기존 단건 입력 형식 그대로, 배치 작업이 실패하거나 응답 형식이 맞지 않으면 단건으로 다시 요청
+# - 배포된 워커가 batch 입력을 받는 것이 확인된 뒤에 SCORING_MAX_BATCH_SIZE를 올릴 것
+#   (python -m scripts.check_scoring_batch 로 확인)
+SCORING_BATCH_WINDOW_MS = float(os.getenv("SCORING_BATCH_WINDOW_MS", "50"))
+SCORING_MAX_BATCH_SIZE = int(os.getenv("SCORING_MAX_BATCH_SIZE", "1"))  # 1이면 배칭하지 않음
+
+
+class ScoringBatcher:
+    """
+    동시에 들어온 평가 요청을 짧은 윈도우 동안 모아서 RunPod 작업 하나로 보내고,
+    결과를 각 호출자에게 돌려주는 마이크로 배처
+    """
+
+    def __init__(self, window_ms: float, max_batch_size: int):
+        self.window = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[Dict[str, str], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.counts: Counter = Counter()
+
+    def _bind_loop(self):
+        # asyncio.run()으로 새 루프가 생기는 경우(스크립트 등) 이전 루프의 상태는 버림
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._pending = []
+            self._timer = None
+        return loop
+
+    async def score(self, resume_text: str, job_text: str) -> Dict[str, Any]:
+        loop = self._bind_loop()
+        future = loop.create_future()
+        self._pending.append(({"resume": resume_text, "jobpost": job_text}, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        for i in range(0, len(pending), self.max_batch_size):
+            self._loop.create_task(self._run_batch(pending[i:i + self.max_batch_size]))
+
+    async def _run_batch(self, batch: List[Tuple[Dict[str, str], asyncio.Future]]):
+        inputs = [job_input for job_input, _ in batch]
+        if len(batch) > 1:
+            try:
+                output = await runpod_client.run({"batch": inputs})
+                outputs = output.get("results") if isinstance(output, dict) else None
+                if isinstance(outputs, list) and len(outputs) == len(batch):
+                    self.counts["jobs"] += 1
+                    self.counts["pairs"] += len(batch)
+                    logging.info(f"[평가 배치 전송] {len(batch)}건")
+                    for (_, future), output in zip(batch, outputs):
+                        if not future.done():
+                            future.set_result(output)
+                    return
+                logging.warning(f"[평가 배치 응답 형식 불일치 → 개별 재요청] {len(batch)}건")
+            except Exception as e:
+                # 배치 입력을 지원하지 않는 워커는 작업 자체를 FAILED로 끝낼 수 있음
+                logging.warning(f"[평가 배치 작업 실패 → 개별 재요청] {len(batch)}건: {e}")
+            self.counts["fallback_batches"] += 1
+
+        # 단건 작업 (쌍 하나 또는 배치 실패 후) → 쌍마다 결과 / 예외를 따로 전달
+        outputs = await asyncio.gather(*(runpod_client.run(job_input) for job_input in inputs), return_exceptions=True)
+        self.counts["jobs"] += len(batch)
+        self.counts["pairs"] += len(batch)
+        for (_, future), output in zip(batch, outputs):
+            if future.done():
+                continue
+            if isinstance(output, Exception):
+                logging.error(f"[평가 작업 실패]: {output}")
+                future.set_exception(output)
+            else:
+                future.set_result(output)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"window_ms": self.window * 1000, "max_batch_size": self.max_batch_size, "pending": len(self._pending), **self.counts}
+
+
+scoring_batcher = ScoringBatcher(window_ms=SCORING_BATCH_WINDOW_MS, max_batch_size=SCORING_MAX_BATCH_SIZE)
+eval_cache = EvalCache("runpod", RUNPOD_MODEL_ID, RUNPOD_PROMPT_VERSION)
+
 
 async def analyze_job_resume_matching(resume_text: str, job_text: str) -> dict:
+    # 0. 같은 쌍을 같은 모델로 평가한 결과가 있으면 재사용
+    cache_key = eval_cache.key(resume_text, job_text)
+    cached = await eval_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
         # 1. RunPod 호출
         raw = await send_to_runpod(resume_text, job_text)
@@ -26,79 +133,51 @@ async def analyze_job_resume_matching(resume_text: str, job_text: str) -> dict:
 
         # 3. 디버깅용 출력
         print(result_dict)
-        # 4. 결과 반환
-        return {
+        # 4. 결과 반환 (평가 실패 대체 결과는 캐시하지 않음)
+        result = {
             "markup": pretty_xml,   # → 보기 좋은 XML
             "data": result_dict     # → 실제 분석 결과 JSON
         }
+        if raw["result"] != _RUNPOD_FAILED_RESULT:
+            await eval_cache.set(cache_key, result)
+        return result
 
     except Exception as e:
         logging.error(f"[모델 호출 또는 응답 실패]: {e}")
         raise HTTPException(status_code=500, detail="모델 호출 또는 응답 실패")
 
 
-async def send_to_runpod(resume_text: str, job_text: str) -> dict:
-    try:
-        runpod_api_key = os.getenv("RUNPOD_API_KEY")
-        runpod_model_id = "x1l6wnb2e1etw3"  # 👈 모델 ID 여기 직접 명시
-
-        if not runpod_api_key:
-            raise ValueError("API Key missing")
-
-        # RunPod API endpoint 동적 생성
-        run_endpoint = f"https://api.runpod.ai/v2/{runpod_model_id}/run"
-        status_endpoint_template = f"https://api.runpod.ai/v2/{runpod_model_id}/status/{{}}"
-
-        headers = {
-            "Authorization": f"Bearer {runpod_api_key}",
-            "Content-Type": "application/json"
-        }
-
-        payload = {
-            "input": {
-                "resume": resume_text,
-                "jobpost": job_text
-            }
-        }
-
-        logging.info("[INFO] RunPod 작업 생성 요청 시작")
-
-        # Step 1: 작업 생성
-        async with aiohttp.ClientSession() as session:
-            async with session.post(run_endpoint, json=payload, headers=headers) as resp:
-                if resp.status != 200:
-                    raise Exception(f"[RunPod 오류] 작업 요청 실패 - 상태코드 {resp.status}")
-                data = await resp.json()
-                job_id = data.get("id")
-                if not job_id:
-                    raise Exception(f"[RunPod 오류] 작업 ID 없음: {data}")
-
-        logging.info(f"[INFO] RunPod 작업 생성됨: ID = {job_id}")
-
-        # Step 2: 상태 polling (최대 30회, 4초 간격 = 2분)
-        for attempt in range(150):
-            await asyncio.sleep(4)
-
-            async with aiohttp.ClientSession() as session:
-                async with session.get(status_endpoint_template.format(job_id), headers=headers) as status_resp:
-                    status_data = await status_resp.json()
-                    status = status_data.get("status")
+async def evaluate_as_completed(pairs: List[Tuple[str, str]]) -> AsyncIterator[Tuple[int, Union[dict, Exception]]]:
+    """
+    (이력서, 공고) 쌍을 동시에 평가하고 끝나는 순서대로 (pairs 안의 순번, 결과 또는 예외) 반환
+    중간에 소비를 멈추면(스트리밍 중 연결 끊김 등) 남은 평가는 취소
+    """
+    async def evaluate(index: int, resume_text: str, job_text: str):
+        try:
+            return index, await analyze_job_resume_matching(resume_text, job_text)
+        except Exception as e:
+            return index, e
 
-                    logging.info(f"[RunPod 상태 확인] {status} (시도 {attempt + 1}/150)")
+    tasks = [asyncio.ensure_future(evaluate(i, resume_text, job_text)) for i, (resume_text, job_text) in enumerate(pairs)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
 
-                    if status == "COMPLETED":
-                        result = status_data.get("output")
-                        logging.info(f"[RunPod 결과 수신 완료]: {result}")
-                        return result
-                    elif status == "FAILED":
-                        raise Exception(f"[RunPod 오류] 작업 실패: {status_data}")
 
-        raise TimeoutError("[RunPod 오류] 작업 시간이 초과되었습니다.")
+async def send_to_runpod(resume_text: str, job_text: str) -> dict:
+    try:
+        # 다른 요청의 평가와 묶어 공용 RunPod 클라이언트로 전송
+        result = await scoring_batcher.score(resume_text, job_text)
+        logging.info(f"[RunPod 결과 수신 완료]: {result}")
+        return result
 
     except Exception as e:
         logging.error(f"[RunPod 예외 발생]: {e}")
         return {
-            "result": "<result><total_score>0</total_score><summary>RunPod 평가 실패</summary></result>"
+            "result": _RUNPOD_FAILED_RESULT
         }
 
 
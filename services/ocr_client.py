@@ -0,0 +1,203 @@
+"""
+Upstage OCR 공용 클라이언트
+
+- keep-alive 커넥션 풀을 쓰는 httpx 클라이언트 하나를 재사용
+- 동시 요청 수 제한 (세마포어) → 대량 업로드 시 한꺼번에 몰리지 않고 순서대로 처리
+- 429 / 5xx / 네트워크 오류는 지수 백오프로 재시도 (429의 Retry-After는 모든 요청이 함께 대기)
+- 문서 하나당 전체 시간 제한 (재시도 / 대기 포함)
+- 실패는 빈 문자열 대신 원인을 담은 OcrError로 전달
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, BinaryIO, Dict, Optional, Union
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+UPSTAGE_OCR_URL = "https://api.upstage.ai/v1/document-ai/ocr"
+
+OCR_MAX_CONCURRENCY = int(os.getenv("OCR_MAX_CONCURRENCY", "4"))
+OCR_MAX_RETRIES = int(os.getenv("OCR_MAX_RETRIES", "3"))
+OCR_REQUEST_TIMEOUT_SECONDS = float(os.getenv("OCR_REQUEST_TIMEOUT_SECONDS", "60"))
+OCR_DOCUMENT_TIMEOUT_SECONDS = float(os.getenv("OCR_DOCUMENT_TIMEOUT_SECONDS", "180"))
+OCR_BACKOFF_BASE_SECONDS = float(os.getenv("OCR_BACKOFF_BASE_SECONDS", "1"))
+OCR_BACKOFF_MAX_SECONDS = float(os.getenv("OCR_BACKOFF_MAX_SECONDS", "30"))
+
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class OcrError(Exception):
+    """
+    OCR 실패 원인
+    reason: rate_limited | timeout | http_error | network | invalid_response
+    """
+
+    def __init__(self, reason: str, message: str, status: Optional[int] = None, attempts: int = 0):
+        super().__init__(message)
+        self.reason = reason
+        self.status = status
+        self.attempts = attempts
+        self.retry_after: Optional[float] = None  # 서버가 알려준 재시도 대기 시간 (초)
+
+    @property
+    def retryable(self) -> bool:
+        # 나중에 다시 시도하면 성공할 수 있는 실패인지 (일괄 처리 재개 판단용)
+        return self.reason in ("rate_limited", "timeout", "network") or self.status in _RETRYABLE_STATUS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"reason": self.reason, "message": str(self), "status": self.status, "attempts": self.attempts}
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    # Retry-After: 초 단위 숫자 또는 HTTP 날짜
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class OcrClient:
+    """
+    프로세스 전체가 공유하는 OCR 요청 클라이언트 (동시 요청 / 재시도 / 시간 제한 관리)
+    """
+
+    def __init__(self, url: str, api_key: str, max_concurrency: int = OCR_MAX_CONCURRENCY,
+                 max_retries: int = OCR_MAX_RETRIES, request_timeout: float = OCR_REQUEST_TIMEOUT_SECONDS,
+                 document_timeout: float = OCR_DOCUMENT_TIMEOUT_SECONDS):
+        self.url = url
+        self.api_key = api_key
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.request_timeout = request_timeout
+        self.document_timeout = document_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._resume_at = 0.0  # 429 이후 모든 요청이 기다릴 시각 (monotonic)
+        self._in_flight = 0
+        self._waiting = 0
+        self.counts: Counter = Counter()
+
+    def _bind_loop(self):
+        # asyncio.run()으로 새 루프가 생기는 경우(스크립트 등) 이전 루프의 클라이언트 / 세마포어는 버림
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                timeout=self.request_timeout,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._resume_at = 0.0
+            self._in_flight = self._waiting = 0
+        return loop
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(OCR_BACKOFF_MAX_SECONDS, OCR_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def recognize(self, filename: str, content: Union[bytes, BinaryIO],
+                        content_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        OCR 응답 JSON 반환, 재시도 후에도 실패하거나 문서 시간 제한을 넘기면 OcrError
+        content가 파일 객체면 multipart 본문을 청크 단위로 읽어 전송 (재시도마다 처음부터)
+        """
+        self._bind_loop()
+        state = {"attempts": 0}
+        try:
+            return await asyncio.wait_for(
+                self._recognize_with_retries(filename, content, content_type, state), self.document_timeout
+            )
+        except asyncio.TimeoutError:
+            self.counts["failed:timeout"] += 1
+            raise OcrError("timeout", f"{self.document_timeout:g}초 안에 OCR을 끝내지 못함", attempts=state["attempts"])
+        except OcrError as e:
+            self.counts[f"failed:{e.reason}"] += 1
+            raise
+
+    async def _recognize_with_retries(self, filename: str, content: Union[bytes, BinaryIO], content_type: Optional[str],
+                                      state: Dict[str, int]) -> Dict[str, Any]:
+        files = {"document": (filename, content, content_type or "application/pdf")}
+        while True:
+            state["attempts"] += 1
+            attempt = state["attempts"]
+            try:
+                return await self._attempt(files, attempt)
+            except OcrError as e:
+                if not e.retryable or attempt > self.max_retries:
+                    raise
+                delay = e.retry_after if e.retry_after is not None else self._backoff(attempt)
+                self.counts["retries"] += 1
+                logging.warning(f"[OCR 재시도] {filename}: {e.reason} → {delay:.1f}초 후 ({attempt}/{self.max_retries})")
+                # 대기는 세마포어 밖에서 (다른 문서가 슬롯을 사용)
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, files: Dict[str, Any], attempt: int) -> Dict[str, Any]:
+        self._waiting += 1
+        acquired = False
+        try:
+            async with self._semaphore:
+                acquired = True
+                self._waiting -= 1
+                # 다른 요청이 받은 429의 Retry-After 동안은 보내지 않음
+                cooldown = self._resume_at - time.monotonic()
+                if cooldown > 0:
+                    await asyncio.sleep(cooldown)
+                self._in_flight += 1
+                self.counts["requests"] += 1
+                try:
+                    response = await self._client.post(self.url, files=files)
+                finally:
+                    self._in_flight -= 1
+        except httpx.TimeoutException as e:
+            raise OcrError("timeout", f"OCR 요청 시간 초과: {e}", attempts=attempt)
+        except httpx.TransportError as e:
+            raise OcrError("network", f"OCR 요청 네트워크 오류: {e}", attempts=attempt)
+        finally:
+            if not acquired:
+                self._waiting -= 1
+
+        if response.status_code >= 400:
+            reason = "rate_limited" if response.status_code == 429 else "http_error"
+            error = OcrError(reason, f"OCR 응답 오류: {response.status_code} {response.text[:200]}",
+                             status=response.status_code, attempts=attempt)
+            error.retry_after = _retry_after_seconds(response) if response.status_code in _RETRYABLE_STATUS else None
+            if response.status_code == 429:
+                delay = error.retry_after if error.retry_after is not None else self._backoff(attempt)
+                error.retry_after = delay
+                self._resume_at = max(self._resume_at, time.monotonic() + delay)
+            raise error
+        try:
+            return response.json()
+        except ValueError:
+            raise OcrError("invalid_response", "OCR 응답을 JSON으로 읽을 수 없음",
+                           status=response.status_code, attempts=attempt)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            **self.counts
+        }
+
+    async def close(self):
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
@@ -1,7 +1,18 @@
 import os
-import httpx
+import io
+import re
+import json
+import asyncio
+import hashlib
+import logging
+from collections import Counter
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+from pypdf import PdfReader, PdfWriter
 from fastapi import UploadFile
 from dotenv import load_dotenv
+from services.cache import LRUCache, SqliteStore, TieredCache
+from services.ocr_client import UPSTAGE_OCR_URL, OcrClient, OcrError
+from exception.base import DocumentTooLargeException
 
 load_dotenv()
 
@@ -9,43 +20,352 @@ UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
 if not UPSTAGE_API_KEY:
     raise ValueError("UPSTAGE_API_KEY가 설정되지 않았습니다.")
 
+ocr_client = OcrClient(UPSTAGE_OCR_URL, UPSTAGE_API_KEY)
+
+# PDF 텍스트 레이어 우선 추출 (텍스트가 충분한 페이지는 OCR 없이 사용)
+PDF_TEXT_LAYER_ENABLED = os.getenv("PDF_TEXT_LAYER_ENABLED", "true").lower() == "true"
+PDF_TEXT_MIN_CHARS_PER_PAGE = int(os.getenv("PDF_TEXT_MIN_CHARS_PER_PAGE", "50"))
+PDF_TEXT_MIN_VALID_RATIO = 0.6  # 한글 / 영문 / 숫자 / 일반 문장부호 비율 (깨진 폰트 인코딩 걸러내기)
+_VALID_CHAR = re.compile(r"[가-힣a-zA-Z0-9.,:;()\-/%@&+#'\"·•\[\]]")
+
+# 페이지 병렬 OCR (여러 쪽 스캔 문서를 페이지 묶음으로 나눠 동시 요청, 0이면 문서 단위로 한 번에 요청)
+OCR_PAGE_BATCH_SIZE = int(os.getenv("OCR_PAGE_BATCH_SIZE", "1"))  # 요청 하나에 담을 페이지 수
+OCR_PAGE_PARALLEL_MIN_PAGES = int(os.getenv("OCR_PAGE_PARALLEL_MIN_PAGES", "3"))  # OCR할 페이지가 이 이상일 때만
+
+# 업로드 문서 제한 (넘으면 OCR 요청 전에 413)
+UPLOAD_MAX_BYTES = int(float(os.getenv("UPLOAD_MAX_MB", "20")) * 1024 * 1024)
+UPLOAD_MAX_PAGES = int(os.getenv("UPLOAD_MAX_PAGES", "50"))
+_READ_CHUNK_BYTES = 1024 * 1024
+
+# 문서 내용: 작은 문서 / 테스트용 bytes 또는 파일 객체 (업로드 임시 파일, 열린 파일 - 메모리에 올리지 않고 스트리밍)
+DocumentSource = Union[bytes, BinaryIO]
+
+# OCR 결과 캐시 설정 (파일 내용 해시 기준, 경로를 비우면 메모리만 사용)
+OCR_CACHE_MEMORY_SIZE = int(os.getenv("OCR_CACHE_MEMORY_SIZE", "256"))
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", ".cache/ocr.sqlite3")
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "20000"))
+OCR_CACHE_TTL_HOURS = float(os.getenv("OCR_CACHE_TTL_HOURS", "720"))
+
+
+def _build_ocr_cache() -> TieredCache:
+    ttl_seconds = OCR_CACHE_TTL_HOURS * 3600
+    store = None
+    if OCR_CACHE_PATH:
+        try:
+            store = SqliteStore(OCR_CACHE_PATH, "ocr", OCR_CACHE_MAX_ENTRIES, ttl_seconds)
+        except Exception as e:
+            logging.error(f"[OCR 캐시 저장소 초기화 실패 → 메모리 캐시만 사용]: {e}")
+    return TieredCache(
+        LRUCache(OCR_CACHE_MEMORY_SIZE, ttl_seconds), store,
+        lambda result: json.dumps(result, ensure_ascii=False).encode("utf-8"), _decode_cached_result
+    )
+
+
+def _decode_cached_result(raw: bytes) -> Dict[str, Any]:
+    value = raw.decode("utf-8")
+    try:
+        result = json.loads(value)
+        if isinstance(result, dict) and "text" in result:
+            return result
+    except ValueError:
+        pass
+    # 추출 경로 기록 전에 저장된 항목 (OCR 텍스트만 있음)
+    return {"text": value, "method": "ocr", "page_count": None, "ocr_pages": None}
+
+
+ocr_cache = _build_ocr_cache()
+_inflight: Dict[str, asyncio.Future] = {}
+extraction_counts: Counter = Counter()  # 추출 경로별 문서 수 (text_layer / ocr / mixed / cache / failed)
+
+
+def get_ocr_cache_stats() -> Dict[str, Any]:
+    return {**ocr_cache.stats(), "extraction_methods": dict(extraction_counts), "client": ocr_client.stats()}
+
+
+def ocr_cache_key(content_hash: str) -> str:
+    return f"upstage-ocr:{content_hash}"
+
+
+def hash_stream(stream: BinaryIO, max_bytes: int = UPLOAD_MAX_BYTES) -> Tuple[str, int]:
+    """
+    청크 단위로 읽으며 sha256 / 크기 계산 (한도를 넘는 순간 중단)
+    """
+    digest, size = hashlib.sha256(), 0
+    stream.seek(0)
+    while chunk := stream.read(_READ_CHUNK_BYTES):
+        size += len(chunk)
+        if size > max_bytes:
+            raise DocumentTooLargeException(f"파일 크기가 {max_bytes // (1024 * 1024)}MB를 초과함")
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest(), size
+
+
+def _is_text_page(text: str) -> bool:
+    """
+    텍스트 레이어만으로 충분한 페이지인지 (글자 수 + 정상 문자 비율)
+    """
+    chars = re.sub(r"\s+", "", text)
+    if len(chars) < PDF_TEXT_MIN_CHARS_PER_PAGE:
+        return False
+    return len(_VALID_CHAR.findall(chars)) / len(chars) >= PDF_TEXT_MIN_VALID_RATIO
+
+
+def _inspect_pdf(stream: BinaryIO, read_text: bool) -> Tuple[Optional[int], Optional[List[str]]]:
+    """
+    PDF 페이지 수 + 페이지별 텍스트 레이어 (PDF가 아니면 (None, None), 텍스트를 읽을 수 없으면 텍스트만 None)
+    pypdf는 스트림에서 필요한 객체만 읽으므로 파일 전체를 메모리에 올리지 않음
+    """
+    stream.seek(0)
+    if stream.read(4) != b"%PDF":
+        return None, None
+    try:
+        reader = PdfReader(stream)
+        if reader.is_encrypted:
+            return None, None
+        page_count = len(reader.pages)
+    except Exception as e:
+        logging.warning(f"[PDF 읽기 실패 → OCR]: {e}")
+        return None, None
+    if not read_text or page_count > UPLOAD_MAX_PAGES:
+        return page_count, None
+    try:
+        return page_count, [page.extract_text() or "" for page in reader.pages]
+    except Exception as e:
+        logging.warning(f"[PDF 텍스트 레이어 읽기 실패 → OCR]: {e}")
+        return page_count, None
+
+
+def _subset_pdf(stream: BinaryIO, page_indexes: List[int]) -> bytes:
+    stream.seek(0)
+    reader = PdfReader(stream)
+    writer = PdfWriter()
+    for index in page_indexes:
+        writer.add_page(reader.pages[index])
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def _page_texts(data: Dict[str, Any], page_count: int) -> Optional[List[str]]:
+    # 응답의 페이지별 텍스트 (페이지 수가 맞지 않으면 None)
+    pages = data.get("pages") or []
+    if len(pages) == page_count and all("text" in page for page in pages):
+        return [page["text"] for page in pages]
+    return None
+
+
+def _split_ocr_pages(data: Dict[str, Any], page_count: int) -> List[str]:
+    # 페이지별 텍스트가 없으면 전체 텍스트를 첫 페이지에 둠
+    return _page_texts(data, page_count) or [data.get("text", "")] + [""] * (page_count - 1)
+
+
+class _HashingSink:
+    # PdfWriter 출력을 저장하지 않고 해시만 계산
+    def __init__(self):
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.digest.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.size
+
+    def flush(self):
+        pass
+
+
+def _page_cache_keys(stream: BinaryIO, page_indexes: List[int]) -> List[str]:
+    """
+    페이지 단위 캐시 키 - 한 페이지만 담은 PDF의 sha256
+    (같은 페이지는 어느 문서에 들어 있어도 같은 키, 페이지 PDF는 메모리에 남기지 않음)
+    """
+    stream.seek(0)
+    reader = PdfReader(stream)
+    keys = []
+    for index in page_indexes:
+        writer = PdfWriter()
+        writer.add_page(reader.pages[index])
+        sink = _HashingSink()
+        writer.write(sink)
+        keys.append(f"upstage-ocr-page:{sink.digest.hexdigest()}")
+    return keys
+
+
+async def _ocr_pages_parallel(filename: str, stream: BinaryIO,
+                              page_indexes: List[int]) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+    """
+    페이지 묶음(OCR_PAGE_BATCH_SIZE)별로 동시에 OCR (공용 클라이언트의 동시 요청 제한 / 백오프 적용)
+    캐시에 있는 페이지는 요청하지 않고, 새로 읽은 페이지는 페이지 키로 캐시
+    → (page_indexes 순서의 텍스트, 실패한 묶음이 있으면 첫 오류)
+    """
+    keys = await asyncio.to_thread(_page_cache_keys, stream, page_indexes)
+    texts: Dict[int, str] = {}
+    for index, key in zip(page_indexes, keys):
+        cached = ocr_cache.memory.get(key)
+        if cached is None:
+            cached = await asyncio.to_thread(ocr_cache.load, key)
+        if cached is not None:
+            texts[index] = cached["text"]
+
+    missing = [(index, key) for index, key in zip(page_indexes, keys) if index not in texts]
+    batches = [missing[i:i + OCR_PAGE_BATCH_SIZE] for i in range(0, len(missing), OCR_PAGE_BATCH_SIZE)]
+    # 같은 파일 객체를 여러 스레드가 동시에 읽지 않도록 + 동시에 메모리에 올라가는 페이지 PDF 수 제한
+    stream_lock = asyncio.Lock()
+    slots = asyncio.Semaphore(ocr_client.max_concurrency)
+
+    async def run(batch: List[Tuple[int, str]]):
+        indexes = [index for index, _ in batch]
+        async with slots:
+            async with stream_lock:
+                body = await asyncio.to_thread(_subset_pdf, stream, indexes)
+            data = await ocr_client.recognize(f"{filename}#p{indexes[0] + 1}", body, "application/pdf")
+        split = _page_texts(data, len(batch))
+        if split is None:
+            # 페이지 구분 없는 응답 → 묶음 첫 페이지에 전체 텍스트, 페이지 캐시는 하지 않음
+            texts[indexes[0]] = data.get("text", "")
+            return
+        for (index, key), text in zip(batch, split):
+            texts[index] = text
+            if text:
+                await asyncio.to_thread(ocr_cache.set, key, {"text": text, "method": "ocr", "page_count": 1, "ocr_pages": [1]})
+
+    results = await asyncio.gather(*(run(batch) for batch in batches), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    for result in errors:
+        if not isinstance(result, OcrError):
+            raise result
+    logging.info(
+        f"[페이지 병렬 OCR] {filename}: {len(page_indexes)}쪽 중 캐시 {len(page_indexes) - len(missing)}쪽, "
+        f"요청 {len(batches)}건 (실패 {len(errors)}건)"
+    )
+    return [texts.get(index, "") for index in page_indexes], errors[0].to_dict() if errors else None
+
+
+async def _extract_uncached(filename: str, stream: BinaryIO, content_type: Optional[str]) -> Dict[str, Any]:
+    """
+    텍스트 레이어가 충분한 페이지는 로컬 추출, 스캔 / 이미지 페이지만 모아 OCR
+    - OCR할 페이지가 OCR_PAGE_PARALLEL_MIN_PAGES 이상이면 페이지 묶음으로 나눠 동시 요청
+    - OCR이 실패하면 얻은 부분만 남기고 "error"에 원인 기록
+    """
+    page_count, pages = await asyncio.to_thread(_inspect_pdf, stream, PDF_TEXT_LAYER_ENABLED)
+    if page_count is not None and page_count > UPLOAD_MAX_PAGES:
+        raise DocumentTooLargeException(f"페이지 수가 {UPLOAD_MAX_PAGES}쪽을 초과함 ({page_count}쪽)")
+    error = None
+    if not page_count:
+        # PDF가 아님 (이미지 등) / 읽을 수 없는 PDF → 문서 전체 OCR
+        text = ""
+        try:
+            # 파일 객체는 multipart 본문으로 청크 단위 전송 (재시도 시 처음부터 다시 읽음)
+            text = (await ocr_client.recognize(filename, stream, content_type)).get("text", "")
+        except OcrError as e:
+            error = e.to_dict()
+        return {"text": text, "method": "ocr", "page_count": page_count, "ocr_pages": None, "error": error}
+
+    pages = pages or [""] * page_count  # 텍스트 레이어를 읽지 않은 경우 전 페이지 OCR
+    ocr_indexes = [i for i, text in enumerate(pages) if not _is_text_page(text)]
+    method = "text_layer" if not ocr_indexes else "ocr" if len(ocr_indexes) == len(pages) else "mixed"
+    if ocr_indexes and OCR_PAGE_BATCH_SIZE > 0 and len(ocr_indexes) >= OCR_PAGE_PARALLEL_MIN_PAGES:
+        texts, error = await _ocr_pages_parallel(filename, stream, ocr_indexes)
+        for index, text in zip(ocr_indexes, texts):
+            pages[index] = text
+    elif ocr_indexes:
+        try:
+            if method == "ocr":
+                data = await ocr_client.recognize(filename, stream, content_type)
+            else:
+                subset = await asyncio.to_thread(_subset_pdf, stream, ocr_indexes)
+                data = await ocr_client.recognize(filename, subset, "application/pdf")
+            for index, text in zip(ocr_indexes, _split_ocr_pages(data, len(ocr_indexes))):
+                pages[index] = text
+        except OcrError as e:
+            error = e.to_dict()
+
+    return {
+        "text": "\n".join(text.strip() for text in pages if text.strip()),
+        "method": method,
+        "page_count": len(pages),
+        "ocr_pages": [i + 1 for i in ocr_indexes],
+        "error": error
+    }
+
+
+async def _extract_and_cache(key: str, filename: str, stream: BinaryIO, content_type: Optional[str]) -> Dict[str, Any]:
+    result = await _extract_uncached(filename, stream, content_type)
+    if result["error"]:
+        # 실패 / 일부만 추출된 결과는 캐시하지 않음 (다음 요청에서 다시 시도)
+        extraction_counts["failed"] += 1
+        logging.error(f"[텍스트 추출 실패] {filename}: {result['error']['reason']} - {result['error']['message']}")
+        return result
+    extraction_counts[result["method"]] += 1
+    logging.info(f"[텍스트 추출] {filename}: {result['method']} (OCR 페이지: {result['ocr_pages']})")
+    if result["text"]:
+        await asyncio.to_thread(ocr_cache.set, key, result)
+    return result
+
+
+async def extract_document(filename: str, source: DocumentSource, content_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    파일 내용 해시로 캐시 조회 → 같은 파일의 진행 중 추출 공유 → 텍스트 레이어 / Upstage OCR
+    → {"text", "method": text_layer | ocr | mixed, "page_count", "ocr_pages", "error", "cached"}
+    OCR 실패 시 예외 대신 "error": {"reason", "message", "status", "attempts"} (빈 결과 / 실패는 캐시하지 않음)
+    UPLOAD_MAX_MB / UPLOAD_MAX_PAGES를 넘으면 OCR 요청 전에 DocumentTooLargeException (413)
+    """
+    stream = io.BytesIO(source) if isinstance(source, bytes) else source
+    content_hash, _ = await asyncio.to_thread(hash_stream, stream)
+    key = ocr_cache_key(content_hash)
+    result = ocr_cache.memory.get(key)
+    if result is None:
+        result = await asyncio.to_thread(ocr_cache.load, key)
+    if result is not None:
+        extraction_counts["cache"] += 1
+        logging.info(f"[OCR 캐시 사용] {filename}")
+        return {"error": None, **result, "cached": True}
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_extract_and_cache(key, filename, stream, content_type))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return {**await asyncio.shield(task), "cached": False}
+
+
+def document_text(result: Dict[str, Any]) -> str:
+    # 텍스트만 쓰는 호출자: 추출된 내용이 전혀 없을 때만 OCR 실패를 예외로 전달
+    error = result.get("error")
+    if error and not result["text"]:
+        raise OcrError(error["reason"], error["message"], error["status"], error["attempts"])
+    return result["text"]
+
+
+async def extract_text(filename: str, source: DocumentSource, content_type: Optional[str] = None) -> str:
+    return document_text(await extract_document(filename, source, content_type))
+
+
 async def extract_text_from_uploadfile(file: UploadFile) -> str:
     """
     업로드된 파일을 비동기로 OCR 처리 후 텍스트 반환
     """
-    headers = {"Authorization": f"Bearer {UPSTAGE_API_KEY}"}
-    files = {"document": (file.filename, await file.read(), file.content_type)}
-    async with httpx.AsyncClient(timeout=60) as client:
-        try:
-            response = await client.post(
-                "https://api.upstage.ai/v1/document-ai/ocr",
-                headers=headers,
-                files=files
-            )
-            response.raise_for_status()
-            return response.json().get("text", "")
-        except Exception as e:
-            print(f"OCR 요청 중 오류: {e}")
-            return ""
+    return document_text(await extract_document_from_uploadfile(file))
 
-async def extract_text_from_path(filepath: str) -> str:
+
+async def extract_document_from_uploadfile(file: UploadFile) -> Dict[str, Any]:
     """
-    파일 경로 기반 비동기 OCR 처리
+    업로드된 파일의 텍스트 + 추출 경로 정보
+    multipart 파서가 1MB 이상은 임시 파일로 옮겨 두므로 file.read()로 올리지 않고 그 파일 객체를 그대로 사용
+    여기서의 크기 검사는 본문을 다 받은 뒤의 파일별 검사, 요청 전체 한도는 RequestSizeLimitMiddleware에서 수신 중에 적용
     """
-    headers = {"Authorization": f"Bearer {UPSTAGE_API_KEY}"}
-    filename = os.path.basename(filepath)
+    if file.size is not None and file.size > UPLOAD_MAX_BYTES:
+        raise DocumentTooLargeException(f"파일 크기가 {UPLOAD_MAX_BYTES // (1024 * 1024)}MB를 초과함")
+    return await extract_document(file.filename, file.file, file.content_type)
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        try:
-            with open(filepath, "rb") as f:
-                files = {"document": (filename, f, "application/pdf")}
-                response = await client.post(
-                    "https://api.upstage.ai/v1/document-ai/ocr",
-                    headers=headers,
-                    files=files
-                )
-                response.raise_for_status()
-                return response.json().get("text", "")
-        except Exception as e:
-            print(f"OCR 요청 중 오류: {e}")
-            return ""
+
+async def extract_text_from_path(filepath: str) -> str:
+    """
+    파일 경로 기반 비동기 OCR 처리 (파일을 연 채로 스트리밍)
+    """
+    with open(filepath, "rb") as f:
+        return await extract_text(os.path.basename(filepath), f, "application/pdf")
@@ -0,0 +1,268 @@
+"""
+RunPod 서버리스 엔드포인트 공용 클라이언트
+
+- 프로세스 전체가 커넥션 풀을 쓰는 aiohttp 세션 하나를 재사용
+- 기본은 /runsync (응답 안에 결과가 오면 폴링 없이 끝), 대기 시간 안에 끝나지 않으면 /status 폴링으로 전환
+- 폴링 간격은 최근 작업 소요 시간(이동 평균)에 맞춰 첫 확인 시점을 잡고, 이후 지수적으로 늘림
+- webhook 모드: /run에 완료 콜백 URL을 넘기고, POST /runpod/webhook 으로 받은 결과로 대기 중인 future를 깨움
+  (예상 소요 시간 + RUNPOD_WEBHOOK_GRACE_SECONDS 안에 콜백이 없으면 폴링 병행 - 다른 워커 프로세스로 간 콜백 등)
+
+로컬 테스트용 대역 서버: python -m scripts.runpod_stub (RUNPOD_BASE_URL=http://127.0.0.1:8001/v2)
+"""
+import os
+import time
+import hmac
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RUNPOD_API_KEY = os.getenv("RUNPOD_API_KEY")
+RUNPOD_ENDPOINT_ID = os.getenv("RUNPOD_ENDPOINT_ID", "x1l6wnb2e1etw3")
+RUNPOD_BASE_URL = os.getenv("RUNPOD_BASE_URL", "https://api.runpod.ai/v2")
+
+# 실행 방식 (sync: /runsync 후 필요하면 폴링 | async: /run 후 폴링 | webhook: /run + 완료 콜백, 늦으면 폴링)
+RUNPOD_RUN_MODE = os.getenv("RUNPOD_RUN_MODE", "sync").lower()
+if RUNPOD_RUN_MODE not in ("sync", "async", "webhook"):
+    raise ValueError(f"RUNPOD_RUN_MODE 값이 올바르지 않습니다: {RUNPOD_RUN_MODE}")
+# RunPod이 호출할 이 서버의 콜백 주소 (예: https://api.example.com/runpod/webhook) / 콜백 검증 토큰
+RUNPOD_WEBHOOK_URL = os.getenv("RUNPOD_WEBHOOK_URL")
+RUNPOD_WEBHOOK_SECRET = os.getenv("RUNPOD_WEBHOOK_SECRET")
+if RUNPOD_RUN_MODE == "webhook" and not (RUNPOD_WEBHOOK_URL and RUNPOD_WEBHOOK_SECRET):
+    raise ValueError("RUNPOD_RUN_MODE=webhook 에는 RUNPOD_WEBHOOK_URL과 RUNPOD_WEBHOOK_SECRET이 필요합니다.")
+RUNPOD_WEBHOOK_GRACE_SECONDS = float(os.getenv("RUNPOD_WEBHOOK_GRACE_SECONDS", "30"))
+RUNPOD_SYNC_WAIT_SECONDS = float(os.getenv("RUNPOD_SYNC_WAIT_SECONDS", "30"))  # /runsync 응답을 기다릴 최대 시간
+RUNPOD_JOB_TIMEOUT_SECONDS = float(os.getenv("RUNPOD_JOB_TIMEOUT_SECONDS", "600"))
+RUNPOD_POLL_MIN_SECONDS = float(os.getenv("RUNPOD_POLL_MIN_SECONDS", "0.25"))
+RUNPOD_POLL_MAX_SECONDS = float(os.getenv("RUNPOD_POLL_MAX_SECONDS", "4"))
+RUNPOD_MAX_CONNECTIONS = int(os.getenv("RUNPOD_MAX_CONNECTIONS", "20"))
+
+_POLL_GROWTH = 1.5
+_LATENCY_SMOOTHING = 0.2  # 작업 소요 시간 이동 평균 가중치
+_PENDING_STATUSES = ("IN_QUEUE", "IN_PROGRESS")
+_EARLY_RESULT_TTL_SECONDS = 300  # /run 응답보다 먼저 도착한 콜백 보관 시간
+_EARLY_RESULT_MAX_ENTRIES = 256  # 보관 개수 상한 (넘으면 오래된 것부터 버림)
+
+
+class RunPodError(Exception):
+    """
+    RunPod 작업 실패 (status: FAILED / CANCELLED / TIMED_OUT / HTTP 상태 코드 등)
+    """
+
+    def __init__(self, message: str, status: Optional[str] = None, job_id: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.job_id = job_id
+
+
+def webhook_url() -> str:
+    if not RUNPOD_WEBHOOK_SECRET:
+        return RUNPOD_WEBHOOK_URL
+    separator = "&" if "?" in RUNPOD_WEBHOOK_URL else "?"
+    return f"{RUNPOD_WEBHOOK_URL}{separator}{urlencode({'token': RUNPOD_WEBHOOK_SECRET})}"
+
+
+def webhook_enabled() -> bool:
+    return RUNPOD_RUN_MODE == "webhook"
+
+
+def verify_webhook_token(token: Optional[str]) -> bool:
+    # 토큰이 설정되지 않았으면 어떤 콜백도 받지 않음
+    if not RUNPOD_WEBHOOK_SECRET:
+        return False
+    return token is not None and hmac.compare_digest(token, RUNPOD_WEBHOOK_SECRET)
+
+
+class RunPodClient:
+    """
+    엔드포인트 하나에 대한 작업 실행 클라이언트
+    """
+
+    def __init__(self, endpoint_id: str = RUNPOD_ENDPOINT_ID, api_key: Optional[str] = RUNPOD_API_KEY,
+                 mode: str = RUNPOD_RUN_MODE, job_timeout: float = RUNPOD_JOB_TIMEOUT_SECONDS):
+        self.endpoint_id = endpoint_id
+        self.api_key = api_key
+        self.mode = mode
+        self.job_timeout = job_timeout
+        self.base_url = f"{RUNPOD_BASE_URL}/{endpoint_id}"
+        self.expected_latency: Optional[float] = None  # 최근 작업 소요 시간 이동 평균 (초)
+        self.counts: Counter = Counter()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._waiters: Dict[str, asyncio.Future] = {}  # job_id → 콜백을 기다리는 future
+        self._early: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._launching = 0  # 응답을 기다리는 /run 요청 수 (이때만 먼저 온 콜백을 보관)
+
+    def _bind_loop(self) -> aiohttp.ClientSession:
+        # asyncio.run()으로 새 루프가 생기는 경우(스크립트 등) 이전 루프의 세션은 버림
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._session is None or self._session.closed:
+            self._loop = loop
+            self._session = aiohttp.ClientSession(
+                headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+                connector=aiohttp.TCPConnector(limit=RUNPOD_MAX_CONNECTIONS),
+                timeout=aiohttp.ClientTimeout(total=RUNPOD_SYNC_WAIT_SECONDS + 30)
+            )
+        return self._session
+
+    async def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        session = self._bind_loop()
+        async with session.request(method, f"{self.base_url}/{path}", json=payload) as resp:
+            if resp.status != 200:
+                raise RunPodError(f"[RunPod 오류] {path} 요청 실패 - 상태코드 {resp.status}", status=str(resp.status))
+            return await resp.json()
+
+    async def run(self, job_input: Dict[str, Any]) -> Any:
+        """
+        작업 실행 후 output 반환 (실패 / 시간 초과 시 RunPodError)
+        """
+        if not self.api_key:
+            raise RunPodError("RUNPOD_API_KEY가 설정되지 않았습니다.")
+        started = time.monotonic()
+        self.counts["jobs"] += 1
+        payload = {"input": job_input}
+
+        if self.mode == "sync":
+            wait_ms = int(RUNPOD_SYNC_WAIT_SECONDS * 1000)
+            data = await self._request("POST", f"runsync?wait={wait_ms}", payload)
+        else:
+            if self.mode == "webhook":
+                payload["webhook"] = webhook_url()
+            self._launching += 1
+            try:
+                data = await self._request("POST", "run", payload)
+            finally:
+                self._launching -= 1
+        job_id = data.get("id")
+        logging.info(f"[RunPod 작업 생성됨] ID = {job_id} ({self.mode})")
+
+        status = data.get("status")
+        if self.mode == "sync" and status and status not in _PENDING_STATUSES:
+            # /runsync 대기 시간 안에 끝남 → 폴링 없음
+            self.counts["sync_completed"] += 1
+        elif not job_id:
+            raise RunPodError(f"[RunPod 오류] 작업 ID 없음: {data}")
+        elif self.mode == "webhook":
+            data = await self._await_webhook(job_id, started)
+        else:
+            self.counts["polled"] += 1
+            data = await self._poll(job_id, started)
+        return self._finish(data, job_id, started)
+
+    async def _await_webhook(self, job_id: str, started: float) -> Dict[str, Any]:
+        """
+        콜백으로 결과 수신, 예상 소요 시간 + 유예 시간이 지나면 폴링을 함께 시작해 먼저 끝나는 쪽 사용
+        """
+        early = self._early.pop(job_id, None)
+        if early is not None:
+            self.counts["webhook_completed"] += 1
+            return early[1]
+        future = self._loop.create_future()
+        self._waiters[job_id] = future
+        poll_task = None
+        try:
+            wait = (self.expected_latency or 0.0) + RUNPOD_WEBHOOK_GRACE_SECONDS
+            try:
+                data = await asyncio.wait_for(asyncio.shield(future), wait)
+                self.counts["webhook_completed"] += 1
+                return data
+            except asyncio.TimeoutError:
+                logging.warning(f"[RunPod 콜백 지연 → 폴링 병행] ID = {job_id}")
+                self.counts["polled"] += 1
+                poll_task = asyncio.ensure_future(self._poll(job_id, started))
+                await asyncio.wait({future, poll_task}, return_when=asyncio.FIRST_COMPLETED)
+                if future.done():
+                    self.counts["webhook_completed"] += 1
+                    return future.result()
+                return poll_task.result()
+        finally:
+            self._waiters.pop(job_id, None)
+            if poll_task is not None and not poll_task.done():
+                poll_task.cancel()
+
+    def complete(self, data: Dict[str, Any]) -> bool:
+        """
+        콜백으로 받은 작업 결과 전달 → 기다리는 호출이 있으면 True
+        /run 응답을 처리하기 전에 도착한 콜백은 잠시 보관
+        """
+        job_id = data.get("id")
+        if not job_id:
+            return False
+        future = self._waiters.get(job_id)
+        if future is not None:
+            if not future.done():
+                future.set_result(data)
+            return True
+        if self._launching == 0:
+            # 이 프로세스에서 생성 중인 작업이 없음 → 다른 워커 프로세스의 작업이거나 알 수 없는 ID
+            return False
+        now = time.monotonic()
+        self._early = {k: v for k, v in self._early.items() if now - v[0] < _EARLY_RESULT_TTL_SECONDS}
+        while len(self._early) >= _EARLY_RESULT_MAX_ENTRIES:
+            self._early.pop(next(iter(self._early)))
+        self._early[job_id] = (now, data)
+        return False
+
+    def _finish(self, data: Dict[str, Any], job_id: Optional[str], started: float) -> Any:
+        status = data.get("status")
+        if status != "COMPLETED":
+            self.counts["failed"] += 1
+            raise RunPodError(f"[RunPod 오류] 작업 실패: {data}", status=status, job_id=job_id)
+        elapsed = time.monotonic() - started
+        self.expected_latency = elapsed if self.expected_latency is None else (
+            (1 - _LATENCY_SMOOTHING) * self.expected_latency + _LATENCY_SMOOTHING * elapsed
+        )
+        logging.info(f"[RunPod 결과 수신 완료] ID = {job_id} ({elapsed:.2f}초)")
+        return data.get("output")
+
+    def _first_poll_delay(self, elapsed: float) -> float:
+        # 예상 소요 시간 직전에 첫 확인 (기록이 없으면 최소 간격부터)
+        if self.expected_latency is None:
+            return RUNPOD_POLL_MIN_SECONDS
+        return min(RUNPOD_POLL_MAX_SECONDS, max(RUNPOD_POLL_MIN_SECONDS, self.expected_latency * 0.9 - elapsed))
+
+    async def _poll(self, job_id: str, started: float) -> Dict[str, Any]:
+        deadline = started + self.job_timeout
+        delay = self._first_poll_delay(time.monotonic() - started)
+        interval = RUNPOD_POLL_MIN_SECONDS
+        while True:
+            if time.monotonic() + delay > deadline:
+                await self.cancel(job_id)
+                raise RunPodError("[RunPod 오류] 작업 시간이 초과되었습니다.", status="TIMED_OUT", job_id=job_id)
+            await asyncio.sleep(delay)
+            self.counts["polls"] += 1
+            data = await self._request("GET", f"status/{job_id}")
+            status = data.get("status")
+            if status not in _PENDING_STATUSES:
+                return data
+            interval = min(RUNPOD_POLL_MAX_SECONDS, interval * _POLL_GROWTH)
+            delay = interval
+
+    async def cancel(self, job_id: str):
+        try:
+            await self._request("POST", f"cancel/{job_id}")
+        except Exception as e:
+            logging.warning(f"[RunPod 작업 취소 실패] {job_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "endpoint_id": self.endpoint_id,
+            "mode": self.mode,
+            "expected_latency": round(self.expected_latency, 3) if self.expected_latency is not None else None,
+            "awaiting_webhook": len(self._waiters),
+            **self.counts
+        }
+
+    async def close(self):
+        if self._session is not None and self._loop is asyncio.get_running_loop():
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+
+runpod_client = RunPodClient()
@@ -0,0 +1,105 @@
+import re
+import unicodedata
+from collections import Counter
+from typing import Iterable, List, Optional
+
+# 키워드 추출 설정
+KEYWORD_MAX_PER_DOCUMENT = 512  # 문서당 저장할 최대 키워드 수 (인덱스 크기 제한)
+KEYWORD_MAX_QUERY_TERMS = 32    # 질의당 최대 키워드 수 ($in 조건 크기 제한)
+
+# 영문 / 숫자 기술 용어 (c++, c#, node.js, .net 등 기호 포함) 또는 한글 어절
+_TOKEN_PATTERN = re.compile(r"[a-z0-9.][a-z0-9+#.]*|[가-힣]+")
+
+# 한글 어절 끝의 조사 / 어미 (긴 것부터 제거)
+_KOREAN_SUFFIXES = sorted([
+    "했습니다", "하였습니다", "합니다", "입니다", "하였고", "하였으며", "했으며", "하였다", "했다", "했고", "했던",
+    "하면서", "하여", "하고", "하는", "하며", "하기", "해서", "되어", "되는", "된", "한",
+    "에서는", "에서", "에게", "으로는", "으로", "로는", "부터", "까지", "처럼", "보다", "과의", "와의",
+    "이며", "이고", "이나", "에는", "에도", "은", "는", "이", "가", "을", "를", "에", "로", "와", "과", "의", "도", "만",
+], key=len, reverse=True)
+
+# 검색에 의미 없는 흔한 단어
+_STOPWORDS = {
+    "및", "등", "또는", "그리고", "관련", "경험", "업무", "담당", "수행", "통한", "위한", "대한", "있는", "있습니다",
+    "the", "and", "or", "of", "to", "in", "for", "with", "on", "a", "an", "is", "are",
+}
+
+
+def _is_latin(token: str) -> bool:
+    return not ("가" <= token[0] <= "힣")
+
+
+def _strip_korean_suffix(token: str) -> str:
+    for suffix in _KOREAN_SUFFIXES:
+        if len(token) > len(suffix) and token.endswith(suffix):
+            return token[:-len(suffix)]
+    return token
+
+
+def _strip_latin_dots(token: str) -> str:
+    # 끝의 마침표는 문장부호, 앞의 점은 하나일 때만 용어의 일부 (.net), 여러 개면 말줄임표
+    token = token.rstrip(".")
+    return token.lstrip(".") if token.startswith("..") else token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    한국어 / 영문 혼합 텍스트 토큰화 (출현 순서 유지, 중복 포함)
+    - 영문은 소문자화, 한글 어절은 조사 / 어미 제거
+    - 공백으로만 이어진 영문 토큰은 bigram도 추가 ("spring boot" 같은 기술 용어)
+    - 영문 토큰 끝의 마침표(문장부호)만 제거하고 앞의 점은 유지 (.net, node.js)
+
+    >>> tokenize(".NET, Node.js 개발 경험.")
+    ['.net', 'node.js', '개발']
+    >>> tokenize("Python... 그리고 ASP.NET.")
+    ['python', 'asp.net']
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize("NFC", text).lower()
+    tokens = []
+    previous_latin, previous_end = None, 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        raw = match.group()
+        if text[previous_end:match.start()].strip():
+            previous_latin = None
+        previous_end = match.end()
+        is_latin = _is_latin(raw)
+        token = _strip_latin_dots(raw) if is_latin else _strip_korean_suffix(raw)
+        if not token or token in _STOPWORDS or (len(token) < 2 and not re.search(r"[+#]", token)):
+            previous_latin = None
+            continue
+        if is_latin and token.isdigit():
+            previous_latin = None
+            continue
+        tokens.append(token)
+        if is_latin and previous_latin:
+            tokens.append(f"{previous_latin} {token}")
+        previous_latin = token if is_latin else None
+    return tokens
+
+
+def extract_keywords(text: str, skills: Optional[Iterable[str]] = None,
+                     limit: int = KEYWORD_MAX_PER_DOCUMENT) -> List[str]:
+    """
+    문서 저장용 키워드 배열 (multikey 인덱스 대상)
+    - 정형 skills 항목은 전체 문구도 그대로 포함
+    """
+    keywords = []
+    for skill in skills or []:
+        phrase = " ".join(unicodedata.normalize("NFC", skill).lower().split())
+        if len(phrase) >= 2:
+            keywords.append(phrase)
+        keywords.extend(tokenize(skill))
+    keywords.extend(tokenize(text))
+    return list(dict.fromkeys(keywords))[:limit]
+
+
+def query_keywords(text: str, limit: int = KEYWORD_MAX_QUERY_TERMS) -> List[str]:
+    """
+    검색 질의용 키워드 (질의가 문서 전체인 경우가 많아 개수를 제한)
+    - 영문 기술 용어를 우선, 그다음 질의 안에서 자주 나온 순
+    """
+    counts = Counter(tokenize(text))
+    ranked = sorted(counts.items(), key=lambda item: (not _is_latin(item[0]), -item[1]))
+    return [token for token, _ in ranked[:limit]]
@@ -0,0 +1,87 @@
+"""
+요청 본문 크기 제한 (ASGI 미들웨어)
+
+Starlette는 핸들러 실행 전에 multipart 본문 전체를 받아 임시 파일로 옮겨 두므로,
+파일별 UPLOAD_MAX_MB 검사(DocumentTooLargeException)만으로는 큰 업로드를 다 받은 뒤에야 거절됨
+- Content-Length가 한도를 넘으면 본문을 읽지 않고 바로 413
+- Content-Length가 없는 chunked 요청은 받은 바이트를 세다가 한도를 넘는 순간 읽기를 멈추고 413
+"""
+import os
+import json
+import logging
+from dotenv import load_dotenv
+from services.ocr_service import UPLOAD_MAX_BYTES
+
+load_dotenv()
+
+# 요청 하나의 본문 한도 (기본: 업로드 파일 2개(compare_resume_posting) + multipart 헤더 여유 1MB)
+# CSV 이력서 업로드도 같은 한도를 따름
+REQUEST_MAX_BYTES = int(float(os.getenv("REQUEST_MAX_MB", "0")) * 1024 * 1024) or UPLOAD_MAX_BYTES * 2 + 1024 * 1024
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+class RequestSizeLimitMiddleware:
+
+    def __init__(self, app, max_bytes: int = REQUEST_MAX_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(scope, send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise RequestTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            # 본문 파싱 오류가 앱 안에서 400 등으로 바뀌어도 한도 초과면 413으로 응답
+            if exceeded:
+                return
+            response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # RequestTooLarge가 그대로 올라오거나 다른 오류로 바뀐 경우
+            if not exceeded:
+                raise
+        if exceeded and not response_started:
+            await self._reject(scope, send)
+
+    async def _reject(self, scope, send):
+        detail = f"요청 크기가 {self.max_bytes // (1024 * 1024)}MB를 초과함"
+        logging.warning(f"[HTTPException] {detail} ({scope.get('path')})")
+        body = json.dumps({"message": f"HTTP 에러: {detail}"}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})